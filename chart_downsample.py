@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+趋势图降采样工具
+
+功能：按索引将序列等分为若干桶，每桶保留最小值和最大值，
+在控制绘制点数的同时保留曲线形状和尖峰（与报告页面放大时使用的算法一致）
+"""
+
+# 配置常量
+CHART_MAX_POINTS = 500  # 每条趋势曲线最多绘制的点数
+
+
+def min_max_downsample(values, max_points=CHART_MAX_POINTS):
+    """对数值序列做min/max降采样，返回保留点的索引列表（升序）
+
+    首尾两个点始终保留；点数不超过max_points时原样返回全部索引；
+    max_points不足4个时放不下任何一个桶的最小值和最大值，只保留首尾点
+    """
+    count = len(values)
+    if max_points <= 0 or count <= max_points:
+        return list(range(count))
+    if max_points < 4:
+        return [0, count - 1][:max_points]
+
+    bucket_count = max((max_points - 2) // 2, 1)
+    span = (count - 2) / bucket_count
+    indices = [0]
+    for bucket in range(bucket_count):
+        start = 1 + int(bucket * span)
+        end = 1 + int((bucket + 1) * span)
+        if start >= end:
+            continue
+        bucket_range = range(start, end)
+        low = min(bucket_range, key=values.__getitem__)
+        high = max(bucket_range, key=values.__getitem__)
+        # 按原始顺序输出，最小值和最大值是同一个点时只保留一次
+        indices.extend(sorted({low, high}))
+    indices.append(count - 1)
+    return indices
+
+
+def downsample_series(labels, values, max_points=CHART_MAX_POINTS):
+    """对趋势曲线降采样，返回 {"labels", "values", "index"}，index为各点在完整序列中的位置"""
+    indices = min_max_downsample(values, max_points)
+    return {
+        "labels": [labels[i] for i in indices],
+        "values": [values[i] for i in indices],
+        "index": indices,
+        "total": len(values)
+    }
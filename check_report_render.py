@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+报告渲染一致性检查
+
+功能：用固定的PR数据和指标（fixtures/report_render_cases.json，生成时间固定）流式渲染报告，
+与 fixtures/report_render_<用例名>.html 中的基准HTML逐字节比较；
+调整报告的渲染方式（不应改变输出）后运行确认结果不变，有意修改报告内容时加 --update 重新生成基准
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import generate_pr_report
+
+# 配置常量
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CASES_FILE = os.path.join(FIXTURES_DIR, "report_render_cases.json")
+
+
+def render_case(case, generated_time):
+    """按write_html_report的内嵌数据方式流式渲染一个用例，返回UTF-8编码的报告内容"""
+    context = generate_pr_report.build_report_context(case["pr_data"], case["metrics"])
+    context["generated_time"] = generated_time
+    chunks = []
+    generate_pr_report.render_report(chunks.append, context)
+    return "".join(chunks).encode("utf-8")
+
+
+def expected_file(name):
+    """用例对应的基准HTML文件"""
+    return os.path.join(FIXTURES_DIR, f"report_render_{name}.html")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="检查报告渲染结果与基准HTML逐字节一致")
+    parser.add_argument("--update", action="store_true", help="用当前渲染结果重新生成基准HTML")
+    args = parser.parse_args()
+
+    with open(CASES_FILE, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    mismatched = []
+    for name, case in fixture["cases"].items():
+        rendered = render_case(case, fixture["generated_time"])
+        if args.update:
+            with open(expected_file(name), "wb") as f:
+                f.write(rendered)
+            print(f"已更新基准: {expected_file(name)}")
+            continue
+
+        with open(expected_file(name), "rb") as f:
+            expected = f.read()
+        if rendered == expected:
+            print(f"{name}: 一致 ({len(rendered)} 字节)")
+            continue
+
+        # 报告第一处不同的位置，便于定位
+        position = next(
+            (index for index, (left, right) in enumerate(zip(rendered, expected)) if left != right),
+            min(len(rendered), len(expected))
+        )
+        print(f"{name}: 不一致，第 {position} 字节起不同（渲染 {len(rendered)} 字节，基准 {len(expected)} 字节）")
+        print(f"  渲染: {rendered[position:position + 80]!r}")
+        print(f"  基准: {expected[position:position + 80]!r}")
+        mismatched.append(name)
+
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+采集脚本运行统计
+
+功能：在HTTP会话上记录每个接口类别的请求次数、延迟分布、状态码、重试次数、接收字节数，
+以及速率限制额度消耗和等待时间；开启profile时额外记录各阶段耗时，运行结束后输出机器可读的运行摘要
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+
+from stats_utils import percentile, summarize_distribution
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+SUMMARY_FILE = os.path.join(DATA_DIR, "collector_run_summary.json")  # 最近一次运行的摘要
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)  # 延迟直方图的桶上界（秒）
+# 接口类别：(类别名称, 路径正则)，按顺序匹配
+ENDPOINT_FAMILIES = [
+    ("graphql", re.compile(r"^/graphql$")),
+    ("pulls", re.compile(r"^/repos/[^/]+/[^/]+/pulls$")),
+    ("pulls/{n}", re.compile(r"^/repos/[^/]+/[^/]+/pulls/\d+$")),
+    ("pulls/{n}/commits", re.compile(r"^/repos/[^/]+/[^/]+/pulls/\d+/commits$")),
+    ("check-runs", re.compile(r"^/repos/[^/]+/[^/]+/commits/[^/]+/check-runs$")),
+    ("actions/runs", re.compile(r"^/repos/[^/]+/[^/]+/actions/runs$")),
+    ("actions/runs/{id}/jobs", re.compile(r"^/repos/[^/]+/[^/]+/actions/runs/\d+/jobs$"))
+]
+
+
+def endpoint_family(url):
+    """按请求路径归类接口，未识别的路径归为other"""
+    path = urlparse(url).path
+    for family, pattern in ENDPOINT_FAMILIES:
+        if pattern.match(path):
+            return family
+    return "other"
+
+
+def new_run_stats(profile=False):
+    """创建运行统计"""
+    return {
+        "started_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+        "started": time.monotonic(),
+        "profile": profile,
+        "endpoints": {},  # 接口类别 -> 请求统计
+        "rate_limit": {},  # 速率限制资源（core/graphql等） -> 额度
+        "sleep_seconds": {},  # 等待原因 -> 等待秒数
+        "hedges": {"sent": 0, "won": 0},  # 对冲请求：发出的副本数 / 副本先于原请求返回的次数
+        "stages": {},  # 阶段名称 -> 耗时统计（仅profile）
+        "stage_stack": [],
+        "lock": threading.Lock()  # 对冲请求在工作线程中发送，记录请求统计时需要加锁
+    }
+
+
+def _new_endpoint_stats():
+    """创建单个接口类别的统计"""
+    return {
+        "count": 0,
+        "errors": 0,
+        "status_codes": {},
+        "retries": 0,
+        "bytes": 0,
+        "latencies": []
+    }
+
+
+def record_response(stats, method, url, status_code, elapsed, size, retries, headers, credential=None):
+    """记录一次请求，使用凭据池时速率限制额度按凭据分别统计"""
+    with stats["lock"]:
+        family = endpoint_family(url)
+        if method != "GET":
+            family = f"{method} {family}"
+        endpoint = stats["endpoints"].setdefault(family, _new_endpoint_stats())
+        endpoint["count"] += 1
+        endpoint["status_codes"][str(status_code)] = endpoint["status_codes"].get(str(status_code), 0) + 1
+        if status_code >= 400:
+            endpoint["errors"] += 1
+        endpoint["retries"] += retries
+        endpoint["bytes"] += size
+        endpoint["latencies"].append(elapsed)
+
+        for stage in stats["stage_stack"]:
+            stage["requests"] += 1
+
+        # 速率限制额度：X-RateLimit-Used在窗口重置后会变小，此时本窗口的用量全部计入
+        resource = headers.get("X-RateLimit-Resource")
+        used = headers.get("X-RateLimit-Used")
+        if resource and used is not None:
+            used = int(used)
+            key = f"{resource}/{credential}" if credential else resource
+            budget = stats["rate_limit"].setdefault(key, {"consumed": 0, "last_used": None})
+            if budget["last_used"] is None:
+                budget["consumed"] += 1
+            elif used >= budget["last_used"]:
+                budget["consumed"] += used - budget["last_used"]
+            else:
+                budget["consumed"] += used
+            budget["last_used"] = used
+            budget["limit"] = int(headers.get("X-RateLimit-Limit", 0))
+            budget["remaining"] = int(headers.get("X-RateLimit-Remaining", 0))
+            budget["reset_at"] = datetime.fromtimestamp(
+                int(headers.get("X-RateLimit-Reset", 0)), timezone.utc
+            ).strftime(TIME_FORMAT)
+
+
+def request_count(stats):
+    """到目前为止发送的请求总数"""
+    with stats["lock"]:
+        return sum(endpoint["count"] for endpoint in stats["endpoints"].values())
+
+
+def start_hedge(stats, max_ratio):
+    """对冲请求数量未超过全部请求的max_ratio时登记一次对冲并返回True，否则返回False（检查和登记在同一把锁内完成）"""
+    with stats["lock"]:
+        total = sum(endpoint["count"] for endpoint in stats["endpoints"].values())
+        if stats["hedges"]["sent"] >= max_ratio * total:
+            return False
+        stats["hedges"]["sent"] += 1
+        return True
+
+
+def record_hedge_won(stats):
+    """记录一次对冲请求先于原请求返回"""
+    with stats["lock"]:
+        stats["hedges"]["won"] += 1
+
+
+def tail_latency(stats, url, pct, min_samples):
+    """接口类别的延迟分位数，样本不足时返回None"""
+    with stats["lock"]:
+        endpoint = stats["endpoints"].get(endpoint_family(url))
+        if endpoint is None or len(endpoint["latencies"]) < min_samples:
+            return None
+        latencies = sorted(endpoint["latencies"])
+    return percentile(latencies, pct)
+
+
+def sleep(stats, seconds, reason):
+    """等待并记录等待时间"""
+    with stats["lock"]:
+        stats["sleep_seconds"][reason] = stats["sleep_seconds"].get(reason, 0) + seconds
+    time.sleep(seconds)
+
+
+@contextmanager
+def _timed_stage(stats, name):
+    """记录阶段耗时和阶段内发送的请求数（嵌套阶段的请求同时计入外层阶段）"""
+    with stats["lock"]:
+        stage = stats["stages"].setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "requests": 0})
+        stats["stage_stack"].append(stage)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        with stats["lock"]:
+            stats["stage_stack"].pop()
+            stage["count"] += 1
+            stage["seconds"] += elapsed
+            stage["max_seconds"] = max(stage["max_seconds"], elapsed)
+
+
+def stage(stats, name):
+    """阶段计时，只在开启profile时记录"""
+    if not stats["profile"]:
+        return nullcontext()
+    return _timed_stage(stats, name)
+
+
+def latency_histogram(latencies):
+    """累计延迟直方图：{桶上界: 不超过该值的请求数}"""
+    histogram = {str(bound): sum(1 for value in latencies if value <= bound) for bound in LATENCY_BUCKETS}
+    histogram["+Inf"] = len(latencies)
+    return histogram
+
+
+def build_run_summary(stats, status, pr_count, stale_prs=()):
+    """汇总运行统计，stale_prs为本次应获取但没有获取到最新数据的PR"""
+    # 较慢的对冲请求可能在工作线程中仍在返回，汇总时加锁
+    with stats["lock"]:
+        endpoints = {}
+        for family, endpoint in sorted(stats["endpoints"].items()):
+            endpoints[family] = {
+                "count": endpoint["count"],
+                "errors": endpoint["errors"],
+                "status_codes": dict(endpoint["status_codes"]),
+                "retries": endpoint["retries"],
+                "bytes": endpoint["bytes"],
+                "latency_seconds": summarize_distribution(endpoint["latencies"], ndigits=3),
+                "latency_histogram": latency_histogram(endpoint["latencies"]),
+                "total_seconds": round(sum(endpoint["latencies"]), 1)
+            }
+
+        summary = {
+            "started_at": stats["started_at"],
+            "finished_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+            "duration_seconds": round(time.monotonic() - stats["started"], 1),
+            "status": status,
+            "pr_count": pr_count,
+            "stale_prs": sorted(stale_prs),
+            "requests": sum(endpoint["count"] for endpoint in endpoints.values()),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "retries": sum(endpoint["retries"] for endpoint in endpoints.values()),
+            "bytes_received": sum(endpoint["bytes"] for endpoint in endpoints.values()),
+            "sleep_seconds": {reason: round(seconds, 1) for reason, seconds in stats["sleep_seconds"].items()},
+            "hedges": dict(stats["hedges"]),
+            "tiers": stats.get("tiers", {}),  # 分层刷新调度各层级的PR数和请求数
+            "rate_limit": {
+                resource: {key: value for key, value in budget.items() if key != "last_used"}
+                for resource, budget in stats["rate_limit"].items()
+            },
+            "endpoints": endpoints
+        }
+        if stats["profile"]:
+            summary["stages"] = {
+                name: {
+                    "count": stage_stats["count"],
+                    "seconds": round(stage_stats["seconds"], 2),
+                    "max_seconds": round(stage_stats["max_seconds"], 2),
+                    "requests": stage_stats["requests"]
+                }
+                for name, stage_stats in stats["stages"].items()
+            }
+    return summary
+
+
+def save_run_summary(summary, summary_file=SUMMARY_FILE):
+    """保存运行摘要"""
+    summary_dir = os.path.dirname(summary_file)
+    if summary_dir and not os.path.exists(summary_dir):
+        os.makedirs(summary_dir)
+
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"运行摘要已保存到 {summary_file}")
+    return summary_file
+
+
+def print_run_summary(summary):
+    """输出运行摘要中最主要的数字"""
+    print(f"共发送API请求 {summary['requests']} 次（失败 {summary['errors']} 次，重试 {summary['retries']} 次），"
+          f"接收 {summary['bytes_received'] / 1024 / 1024:.1f} MB，"
+          f"等待 {sum(summary['sleep_seconds'].values()):.0f}s，总耗时 {summary['duration_seconds']:.0f}s")
+    if summary["hedges"]["sent"]:
+        print(f"  对冲请求 {summary['hedges']['sent']} 次，其中 {summary['hedges']['won']} 次先于原请求返回")
+    for family, endpoint in sorted(summary["endpoints"].items(), key=lambda item: -item[1]["total_seconds"]):
+        latency = endpoint["latency_seconds"]
+        print(f"  {family}: {endpoint['count']} 次，累计 {endpoint['total_seconds']}s，"
+              f"P50 {latency['p50']}s，P90 {latency['p90']}s")
+    for tier, tier_stats in summary["tiers"].items():
+        print(f"  层级 {tier}: {tier_stats['prs']} 个PR，刷新 {tier_stats['refreshed']} 个，"
+              f"跳过 {tier_stats['skipped']} 个，请求 {tier_stats['requests']} 次")
+    for resource, budget in summary["rate_limit"].items():
+        print(f"  速率限制 {resource}: 本次消耗 {budget['consumed']}，剩余 {budget['remaining']} / {budget['limit']}")
+    for name, stage_stats in summary.get("stages", {}).items():
+        print(f"  阶段 {name}: {stage_stats['count']} 次，累计 {stage_stats['seconds']}s，"
+              f"最长 {stage_stats['max_seconds']}s，请求 {stage_stats['requests']} 次")
+
+
+class InstrumentedSession(requests.Session):
+    """记录每次请求统计的HTTP会话"""
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.monotonic()
+        response = super().request(method, url, *args, **kwargs)
+        # 非流式请求在返回前已读完响应体，耗时包含传输时间
+        elapsed = time.monotonic() - started
+        retry_state = getattr(response.raw, "retries", None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+        size = len(response.content) if not kwargs.get("stream") else int(response.headers.get("Content-Length", 0))
+        record_response(
+            self.stats, method.upper(), url, response.status_code, elapsed, size, retries, response.headers,
+            getattr(response, "credential", None)
+        )
+        return response
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+GitHub凭据池
+
+功能：同时使用多个Personal Access Token和GitHub App安装令牌访问API，提高总的速率限制额度。
+根据响应头跟踪每个凭据在各速率限制资源（core、graphql等）上的剩余额度，每个请求使用剩余额度最多的凭据；
+某个凭据额度耗尽时自动换用其他凭据重发请求，只有全部凭据都耗尽时才需要等待。
+GitHub App安装令牌在过期前自动刷新（需要安装PyJWT: pip install "pyjwt[crypto]"）
+"""
+
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from requests.auth import AuthBase
+
+try:
+    import jwt
+except ImportError:  # 只有配置GitHub App时才需要
+    jwt = None
+
+# 配置常量
+BASE_URL = "https://api.github.com"
+API_VERSION = "2022-11-28"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_LIMIT = 5000  # 未收到响应头之前假定的每小时额度
+TOKEN_REFRESH_MARGIN = 300  # 安装令牌在过期前多少秒刷新
+JWT_LIFETIME = 540  # App JWT有效期（秒，GitHub要求不超过10分钟）
+REQUEST_TIMEOUT = 30  # 获取安装令牌的超时时间（秒）
+REFRESH_RETRY_SECONDS = 60  # 安装令牌刷新失败后，多少秒内不再尝试刷新
+
+
+def request_resource(url):
+    """请求消耗的速率限制资源（GraphQL单独计算额度）"""
+    return "graphql" if urlparse(url).path.endswith("/graphql") else "core"
+
+
+def new_credential(name, token=None, app_id=None, private_key=None, installation_id=None):
+    """创建凭据：Personal Access Token直接给出token，GitHub App安装令牌给出app_id、private_key和installation_id"""
+    return {
+        "name": name,
+        "kind": "app" if installation_id else "pat",
+        "token": token,
+        "expires_at": None,  # 安装令牌的过期时间（时间戳）
+        "refreshing": False,  # 是否有线程正在刷新安装令牌
+        "refresh_retry_at": 0,  # 刷新失败后下次允许刷新的时间（时间戳）
+        "app_id": app_id,
+        "private_key": private_key,
+        "installation_id": installation_id,
+        "budgets": {}  # 资源 -> {"limit", "remaining", "reset"}
+    }
+
+
+def load_credentials():
+    """从环境变量读取凭据
+
+    - GH_TOKENS：多个Personal Access Token，以逗号分隔
+    - GH_TOKEN：单个Personal Access Token（与GH_TOKENS可同时使用，重复的token只保留一个）
+    - GH_APP_ID、GH_APP_PRIVATE_KEY（或GH_APP_PRIVATE_KEY_FILE）、GH_APP_INSTALLATION_IDS（以逗号分隔）：GitHub App安装令牌
+    """
+    credentials = []
+    tokens = [token.strip() for token in os.environ.get("GH_TOKENS", "").split(",") if token.strip()]
+    if os.environ.get("GH_TOKEN"):
+        tokens.append(os.environ["GH_TOKEN"].strip())
+    for token in dict.fromkeys(tokens):
+        # 名称只保留token末尾几位，避免在日志和运行摘要中泄露
+        credentials.append(new_credential(f"pat-{token[-4:]}", token=token))
+
+    app_id = os.environ.get("GH_APP_ID")
+    installation_ids = [item.strip() for item in os.environ.get("GH_APP_INSTALLATION_IDS", "").split(",") if item.strip()]
+    if app_id and installation_ids:
+        private_key = os.environ.get("GH_APP_PRIVATE_KEY")
+        key_file = os.environ.get("GH_APP_PRIVATE_KEY_FILE")
+        if not private_key and key_file:
+            with open(key_file, "r", encoding="utf-8") as f:
+                private_key = f.read()
+        if not private_key:
+            print("警告: 已设置GH_APP_ID但未找到GH_APP_PRIVATE_KEY或GH_APP_PRIVATE_KEY_FILE，忽略GitHub App凭据", file=sys.stderr)
+        elif jwt is None:
+            print("警告: 使用GitHub App凭据需要安装PyJWT（pip install \"pyjwt[crypto]\"），忽略GitHub App凭据", file=sys.stderr)
+        else:
+            for installation_id in installation_ids:
+                credentials.append(new_credential(
+                    f"app-{app_id}-{installation_id}",
+                    app_id=app_id,
+                    private_key=private_key,
+                    installation_id=installation_id
+                ))
+    return credentials
+
+
+def refresh_installation_token(credential, base_url=BASE_URL):
+    """用App私钥签发JWT，换取新的安装令牌"""
+    now = int(time.time())
+    app_jwt = jwt.encode(
+        {"iat": now - 60, "exp": now + JWT_LIFETIME, "iss": str(credential["app_id"])},
+        credential["private_key"],
+        algorithm="RS256"
+    )
+    response = requests.post(
+        f"{base_url}/app/installations/{credential['installation_id']}/access_tokens",
+        headers={
+            "Authorization": f"Bearer {app_jwt}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": API_VERSION
+        },
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    data = response.json()
+    credential["token"] = data["token"]
+    credential["expires_at"] = datetime.strptime(data["expires_at"], TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    print(f"已刷新GitHub App安装令牌 {credential['name']}，有效期至 {data['expires_at']}")
+
+
+def headroom(credential, resource, now=None):
+    """凭据在资源上的剩余额度，额度窗口已重置时视为满额"""
+    budget = credential["budgets"].get(resource)
+    if budget is None:
+        return DEFAULT_LIMIT
+    if budget["reset"] <= (now or time.time()):
+        return budget["limit"]
+    return budget["remaining"]
+
+
+def update_budget(credential, headers):
+    """根据响应头更新凭据的剩余额度"""
+    resource = headers.get("X-RateLimit-Resource")
+    remaining = headers.get("X-RateLimit-Remaining")
+    if not resource or remaining is None:
+        return
+    credential["budgets"][resource] = {
+        "limit": int(headers.get("X-RateLimit-Limit", DEFAULT_LIMIT)),
+        "remaining": int(remaining),
+        "reset": int(headers.get("X-RateLimit-Reset", 0))
+    }
+
+
+def is_rate_limited(response):
+    """响应是否因为当前凭据的主速率限制额度耗尽而被拒绝（次级速率限制与凭据无关，不换凭据）"""
+    return response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0"
+
+
+class CredentialPool(AuthBase):
+    """作为requests会话的auth使用：为每个请求选择凭据，额度耗尽时换用其他凭据重发"""
+
+    def __init__(self, credentials, base_url=BASE_URL):
+        if not credentials:
+            raise ValueError("凭据池中没有凭据")
+        self.credentials = credentials
+        self.base_url = base_url
+        self.lock = threading.Lock()
+
+    def select(self, resource, exclude=()):
+        """选择资源上剩余额度最多的凭据；全部耗尽时选择最早重置的凭据
+
+        安装令牌需要刷新时在锁外刷新（刷新是网络请求，不能阻塞其他线程选择凭据），
+        刷新失败时跳过该凭据改用其他凭据；其他线程正在刷新时，令牌仍有效就继续使用，否则跳过
+        """
+        exclude = set(exclude)
+        while True:
+            now = time.time()
+            with self.lock:
+                # 令牌已过期且正在刷新或刚刷新失败的安装令牌暂时不可用
+                candidates = [
+                    credential for credential in self.credentials
+                    if credential["name"] not in exclude and not (
+                        credential["kind"] == "app" and (credential["expires_at"] or 0) <= now
+                        and (credential["refreshing"] or credential["refresh_retry_at"] > now)
+                    )
+                ]
+                if not candidates:
+                    return None
+                available = [credential for credential in candidates if headroom(credential, resource, now) > 0]
+                if available:
+                    credential = max(available, key=lambda item: headroom(item, resource, now))
+                else:
+                    credential = min(candidates, key=lambda item: item["budgets"][resource]["reset"])
+                needs_refresh = (
+                    credential["kind"] == "app" and not credential["refreshing"]
+                    and credential["refresh_retry_at"] <= now
+                    and (credential["expires_at"] is None or credential["expires_at"] - now < TOKEN_REFRESH_MARGIN)
+                )
+                if not needs_refresh:
+                    return credential
+                credential["refreshing"] = True
+
+            try:
+                refresh_installation_token(credential, self.base_url)
+            except requests.RequestException as e:
+                print(f"刷新GitHub App安装令牌 {credential['name']} 失败: {e}，改用其他凭据", file=sys.stderr)
+                with self.lock:
+                    credential["refresh_retry_at"] = time.time() + REFRESH_RETRY_SECONDS
+                exclude.add(credential["name"])
+                continue
+            finally:
+                with self.lock:
+                    credential["refreshing"] = False
+            return credential
+
+    def authorize(self, request, credential):
+        """为请求设置凭据"""
+        request.headers["Authorization"] = f"Bearer {credential['token']}"
+        request.credential = credential["name"]
+        return request
+
+    def __call__(self, request):
+        credential = self.select(request_resource(request.url))
+        if credential is None:
+            raise requests.RequestException("凭据池中没有可用的凭据（安装令牌均刷新失败）")
+        request.register_hook("response", self.handle_response)
+        return self.authorize(request, credential)
+
+    def handle_response(self, response, **kwargs):
+        """记录凭据额度；当前凭据额度耗尽且还有其他凭据有剩余时换用其他凭据重发"""
+        request = response.request
+        resource = request_resource(request.url)
+        tried = [request.credential]
+        while True:
+            with self.lock:
+                credential = next(item for item in self.credentials if item["name"] == tried[-1])
+                update_budget(credential, response.headers)
+            response.credential = credential["name"]
+            if not is_rate_limited(response):
+                return response
+
+            next_credential = self.select(resource, exclude=tried)
+            if next_credential is None or headroom(next_credential, resource) <= 0:
+                return response
+            print(f"凭据 {credential['name']} 的 {resource} 额度已耗尽，换用 {next_credential['name']}")
+
+            # 读完并释放原响应的连接后，用新凭据重发同一请求
+            response.content
+            response.close()
+            retry_request = self.authorize(request.copy(), next_credential)
+            tried.append(next_credential["name"])
+            retry_response = response.connection.send(retry_request, **kwargs)
+            retry_response.history.append(response)
+            retry_response.request = retry_request
+            response = retry_response
+
+    def remaining(self, resource):
+        """全部凭据在资源上的剩余额度之和；还没有任何凭据收到过该资源的额度响应头时返回None（额度未知）"""
+        now = time.time()
+        with self.lock:
+            if not any(resource in credential["budgets"] for credential in self.credentials):
+                return None
+            return sum(headroom(credential, resource, now) for credential in self.credentials)
+
+    def summary(self):
+        """各凭据在各资源上的剩余额度"""
+        with self.lock:
+            return {
+                credential["name"]: {
+                    resource: {
+                        "remaining": budget["remaining"],
+                        "limit": budget["limit"],
+                        "reset_at": datetime.fromtimestamp(budget["reset"], timezone.utc).strftime(TIME_FORMAT)
+                    }
+                    for resource, budget in credential["budgets"].items()
+                }
+                for credential in self.credentials
+            }
+
+
+def load_credential_pool(base_url=BASE_URL):
+    """从环境变量创建凭据池，没有任何凭据时退出"""
+    credentials = load_credentials()
+    if not credentials:
+        print("错误: 未找到环境变量 GH_TOKEN / GH_TOKENS，也未配置GitHub App凭据", file=sys.stderr)
+        print("请设置环境变量: $env:GH_TOKEN='your_github_token'（多个token: $env:GH_TOKENS='token1,token2'）", file=sys.stderr)
+        sys.exit(1)
+    kinds = [credential["kind"] for credential in credentials]
+    print(f"凭据池：{kinds.count('pat')} 个Personal Access Token，{kinds.count('app')} 个GitHub App安装令牌")
+    return CredentialPool(credentials, base_url)
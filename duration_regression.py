@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+CI执行时长回归检测脚本
+
+功能：对duration_stats中的每次执行时长，按workflow类别做流式EWMA + CUSUM变点检测，
+检测状态持久化到本地，新数据到来时只处理新增的执行记录（按PR和head SHA去重，新的推送即为新的执行记录），
+并输出机器可读的回归告警
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone, timedelta
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+STATE_FILE = os.path.join(DATA_DIR, "duration_regression_state.json")  # 检测状态文件
+ALERTS_FILE = os.path.join(DATA_DIR, "duration_regression_alerts.json")  # 告警输出文件
+STATE_VERSION = 2
+PROCESSED_RETENTION_DAYS = 60  # 已处理执行记录的保留天数，超过后从去重表中清除
+
+# 需要检测的workflow类别（duration_stats中的字段 -> 展示名称）
+CATEGORIES = {
+    "lint": "Lint",
+    "pr_test_npu": "PR Test (NPU)",
+    "pr_test": "PR Test",
+}
+
+EWMA_ALPHA = 0.1  # 基线EWMA平滑系数
+WARMUP_POINTS = 5  # 建立基线所需的最少执行次数
+CUSUM_K = 1.0  # CUSUM允许偏移量（以标准差为单位）
+CUSUM_H = 5.0  # CUSUM告警阈值（以标准差为单位）
+MIN_STD_RATIO = 0.05  # 标准差下限（占基线均值的比例），避免基线过于平稳时误报
+MIN_STD_SECONDS = 1.0  # 标准差下限（秒）
+MIN_INCREASE_RATIO = 0.15  # 回归区间均值至少比基线慢15%才告警
+
+
+def new_category_state():
+    """创建单个类别的检测状态"""
+    return {
+        "count": 0,  # 已处理的执行次数
+        "baseline_count": 0,  # 当前基线包含的执行次数
+        "mean": None,  # 基线EWMA均值
+        "var": 0.0,  # 基线EWMA方差
+        "cusum": 0.0,  # 单侧（变慢方向）CUSUM累计值
+        "run_start": None,  # CUSUM从0开始上升的执行点，即疑似回归起点
+        "run_sum": 0.0,  # 疑似回归区间内的时长总和
+        "run_count": 0,  # 疑似回归区间内的执行次数
+        "processed": {},  # 已处理的执行记录 "pr_number/head_sha" -> 执行时间，用于增量去重
+    }
+
+
+def new_state():
+    """创建空的检测状态"""
+    return {
+        "version": STATE_VERSION,
+        "categories": {category: new_category_state() for category in CATEGORIES},
+        "alerts": []
+    }
+
+
+def load_state(state_file=STATE_FILE):
+    """加载检测状态，不存在或版本不一致时重新开始"""
+    if os.path.exists(state_file):
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+        print(f"检测状态文件 {state_file} 版本不一致，将重新建立基线")
+
+    return new_state()
+
+
+def save_state(state, state_file=STATE_FILE):
+    """保存检测状态"""
+    state_dir = os.path.dirname(state_file)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+
+def _baseline_std(cat_state):
+    """获取基线标准差（带下限保护）"""
+    floor = max(abs(cat_state["mean"]) * MIN_STD_RATIO, MIN_STD_SECONDS)
+    return max(cat_state["var"] ** 0.5, floor)
+
+
+def update_category(cat_state, category, point):
+    """用一次执行时长更新检测状态，检测到回归时返回告警，否则返回None"""
+    value = point["value"]
+    cat_state["count"] += 1
+    cat_state["processed"][point_key(point)] = point["time"]
+
+    # 基线预热阶段：只累计均值和方差
+    if cat_state["baseline_count"] < WARMUP_POINTS:
+        cat_state["baseline_count"] += 1
+        if cat_state["mean"] is None:
+            cat_state["mean"] = value
+            cat_state["var"] = 0.0
+        else:
+            diff = value - cat_state["mean"]
+            cat_state["mean"] += diff / cat_state["baseline_count"]
+            cat_state["var"] += (diff * (value - cat_state["mean"]) - cat_state["var"]) / cat_state["baseline_count"]
+        return None
+
+    # 标准化后累加CUSUM，只关心变慢的方向
+    std = _baseline_std(cat_state)
+    z = (value - cat_state["mean"]) / std
+    previous_cusum = cat_state["cusum"]
+    cat_state["cusum"] = max(0.0, previous_cusum + z - CUSUM_K)
+
+    if cat_state["cusum"] == 0.0:
+        # 处于受控状态，更新基线并清空疑似区间
+        diff = value - cat_state["mean"]
+        cat_state["mean"] += EWMA_ALPHA * diff
+        cat_state["var"] = (1 - EWMA_ALPHA) * (cat_state["var"] + EWMA_ALPHA * diff * diff)
+        cat_state["baseline_count"] += 1
+        cat_state["run_start"] = None
+        cat_state["run_sum"] = 0.0
+        cat_state["run_count"] = 0
+        return None
+
+    # CUSUM从0开始上升，记录疑似回归起点
+    if previous_cusum == 0.0 or cat_state["run_start"] is None:
+        cat_state["run_start"] = point
+        cat_state["run_sum"] = 0.0
+        cat_state["run_count"] = 0
+    cat_state["run_sum"] += value
+    cat_state["run_count"] += 1
+
+    if cat_state["cusum"] < CUSUM_H:
+        return None
+
+    baseline_mean = cat_state["mean"]
+    regressed_mean = cat_state["run_sum"] / cat_state["run_count"]
+    start = cat_state["run_start"]
+    alert_runs = cat_state["run_count"]
+    cat_state["cusum"] = 0.0
+    cat_state["run_start"] = None
+    cat_state["run_sum"] = 0.0
+    cat_state["run_count"] = 0
+
+    # 统计上显著但幅度太小的波动不告警
+    if regressed_mean < baseline_mean * (1 + MIN_INCREASE_RATIO):
+        return None
+
+    # 超过阈值，生成告警
+    alert = {
+        "category": category,
+        "workflow": CATEGORIES[category],
+        "start_time": start["time"],
+        "start_pr_number": start["pr_number"],
+        "start_head_sha": start.get("head_sha"),
+        "detected_time": point["time"],
+        "detected_pr_number": point["pr_number"],
+        "detected_head_sha": point.get("head_sha"),
+        "baseline_duration": round(baseline_mean, 1),
+        "regressed_duration": round(regressed_mean, 1),
+        "increase_pct": round((regressed_mean - baseline_mean) / baseline_mean * 100, 1) if baseline_mean else None,
+        "runs_in_window": alert_runs,
+    }
+
+    # 以回归区间作为新基线的起点重新预热，避免同一次回归重复告警
+    cat_state["mean"] = regressed_mean
+    cat_state["baseline_count"] = min(alert_runs, WARMUP_POINTS - 1)
+    return alert
+
+
+def point_key(point):
+    """执行记录的去重键：同一PR的同一次推送（head SHA）只处理一次"""
+    return f"{point['pr_number']}/{point.get('head_sha')}"
+
+
+def iter_new_points(duration_stats, category, processed):
+    """从duration_stats中取出指定类别尚未处理过的执行记录（duration_stats已按时间排序）
+
+    不使用时间游标：首次采集时尚无时长的PR、已处理PR上的新推送在之后到来时仍会被处理
+    """
+    for _, entry in duration_stats:
+        value = entry.get(category)
+        if value is None:
+            continue
+        point = {
+            "time": entry["time"],
+            "pr_number": entry["pr_number"],
+            "head_sha": entry.get("head_sha"),
+            "value": value
+        }
+        if point_key(point) in processed:
+            continue
+        yield point
+
+
+def prune_processed(cat_state):
+    """清除超过保留期的已处理执行记录，避免去重表无限增长"""
+    expire_before = (datetime.now(timezone.utc) - timedelta(days=PROCESSED_RETENTION_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    cat_state["processed"] = {
+        key: time for key, time in cat_state["processed"].items() if time >= expire_before
+    }
+
+
+def detect_duration_regressions(duration_stats, state):
+    """增量处理duration_stats中新增的执行记录，返回本次新产生的告警列表"""
+    new_alerts = []
+    for category in CATEGORIES:
+        cat_state = state["categories"].setdefault(category, new_category_state())
+        for point in iter_new_points(duration_stats, category, cat_state["processed"]):
+            alert = update_category(cat_state, category, point)
+            if alert:
+                new_alerts.append(alert)
+        prune_processed(cat_state)
+
+    state["alerts"].extend(new_alerts)
+    return new_alerts
+
+
+def write_alerts(state, new_alerts, alerts_file=ALERTS_FILE):
+    """输出机器可读的告警文件，供CI任务判断是否失败"""
+    result = {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "new_alert_count": len(new_alerts),
+        "new_alerts": new_alerts,
+        "alerts": state["alerts"],
+        "baselines": {
+            category: {
+                "runs": cat_state["count"],
+                "baseline_duration": round(cat_state["mean"], 1) if cat_state["mean"] is not None else None,
+                "cusum": round(cat_state["cusum"], 2),
+            }
+            for category, cat_state in state["categories"].items()
+        }
+    }
+
+    alerts_dir = os.path.dirname(alerts_file)
+    if alerts_dir and not os.path.exists(alerts_dir):
+        os.makedirs(alerts_dir)
+
+    with open(alerts_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    return alerts_file
+
+
+def clear_new_alerts(alerts_file=ALERTS_FILE):
+    """清空告警文件中的新增告警（跳过检测时调用，避免上次的新增告警被重复报告）"""
+    if not os.path.exists(alerts_file):
+        return
+    with open(alerts_file, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    if not result.get("new_alert_count"):
+        return
+
+    result["generated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    result["new_alert_count"] = 0
+    result["new_alerts"] = []
+    with open(alerts_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+def run_detection(duration_stats, state_file=STATE_FILE, alerts_file=ALERTS_FILE):
+    """加载状态、处理新增执行记录、保存状态并输出告警，返回(新告警, 全部告警)"""
+    state = load_state(state_file)
+    new_alerts = detect_duration_regressions(duration_stats, state)
+    save_state(state, state_file)
+    write_alerts(state, new_alerts, alerts_file)
+
+    if new_alerts:
+        print(f"检测到 {len(new_alerts)} 个CI执行时长回归，告警已写入 {alerts_file}")
+    return new_alerts, state["alerts"]
+
+
+def main():
+    """主函数：检查告警文件，存在新告警时以非0状态退出"""
+    parser = argparse.ArgumentParser(description="检查CI执行时长回归告警")
+    parser.add_argument(
+        "--alerts-file",
+        default=ALERTS_FILE,
+        help=f"告警文件路径 (默认: {ALERTS_FILE})"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.alerts_file):
+        print(f"错误: 告警文件 {args.alerts_file} 不存在，请先运行 generate_pr_report.py", file=sys.stderr)
+        sys.exit(1)
+
+    with open(args.alerts_file, "r", encoding="utf-8") as f:
+        result = json.load(f)
+
+    for alert in result.get("new_alerts", []):
+        print(
+            f"[{alert['workflow']}] 执行时长回归: {alert['baseline_duration']}s -> {alert['regressed_duration']}s "
+            f"(+{alert['increase_pct']}%)，起始于PR #{alert['start_pr_number']} ({alert['start_time']})",
+            file=sys.stderr
+        )
+
+    if result.get("new_alert_count", 0) > 0:
+        sys.exit(2)
+    print("未检测到新的CI执行时长回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+PR数据列式导出
+
+功能：将每日PR数据快照中的PR列表、workflow run、job和check执行记录导出为带类型声明的
+Parquet、Arrow IPC（可内存映射，压缩）或CSV文件，供外部分析使用；
+每份快照导出为各表的一个分片，清单文件记录已导出的快照，再次运行时只导出新增或变化的快照
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from datetime import datetime, timezone
+
+import report_cache
+import snapshot_diff
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+EXPORT_DIR = "exports"  # 导出目录
+MANIFEST_NAME = "manifest.json"  # 导出清单文件名
+MANIFEST_VERSION = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"  # 采集脚本保存时间的格式（UTC）
+BATCH_ROWS = 10000  # 列式格式每个批次（Parquet行组）的行数
+COMPRESSION = "zstd"  # Parquet和Arrow IPC的压缩算法
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+LIST_SEPARATOR = "|"  # CSV中列表类型字段的分隔符
+
+# 各表的列定义：(列名, 类型)，类型为 int64 / float64 / bool / string / timestamp（UTC，秒）/ list<string>
+# 所有表都带有snapshot_date列（快照日期），同一个PR在多份快照中出现时可按该列选取
+TABLE_SCHEMAS = {
+    "prs": [
+        ("snapshot_date", "string"),
+        ("pr_number", "int64"),
+        ("title", "string"),
+        ("status", "string"),
+        ("creator", "string"),
+        ("created_at", "timestamp"),
+        ("merged", "bool"),
+        ("merged_at", "timestamp"),
+        ("closed_at", "timestamp"),
+        ("additions", "int64"),
+        ("deletions", "int64"),
+        ("changed_files", "int64"),
+        ("comments_count", "int64"),
+        ("review_comments_count", "int64"),
+        ("html_url", "string"),
+        ("head_sha", "string"),
+        ("labels", "list<string>"),
+        ("gate_status", "string"),
+        ("gate_retry_count", "int64"),
+        ("lint_duration", "float64"),
+        ("pr_test_duration", "float64"),
+        ("pr_test_npu_duration", "float64")
+    ],
+    "workflow_runs": [
+        ("snapshot_date", "string"),
+        ("pr_number", "int64"),
+        ("id", "int64"),
+        ("name", "string"),
+        ("head_sha", "string"),
+        ("event", "string"),
+        ("run_attempt", "int64"),
+        ("status", "string"),
+        ("conclusion", "string"),
+        ("created_at", "timestamp"),
+        ("run_started_at", "timestamp"),
+        ("updated_at", "timestamp")
+    ],
+    "workflow_jobs": [
+        ("snapshot_date", "string"),
+        ("pr_number", "int64"),
+        ("id", "int64"),
+        ("run_id", "int64"),
+        ("workflow", "string"),
+        ("name", "string"),
+        ("head_sha", "string"),
+        ("run_attempt", "int64"),
+        ("status", "string"),
+        ("conclusion", "string"),
+        ("created_at", "timestamp"),
+        ("started_at", "timestamp"),
+        ("completed_at", "timestamp"),
+        ("runner_labels", "list<string>")
+    ],
+    "check_runs": [
+        ("snapshot_date", "string"),
+        ("pr_number", "int64"),
+        ("id", "int64"),
+        ("name", "string"),
+        ("head_sha", "string"),
+        ("status", "string"),
+        ("conclusion", "string"),
+        ("started_at", "timestamp"),
+        ("completed_at", "timestamp")
+    ]
+}
+# 每张表对应PR记录中的明细字段（prs表为PR记录本身）
+TABLE_SOURCES = {"workflow_runs": "workflow_runs", "workflow_jobs": "workflow_jobs", "check_runs": "check_attempts"}
+# 导出列名与PR记录字段名不同的列
+PR_FIELD_NAMES = {"gate_status": "门禁_status"}
+
+
+def parse_timestamp(value):
+    """将采集脚本保存的UTC时间字符串转换为带时区的datetime，空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def iter_table_rows(table, pr_data, snapshot_date):
+    """按表的列定义逐行生成数据（时间字段仍为原始字符串，写出时按目标格式转换）"""
+    columns = [name for name, _ in TABLE_SCHEMAS[table]]
+    for pr in pr_data:
+        if table == "prs":
+            record = {name: pr.get(PR_FIELD_NAMES.get(name, name)) for name in columns}
+            record["labels"] = [label.get("name") for label in pr.get("labels", [])]
+            record["snapshot_date"] = snapshot_date
+            yield record
+            continue
+
+        for item in pr.get(TABLE_SOURCES[table], []):
+            record = {name: item.get(name) for name in columns}
+            record["snapshot_date"] = snapshot_date
+            record["pr_number"] = pr["pr_number"]
+            yield record
+
+
+def arrow_schema(table):
+    """生成表的Arrow schema"""
+    types = {
+        "int64": pyarrow.int64(),
+        "float64": pyarrow.float64(),
+        "bool": pyarrow.bool_(),
+        "string": pyarrow.string(),
+        "timestamp": pyarrow.timestamp("s", tz="UTC"),
+        "list<string>": pyarrow.list_(pyarrow.string())
+    }
+    return pyarrow.schema([(name, types[column_type]) for name, column_type in TABLE_SCHEMAS[table]])
+
+
+def iter_record_batches(table, rows, batch_rows=BATCH_ROWS):
+    """将逐行数据按批次转换为Arrow RecordBatch，内存中最多保留一个批次"""
+    schema = arrow_schema(table)
+    columns = TABLE_SCHEMAS[table]
+    batch = []
+
+    def to_batch(records):
+        arrays = []
+        for (name, column_type), field in zip(columns, schema):
+            values = [record[name] for record in records]
+            if column_type == "timestamp":
+                values = [parse_timestamp(value) for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield to_batch(batch)
+            batch = []
+    if batch:
+        yield to_batch(batch)
+
+
+def write_parquet(table, rows, output_file):
+    """写出Parquet分片，返回行数"""
+    count = 0
+    with pyarrow.parquet.ParquetWriter(output_file, arrow_schema(table), compression=COMPRESSION) as writer:
+        for batch in iter_record_batches(table, rows):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
+
+
+def write_arrow(table, rows, output_file):
+    """写出Arrow IPC文件分片（可用pyarrow.memory_map零拷贝读取），返回行数"""
+    count = 0
+    options = pyarrow.ipc.IpcWriteOptions(compression=COMPRESSION)
+    with pyarrow.OSFile(output_file, "wb") as sink:
+        with pyarrow.ipc.new_file(sink, arrow_schema(table), options=options) as writer:
+            for batch in iter_record_batches(table, rows):
+                writer.write_batch(batch)
+                count += batch.num_rows
+    return count
+
+
+def write_csv(table, rows, output_file):
+    """写出CSV分片（时间为ISO 8601 UTC字符串，列表字段以|分隔），返回行数"""
+    columns = TABLE_SCHEMAS[table]
+    count = 0
+    with open(output_file, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for row in rows:
+            values = []
+            for name, column_type in columns:
+                value = row[name]
+                if column_type == "list<string>":
+                    value = LIST_SEPARATOR.join(item or "" for item in value or [])
+                elif value is None:
+                    value = ""
+                values.append(value)
+            writer.writerow(values)
+            count += 1
+    return count
+
+
+WRITERS = {"parquet": write_parquet, "arrow": write_arrow, "csv": write_csv}
+
+
+def load_manifest(export_dir, export_format):
+    """加载导出清单，不存在时返回空清单；已有清单的导出格式不同时报错"""
+    manifest_file = os.path.join(export_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            if manifest["format"] != export_format:
+                raise ValueError(
+                    f"导出目录 {export_dir} 中已有 {manifest['format']} 格式的导出，请使用其他目录或 --rebuild"
+                )
+            return manifest
+        print(f"导出清单 {manifest_file} 版本不一致，将重新导出全部快照")
+
+    return {"version": MANIFEST_VERSION, "format": export_format, "schemas": {}, "snapshots": {}}
+
+
+def save_manifest(manifest, export_dir):
+    """先写临时文件再替换，保存导出清单"""
+    manifest_file = os.path.join(export_dir, MANIFEST_NAME)
+    temp_file = f"{manifest_file}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, manifest_file)
+
+
+def export_snapshot(snapshot_file, snapshot_date, export_dir, export_format, tables):
+    """将一份快照导出为各表的一个分片，返回 {表名: 行数}"""
+    pr_data = list(snapshot_diff.iter_snapshot(snapshot_file))
+    suffix = FORMATS[export_format]
+    row_counts = {}
+    for table in tables:
+        table_dir = os.path.join(export_dir, table)
+        if not os.path.exists(table_dir):
+            os.makedirs(table_dir)
+        part_file = os.path.join(table_dir, f"part-{snapshot_date}{suffix}")
+        temp_file = f"{part_file}.tmp"
+        row_counts[table] = WRITERS[export_format](table, iter_table_rows(table, pr_data, snapshot_date), temp_file)
+        os.replace(temp_file, part_file)
+    return row_counts
+
+
+def export_all(export_dir=EXPORT_DIR, export_format="parquet", tables=None, data_dir=DATA_DIR, rebuild=False):
+    """增量导出数据目录中的全部快照：已导出且内容未变化的快照直接跳过，返回本次导出的快照数量"""
+    if export_format != "csv" and pyarrow is None:
+        raise RuntimeError(f"导出 {export_format} 格式需要安装pyarrow（pip install pyarrow），或使用 --format csv")
+    tables = tables or list(TABLE_SCHEMAS)
+    if not os.path.exists(export_dir):
+        os.makedirs(export_dir)
+
+    manifest = {"version": MANIFEST_VERSION, "format": export_format, "schemas": {}, "snapshots": {}} \
+        if rebuild else load_manifest(export_dir, export_format)
+    # 列定义或导出的表变化时，已有分片与新分片不兼容，需要全部重新导出
+    schemas = {table: TABLE_SCHEMAS[table] for table in tables}
+    if json.loads(json.dumps(schemas)) != manifest["schemas"]:
+        manifest["snapshots"] = {}
+    manifest["schemas"] = schemas
+
+    exported = 0
+    for snapshot_file in snapshot_diff.list_snapshot_files(data_dir):
+        snapshot_date = snapshot_diff.SNAPSHOT_PATTERN.match(os.path.basename(snapshot_file)).group(1)
+        digest = report_cache.file_sha256(snapshot_file)
+        entry = manifest["snapshots"].get(snapshot_date)
+        if entry and entry["sha256"] == digest:
+            continue
+
+        row_counts = export_snapshot(snapshot_file, snapshot_date, export_dir, export_format, tables)
+        manifest["snapshots"][snapshot_date] = {
+            "file": os.path.basename(snapshot_file),
+            "sha256": digest,
+            "exported_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+            "rows": row_counts
+        }
+        # 每导出一份快照保存一次清单，中断后再次运行从下一份快照继续
+        save_manifest(manifest, export_dir)
+        exported += 1
+        print(f"已导出快照 {os.path.basename(snapshot_file)}: "
+              + "，".join(f"{table} {count} 行" for table, count in row_counts.items()))
+
+    save_manifest(manifest, export_dir)
+    return exported
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="将PR数据快照导出为Parquet/Arrow/CSV")
+    parser.add_argument(
+        "--format", "-f",
+        choices=list(FORMATS),
+        default="parquet",
+        help="导出格式，parquet和arrow需要安装pyarrow (默认: parquet)"
+    )
+    parser.add_argument(
+        "--output-dir", "-o",
+        default=EXPORT_DIR,
+        help=f"导出目录，每张表一个子目录、每份快照一个分片 (默认: {EXPORT_DIR})"
+    )
+    parser.add_argument(
+        "--tables",
+        help=f"只导出指定的表，逗号分隔 (默认: 全部，可选 {','.join(TABLE_SCHEMAS)})"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="忽略导出清单，重新导出全部快照"
+    )
+    args = parser.parse_args()
+
+    tables = None
+    if args.tables:
+        tables = [table.strip() for table in args.tables.split(",") if table.strip()]
+        unknown = [table for table in tables if table not in TABLE_SCHEMAS]
+        if unknown:
+            parser.error(f"未知的表: {', '.join(unknown)}")
+
+    try:
+        exported = export_all(args.output_dir, args.format, tables, rebuild=args.rebuild)
+    except (RuntimeError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"导出完成: 本次导出 {exported} 份快照，结果位于 {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
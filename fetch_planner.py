@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+采集成本估算与按价值排序的获取计划
+
+功能：根据PR列表、已保存的数据、历史缓存的状态和上次运行实测的接口延迟，
+估算本次需要刷新的PR在各阶段的API请求数和耗时（monitor_prs.py --plan 只输出估算，不获取数据）。
+运行时间预算或速率限制额度不够时，按价值排序（open PR、门禁未结束、有新推送、已被推迟的次数），
+只获取预算内最有价值的PR，其余记录到 pr_data/backlog.json，下次运行优先获取
+"""
+
+import os
+import json
+import math
+from datetime import datetime, timezone
+
+import history_cache
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+BACKLOG_FILE = os.path.join(DATA_DIR, "backlog.json")  # 推迟到下次运行获取的PR
+PLAN_FILE = os.path.join(DATA_DIR, "fetch_plan.json")  # --plan 输出的估算结果
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_LATENCY = 0.5  # 没有实测延迟时假定的单次请求耗时（秒）
+PACING_SECONDS = 0.1  # 每个PR处理完后的固定间隔（秒）
+DEFAULT_RUNS_PER_SHA = 3  # 没有历史数据时假定每个提交上的workflow run数量
+TIME_SAFETY = 0.9  # 只按剩余时间预算的该比例安排获取，留出估算误差
+RATE_LIMIT_RESERVE = 50  # 速率限制额度中保留给列表翻页、重试等请求的数量
+FINAL_GATE_STATUSES = ("passed", "failed")
+# 估算阶段 -> 接口类别（与运行摘要中的接口类别一致，用于取实测延迟）
+STAGE_FAMILIES = {
+    "pr_histories_batch": "graphql",
+    "pr_detail": "pulls/{n}",
+    "workflow_runs": "actions/runs",
+    "pr_checks": "check-runs",
+    "check_attempts": "check-runs",
+    "superseded_runs": "actions/runs",
+    "workflow_jobs": "actions/runs/{id}/jobs"
+}
+
+
+def _now():
+    """当前UTC时间字符串"""
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def load_latencies(summary_file):
+    """从上次运行的摘要中读取各接口类别的平均延迟（秒）"""
+    if not os.path.exists(summary_file):
+        return {}
+    with open(summary_file, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+    return {
+        family: endpoint["latency_seconds"]["mean"]
+        for family, endpoint in summary.get("endpoints", {}).items()
+        if endpoint.get("latency_seconds", {}).get("mean") is not None
+    }
+
+
+def runs_per_sha(records):
+    """已保存数据中每个提交上的平均workflow run数量"""
+    counts = {}
+    for record in records:
+        for run in record.get("workflow_runs", []):
+            key = (record["pr_number"], run.get("head_sha"))
+            counts[key] = counts.get(key, 0) + 1
+    if not counts:
+        return DEFAULT_RUNS_PER_SHA
+    return sum(counts.values()) / len(counts)
+
+
+def estimate_pr_requests(pr, record, cache, default_runs, max_shas):
+    """估算刷新一个PR在各阶段需要的请求数（PR历史为GraphQL批量获取，记为需要获取的PR数，汇总时再按批次折算）"""
+    listed_sha = (pr.get("head") or {}).get("sha")
+    if history_cache.has_cached_history(cache, pr["number"], pr.get("updated_at")):
+        commits = cache["prs"][str(pr["number"])]["history"]["commits"]
+        needs_history = 0
+    else:
+        commits = (record or {}).get("commits", [])
+        needs_history = 1
+    shas = [commit["sha"] for commit in commits]
+    head_sha = listed_sha or (record or {}).get("head_sha")
+    if head_sha and head_sha not in shas:
+        shas.append(head_sha)  # 有新推送，或新PR还没有提交记录
+    shas = shas[-max_shas:] or [None]
+
+    record_runs = {}
+    for run in (record or {}).get("workflow_runs", []):
+        record_runs[run.get("head_sha")] = record_runs.get(run.get("head_sha"), 0) + 1
+
+    requests = {stage: 0 for stage in STAGE_FAMILIES}
+    requests["pr_histories_batch"] = needs_history
+    requests["pr_detail"] = 1
+    requests["workflow_runs"] = 1
+    requests["pr_checks"] = 1
+    for sha in shas:
+        if sha is None or sha not in cache["check_runs"]:
+            requests["check_attempts"] += 1
+        if sha is None or sha not in cache["workflow_jobs"]:
+            if sha != head_sha:
+                requests["superseded_runs"] += 1
+            requests["workflow_jobs"] += math.ceil(record_runs.get(sha, default_runs))
+    return requests
+
+
+def priority(pr, record, backlog_entry):
+    """PR的获取价值，返回 (排序键, 原因列表)，排序键越大越优先
+
+    依次比较：open PR、门禁未结束（或还没有数据）、有新推送、已被推迟的次数、最近更新时间
+    """
+    status = "open" if pr.get("state") == "open" else pr.get("state") or (record or {}).get("status")
+    is_open = status == "open"
+    gate_pending = record is None or record.get("门禁_status") not in FINAL_GATE_STATUSES or any(
+        run.get("status") != "completed" for run in record.get("workflow_runs", [])
+    )
+    listed_sha = (pr.get("head") or {}).get("sha")
+    new_sha = record is None or bool(listed_sha and listed_sha != record.get("head_sha"))
+    deferred_runs = (backlog_entry or {}).get("runs", 0)
+
+    reasons = [
+        reason for reason, flag in (
+            ("open", is_open), ("gate_pending", gate_pending), ("new_sha", new_sha), ("backlog", deferred_runs)
+        ) if flag
+    ]
+    key = (is_open, gate_pending, new_sha, deferred_runs, pr.get("updated_at") or "")
+    return key, reasons
+
+
+def build_plan(due_prs, stored, cache, latencies, backlog, history_batch_size, max_shas):
+    """为需要刷新的PR估算各阶段的请求数和耗时，并按价值从高到低排序
+
+    stored为 {PR编号: 已保存的记录}，返回的计划中prs按价值排序，每项包含估算的请求数和耗时
+    """
+    default_runs = runs_per_sha(stored.values())
+    items = []
+    stages = {stage: {"family": family, "requests": 0, "seconds": 0.0} for stage, family in STAGE_FAMILIES.items()}
+    for pr in due_prs:
+        record = stored.get(pr["number"])
+        requests = estimate_pr_requests(pr, record, cache, default_runs, max_shas)
+        key, reasons = priority(pr, record, backlog["items"].get(str(pr["number"])))
+        seconds = PACING_SECONDS
+        for stage, count in requests.items():
+            latency = latencies.get(STAGE_FAMILIES[stage], DEFAULT_LATENCY)
+            if stage == "pr_histories_batch":
+                seconds += count * latency / history_batch_size
+            else:
+                seconds += count * latency
+                stages[stage]["requests"] += count
+                stages[stage]["seconds"] += count * latency
+        items.append({
+            "pr_number": pr["number"],
+            "key": key,
+            "reasons": reasons,
+            "requests": sum(count for stage, count in requests.items() if stage != "pr_histories_batch"),
+            "seconds": seconds
+        })
+
+    # PR历史按批次获取，每批一次GraphQL请求
+    history_prs = sum(1 for pr in due_prs if not history_cache.has_cached_history(cache, pr["number"], pr.get("updated_at")))
+    history_batches = math.ceil(history_prs / history_batch_size)
+    stages["pr_histories_batch"]["requests"] = history_batches
+    stages["pr_histories_batch"]["seconds"] = history_batches * latencies.get("graphql", DEFAULT_LATENCY)
+    stages["pacing"] = {"family": None, "requests": 0, "seconds": PACING_SECONDS * len(due_prs)}
+
+    items.sort(key=lambda item: item["key"], reverse=True)
+    return {
+        "prs": items,
+        "stages": stages,
+        "core_requests": sum(stage["requests"] for name, stage in stages.items() if name != "pr_histories_batch"),
+        "graphql_requests": history_batches,
+        "seconds": sum(stage["seconds"] for stage in stages.values())
+    }
+
+
+def select_within_budget(plan, request_budget=None, time_budget=None):
+    """按价值从高到低选择预算内的PR，返回 (获取的PR编号列表, 推迟的PR编号列表)
+
+    request_budget为可用的core请求额度，time_budget为可用的秒数，None表示不限制；
+    排在前面的PR放不下时继续尝试后面更便宜的PR
+    """
+    selected = []
+    deferred = []
+    used_requests = 0
+    used_seconds = 0.0
+    for item in plan["prs"]:
+        fits_requests = request_budget is None or used_requests + item["requests"] <= request_budget
+        fits_time = time_budget is None or used_seconds + item["seconds"] <= time_budget
+        if fits_requests and fits_time:
+            selected.append(item["pr_number"])
+            used_requests += item["requests"]
+            used_seconds += item["seconds"]
+        else:
+            deferred.append(item["pr_number"])
+    return selected, deferred
+
+
+def load_backlog(backlog_file=BACKLOG_FILE):
+    """加载上次运行推迟的PR，不存在时返回空积压"""
+    if os.path.exists(backlog_file):
+        with open(backlog_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"updated_at": None, "items": {}}
+
+
+def update_backlog(backlog, plan, unfetched):
+    """根据本次运行结果重建积压：只保留本次没有获取的PR，记录原因并累计推迟次数
+
+    积压中的PR每次都会被安排刷新，获取成功或已不在候选范围内（移除npu标签、超出时间范围）时自然移出积压。
+    unfetched为 {PR编号: 原因}，原因为 "budget"（预算不够被推迟）、"time_budget"、"interrupted" 或 "error"
+    """
+    plan_items = {item["pr_number"]: item for item in plan["prs"]}
+    items = {}
+    for number, reason in unfetched.items():
+        previous = backlog["items"].get(str(number)) or {}
+        item = plan_items.get(number, {})
+        items[str(number)] = {
+            "pr_number": number,
+            "reason": reason,
+            "priority": item.get("reasons", []),
+            "estimated_requests": item.get("requests"),
+            "first_deferred_at": previous.get("first_deferred_at") or _now(),
+            "runs": previous.get("runs", 0) + 1
+        }
+    return {"updated_at": _now(), "items": items}
+
+
+def save_backlog(backlog, backlog_file=BACKLOG_FILE):
+    """保存积压（先写临时文件再替换）"""
+    backlog_dir = os.path.dirname(backlog_file)
+    if backlog_dir and not os.path.exists(backlog_dir):
+        os.makedirs(backlog_dir)
+    tmp_path = f"{backlog_file}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(backlog, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, backlog_file)
+    if backlog["items"]:
+        print(f"{len(backlog['items'])} 个PR推迟到下次运行获取，已记录到 {backlog_file}")
+    return backlog_file
+
+
+def save_plan(plan, budget, plan_file=PLAN_FILE):
+    """保存 --plan 的估算结果"""
+    plan_dir = os.path.dirname(plan_file)
+    if plan_dir and not os.path.exists(plan_dir):
+        os.makedirs(plan_dir)
+    content = {
+        "planned_at": _now(),
+        "budget": budget,
+        "core_requests": plan["core_requests"],
+        "graphql_requests": plan["graphql_requests"],
+        "seconds": round(plan["seconds"], 1),
+        "stages": {
+            name: {"family": stage["family"], "requests": stage["requests"], "seconds": round(stage["seconds"], 1)}
+            for name, stage in plan["stages"].items()
+        },
+        "prs": [
+            {
+                "pr_number": item["pr_number"],
+                "priority": item["reasons"],
+                "requests": item["requests"],
+                "seconds": round(item["seconds"], 2)
+            }
+            for item in plan["prs"]
+        ]
+    }
+    with open(plan_file, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2, ensure_ascii=False)
+    print(f"采集计划已保存到 {plan_file}")
+    return plan_file
+
+
+def print_plan(plan, budget):
+    """输出各阶段的估算请求数和耗时，以及与速率限制额度、时间预算的对比"""
+    print(f"共需刷新 {len(plan['prs'])} 个PR，预计 core 请求 {plan['core_requests']} 次、"
+          f"GraphQL 请求 {plan['graphql_requests']} 次，耗时约 {plan['seconds'] / 60:.1f} 分钟")
+    for name, stage in plan["stages"].items():
+        family = f"（{stage['family']}）" if stage["family"] else ""
+        print(f"  阶段 {name}{family}: 请求 {stage['requests']} 次，约 {stage['seconds']:.0f}s")
+
+    if budget["core_remaining"] is not None:
+        fits = plan["core_requests"] <= budget["core_remaining"] - RATE_LIMIT_RESERVE
+        print(f"  core 剩余额度 {budget['core_remaining']}（保留 {RATE_LIMIT_RESERVE}）："
+              f"{'足够' if fits else '不够，需要推迟部分PR或等待额度重置'}")
+    if budget["graphql_remaining"] is not None:
+        print(f"  GraphQL 剩余额度 {budget['graphql_remaining']}")
+    if budget["time_budget"] is not None:
+        fits = plan["seconds"] <= budget["time_budget"] * TIME_SAFETY
+        print(f"  时间预算 {budget['time_budget'] / 60:.1f} 分钟：{'足够' if fits else '不够，需要推迟部分PR'}")
+    if budget["selected"] is not None:
+        print(f"  按价值排序后预算内可获取 {budget['selected']} 个PR，推迟 {budget['deferred']} 个")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Flaky check分析脚本
+
+功能：基于PR数据中的check_attempts（各提交上每个check的全部执行记录），
+区分"同一提交上失败后重跑通过"的flaky check与"新推送修复"的真实失败，
+为每个check维护可增量更新的滚动flake分数，并按重跑消耗的runner时长排序
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+STATE_FILE = os.path.join(DATA_DIR, "flake_state.json")  # flake状态文件
+STATE_VERSION = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+FLAKE_EWMA_ALPHA = 0.05  # flake分数的EWMA平滑系数
+SEEN_RETENTION_DAYS = 60  # 已处理执行组的保留天数，超过后从去重表中清除
+FAILURE_CONCLUSIONS = ("failure", "timed_out", "startup_failure")  # 视为失败的结论
+
+
+def new_state():
+    """创建空的flake状态"""
+    return {
+        "version": STATE_VERSION,
+        "checks": {},  # check名称 -> 累计统计
+        "seen_groups": {}  # 已处理的执行组 -> 最后执行时间，用于增量去重
+    }
+
+
+def load_state(state_file=STATE_FILE):
+    """加载flake状态，不存在或版本不一致时重新开始"""
+    if os.path.exists(state_file):
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+        print(f"flake状态文件 {state_file} 版本不一致，将重新统计")
+
+    return new_state()
+
+
+def save_state(state, state_file=STATE_FILE):
+    """保存flake状态"""
+    state_dir = os.path.dirname(state_file)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+
+def attempt_duration(attempt):
+    """计算单次check执行占用的runner时长（秒）"""
+    if not attempt.get("started_at") or not attempt.get("completed_at"):
+        return 0.0
+    started_at = datetime.strptime(attempt["started_at"], TIME_FORMAT)
+    completed_at = datetime.strptime(attempt["completed_at"], TIME_FORMAT)
+    return max((completed_at - started_at).total_seconds(), 0.0)
+
+
+def group_attempts(pr):
+    """将PR的check执行记录按(check名称, 提交SHA)分组，组内按开始时间排序"""
+    groups = {}
+    for attempt in pr.get("check_attempts", []):
+        key = (attempt["name"], attempt["head_sha"])
+        groups.setdefault(key, []).append(attempt)
+
+    for attempts in groups.values():
+        attempts.sort(key=lambda a: (a.get("started_at") or "", a.get("id") or 0))
+    return groups
+
+
+def classify_group(attempts):
+    """对同一提交上同一个check的全部执行进行分类
+
+    - flaky：同一提交上先失败、后重跑通过
+    - passed：没有失败，最后一次通过
+    - failed：失败后在该提交上没有通过（通常由新的推送修复，属于真实失败）
+    - neutral：只有取消/跳过等结论，不参与flake分数
+    """
+    seen_failure = False
+    outcome = "neutral"
+    for attempt in attempts:
+        conclusion = attempt.get("conclusion")
+        if conclusion in FAILURE_CONCLUSIONS:
+            seen_failure = True
+            outcome = "failed"
+        elif conclusion == "success":
+            outcome = "flaky" if seen_failure else "passed"
+            if seen_failure:
+                break
+
+    return {
+        "outcome": outcome,
+        "attempts": len(attempts),
+        "rerun_count": len(attempts) - 1,
+        "rerun_seconds": sum(attempt_duration(a) for a in attempts[1:]),
+        "last_time": max((a.get("completed_at") or a.get("started_at") or "") for a in attempts)
+    }
+
+
+def is_group_settled(pr, head_sha, attempts, result):
+    """判断执行组是否已经稳定，不会再有新的重试（只有稳定的组才计入统计）"""
+    if any(a.get("status") != "completed" for a in attempts):
+        return False
+    if result["outcome"] in ("flaky", "passed"):
+        return True
+    # 失败的组：提交已被新的推送取代或PR已关闭，才认为不会再重跑
+    return head_sha != pr.get("head_sha") or pr.get("status") != "open"
+
+
+def new_check_stats():
+    """创建单个check的累计统计"""
+    return {
+        "flake_score": None,  # EWMA flake分数（每个执行组为flaky记1，否则记0）
+        "groups": 0,  # 计入统计的执行组数量
+        "flaky_groups": 0,
+        "failed_groups": 0,
+        "attempts": 0,
+        "rerun_count": 0,
+        "rerun_seconds": 0.0,  # 同一提交上重跑消耗的runner时长
+        "last_seen": None
+    }
+
+
+def update_check_stats(stats, result):
+    """用一个执行组的分类结果更新check统计，O(1)"""
+    stats["attempts"] += result["attempts"]
+    stats["rerun_count"] += result["rerun_count"]
+    stats["rerun_seconds"] += result["rerun_seconds"]
+    stats["last_seen"] = max(stats["last_seen"] or "", result["last_time"])
+
+    if result["outcome"] == "neutral":
+        return
+
+    is_flaky = 1.0 if result["outcome"] == "flaky" else 0.0
+    stats["groups"] += 1
+    stats["flaky_groups"] += int(is_flaky)
+    stats["failed_groups"] += int(result["outcome"] == "failed")
+    if stats["flake_score"] is None:
+        stats["flake_score"] = is_flaky
+    else:
+        stats["flake_score"] += FLAKE_EWMA_ALPHA * (is_flaky - stats["flake_score"])
+
+
+def update_flake_state(state, pr_data):
+    """增量处理PR数据中新出现且已稳定的执行组，返回本次处理的执行组数量"""
+    processed = 0
+    for pr in pr_data:
+        for (check_name, head_sha), attempts in group_attempts(pr).items():
+            group_key = f"{pr['pr_number']}:{head_sha}:{check_name}"
+            if group_key in state["seen_groups"]:
+                continue
+
+            result = classify_group(attempts)
+            if not is_group_settled(pr, head_sha, attempts, result):
+                continue
+
+            stats = state["checks"].setdefault(check_name, new_check_stats())
+            update_check_stats(stats, result)
+            state["seen_groups"][group_key] = result["last_time"]
+            processed += 1
+
+    # 清理过期的去重记录，避免状态文件无限增长
+    expire_before = (datetime.now(timezone.utc) - timedelta(days=SEEN_RETENTION_DAYS)).strftime(TIME_FORMAT)
+    state["seen_groups"] = {
+        key: last_time for key, last_time in state["seen_groups"].items() if last_time >= expire_before
+    }
+    return processed
+
+
+def rank_flaky_checks(state, top_n=20):
+    """按重跑消耗的runner时长对check排序"""
+    ranking = []
+    for check_name, stats in state["checks"].items():
+        if stats["rerun_count"] == 0 and stats["flaky_groups"] == 0:
+            continue
+        ranking.append({
+            "name": check_name,
+            "flake_score": round(stats["flake_score"] or 0.0, 3),
+            "flaky_groups": stats["flaky_groups"],
+            "failed_groups": stats["failed_groups"],
+            "groups": stats["groups"],
+            "rerun_count": stats["rerun_count"],
+            "rerun_seconds": round(stats["rerun_seconds"], 1)
+        })
+
+    ranking.sort(key=lambda x: (x["rerun_seconds"], x["flake_score"]), reverse=True)
+    return ranking[:top_n]
+
+
+def run_flake_analysis(pr_data, state_file=STATE_FILE):
+    """加载状态、增量更新并保存，返回按重跑耗时排序的flaky check列表"""
+    state = load_state(state_file)
+    processed = update_flake_state(state, pr_data)
+    save_state(state, state_file)
+
+    if processed:
+        print(f"flake分析新增处理 {processed} 个check执行组")
+    return rank_flaky_checks(state)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+门禁关键路径分析脚本
+
+功能：基于PR数据中head SHA上的workflow、job和check执行时间线，
+计算从推送到"全部必需check通过"的关键路径、相邻阶段之间的空闲间隔和并行度，
+并跨PR汇总，找出最值得加速或拆分的阶段
+"""
+
+from datetime import datetime
+
+from stats_utils import summarize_distribution
+
+# 配置常量
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+REQUIRED_CHECKS = ()  # 必需check名称，为空时head SHA上出现的全部check都视为必需
+PASSING_CONCLUSIONS = ("success", "skipped", "neutral")  # 不阻塞门禁的结论
+GAP_TOLERANCE_SECONDS = 5  # 判断前后依赖时允许的时间误差（秒）
+
+
+def parse_time(value):
+    """解析GitHub时间字符串，空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+def build_stages(pr):
+    """构建head SHA上的阶段列表：优先使用job（包含排队时间），没有对应job的check run作为补充"""
+    head_sha = pr.get("head_sha")
+    stages = []
+    job_names = set()
+
+    for job in pr.get("workflow_jobs", []):
+        if job.get("head_sha") not in (None, head_sha):
+            continue
+        start = parse_time(job.get("started_at"))
+        end = parse_time(job.get("completed_at"))
+        if not start or not end:
+            continue
+        job_names.add(job["name"])
+        stages.append({
+            "name": f"{job['workflow']} / {job['name']}",
+            "check_name": job["name"],
+            "queued": parse_time(job.get("created_at")) or start,
+            "start": start,
+            "end": end,
+            "conclusion": job.get("conclusion")
+        })
+
+    # 非Actions产生的check（例如第三方CI）只有check run记录
+    for attempt in pr.get("check_attempts", []):
+        if attempt.get("head_sha") != head_sha or attempt["name"] in job_names:
+            continue
+        start = parse_time(attempt.get("started_at"))
+        end = parse_time(attempt.get("completed_at"))
+        if not start or not end:
+            continue
+        stages.append({
+            "name": attempt["name"],
+            "check_name": attempt["name"],
+            "queued": start,
+            "start": start,
+            "end": end,
+            "conclusion": attempt.get("conclusion")
+        })
+
+    return stages
+
+
+def green_time_from_attempts(attempts):
+    """根据同一提交上的check执行记录，计算全部必需check首次通过的时间，返回(时间, 最后通过的check名称)
+
+    门禁尚未全部通过时返回(None, None)
+    """
+    by_name = {}
+    for attempt in attempts:
+        by_name.setdefault(attempt["name"], []).append(attempt)
+    if not by_name:
+        return None, None
+
+    required = REQUIRED_CHECKS or tuple(by_name)
+    green_time = None
+    gating_check = None
+    for name in required:
+        passed_times = [
+            parse_time(a.get("completed_at"))
+            for a in by_name.get(name, [])
+            if a.get("conclusion") in PASSING_CONCLUSIONS and a.get("completed_at")
+        ]
+        if not passed_times:
+            # 只有取消的执行不阻塞门禁，其余情况说明门禁尚未通过
+            if all(a.get("conclusion") == "cancelled" for a in by_name.get(name, [])) and name not in REQUIRED_CHECKS:
+                continue
+            return None, None
+        first_pass = min(passed_times)
+        if green_time is None or first_pass > green_time:
+            green_time = first_pass
+            gating_check = name
+
+    return green_time, gating_check
+
+
+def find_green_time(pr, stages):
+    """计算PR head SHA上全部必需check首次通过的时间，返回(时间, 最后通过的check名称)"""
+    head_sha = pr.get("head_sha")
+    attempts = [a for a in pr.get("check_attempts", []) if a.get("head_sha") == head_sha]
+    if not attempts:
+        # 没有check记录时退化为使用job
+        attempts = [
+            {"name": s["check_name"], "conclusion": s["conclusion"], "status": "completed",
+             "completed_at": s["end"].strftime(TIME_FORMAT)}
+            for s in stages
+        ]
+    return green_time_from_attempts(attempts)
+
+
+def measure_overlap(intervals, window_start, window_end):
+    """扫描线统计窗口内至少1个阶段运行的时间和至少2个阶段并行的时间（秒）"""
+    events = []
+    for start, end in intervals:
+        start = max(start, window_start)
+        end = min(end, window_end)
+        if end > start:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    busy_seconds = 0.0
+    parallel_seconds = 0.0
+    running = 0
+    previous = None
+    for moment, delta in events:
+        if previous is not None and running > 0:
+            span = (moment - previous).total_seconds()
+            busy_seconds += span
+            if running > 1:
+                parallel_seconds += span
+        running += delta
+        previous = moment
+
+    return busy_seconds, parallel_seconds
+
+
+def analyze_gate_timeline(pr):
+    """分析单个PR head SHA的门禁时间线，门禁未通过或数据不足时返回None"""
+    stages = build_stages(pr)
+    if not stages:
+        return None
+
+    green_time, gating_check = find_green_time(pr, stages)
+    if green_time is None:
+        return None
+
+    # 推送时间：head SHA上最早触发的workflow run，没有时使用最早排队的阶段
+    run_times = [
+        parse_time(run.get("created_at"))
+        for run in pr.get("workflow_runs", [])
+        if run.get("head_sha") in (None, pr.get("head_sha")) and run.get("created_at")
+    ]
+    push_time = min(run_times + [s["queued"] for s in stages])
+    stages = [s for s in stages if s["end"] <= green_time and s["start"] >= push_time]
+    if not stages or green_time <= push_time:
+        return None
+
+    # 从决定门禁通过时间的阶段开始，向前寻找结束最晚的前置阶段，得到关键路径
+    gating = [s for s in stages if s["check_name"] == gating_check and s["end"] == green_time]
+    current = gating[0] if gating else max(stages, key=lambda s: s["end"])
+    path = [current]
+    visited = {id(current)}
+    while True:
+        candidates = [
+            s for s in stages
+            if id(s) not in visited and (s["end"] - current["start"]).total_seconds() <= GAP_TOLERANCE_SECONDS
+        ]
+        if not candidates:
+            break
+        current = max(candidates, key=lambda s: s["end"])
+        path.append(current)
+        visited.add(id(current))
+    path.reverse()
+
+    segments = []
+    previous_end = push_time
+    for stage in path:
+        gap = max((stage["start"] - previous_end).total_seconds(), 0.0)
+        segments.append({
+            "name": stage["name"],
+            "gap_before": gap,  # 与前一阶段之间的空闲间隔（包含排队时间）
+            "queue_seconds": max((stage["start"] - max(stage["queued"], previous_end)).total_seconds(), 0.0),
+            "run_seconds": (stage["end"] - stage["start"]).total_seconds()
+        })
+        previous_end = max(previous_end, stage["end"])
+
+    gate_seconds = (green_time - push_time).total_seconds()
+    intervals = [(s["start"], s["end"]) for s in stages]
+    busy_seconds, parallel_seconds = measure_overlap(intervals, push_time, green_time)
+    stage_seconds = sum((end - start).total_seconds() for start, end in intervals)
+
+    return {
+        "pr_number": pr["pr_number"],
+        "head_sha": pr.get("head_sha"),
+        "gate_seconds": gate_seconds,
+        "critical_path": segments,
+        "critical_run_seconds": sum(seg["run_seconds"] for seg in segments),
+        "critical_idle_seconds": sum(seg["gap_before"] for seg in segments),
+        "busy_seconds": busy_seconds,
+        "parallel_seconds": parallel_seconds,
+        "idle_seconds": max(gate_seconds - busy_seconds, 0.0),
+        "concurrency": stage_seconds / busy_seconds if busy_seconds > 0 else 0.0  # 运行期间的平均并发阶段数
+    }
+
+
+def aggregate_critical_paths(timelines, top_n=15):
+    """跨PR汇总关键路径：门禁耗时分布、空闲/并行占比，以及各阶段对关键路径的贡献排行"""
+    if not timelines:
+        return {}
+
+    total_gate = sum(t["gate_seconds"] for t in timelines)
+    stage_stats = {}
+    for timeline in timelines:
+        names_on_path = set()
+        for segment in timeline["critical_path"]:
+            stats = stage_stats.setdefault(segment["name"], {
+                "name": segment["name"],
+                "on_path_count": 0,
+                "critical_seconds": 0.0,
+                "run_seconds": [],
+                "gap_seconds": []
+            })
+            if segment["name"] not in names_on_path:
+                # 同一阶段失败重跑会在关键路径上出现多次，只按PR计数一次
+                stats["on_path_count"] += 1
+                names_on_path.add(segment["name"])
+            stats["critical_seconds"] += segment["run_seconds"] + segment["gap_before"]
+            stats["run_seconds"].append(segment["run_seconds"])
+            stats["gap_seconds"].append(segment["gap_before"])
+
+    stages = []
+    for stats in stage_stats.values():
+        stages.append({
+            "name": stats["name"],
+            "on_path_count": stats["on_path_count"],
+            "on_path_pct": round(stats["on_path_count"] / len(timelines) * 100, 1),
+            "critical_share_pct": round(stats["critical_seconds"] / total_gate * 100, 1) if total_gate else 0.0,
+            "run": summarize_distribution(stats["run_seconds"]),
+            "gap": summarize_distribution(stats["gap_seconds"])
+        })
+    stages.sort(key=lambda s: s["critical_share_pct"], reverse=True)
+
+    return {
+        "pr_count": len(timelines),
+        "gate_latency": summarize_distribution([t["gate_seconds"] for t in timelines]),
+        "idle_share_pct": round(sum(t["idle_seconds"] for t in timelines) / total_gate * 100, 1) if total_gate else 0.0,
+        "parallel_share_pct": round(sum(t["parallel_seconds"] for t in timelines) / total_gate * 100, 1) if total_gate else 0.0,
+        "critical_idle_share_pct": round(
+            sum(t["critical_idle_seconds"] for t in timelines) / total_gate * 100, 1
+        ) if total_gate else 0.0,
+        "avg_concurrency": round(sum(t["concurrency"] for t in timelines) / len(timelines), 2),
+        "stages": stages[:top_n]
+    }
+
+
+def analyze_critical_paths(pr_data):
+    """分析全部PR的门禁关键路径并汇总"""
+    timelines = []
+    for pr in pr_data:
+        timeline = analyze_gate_timeline(pr)
+        if timeline:
+            timelines.append(timeline)
+    return aggregate_critical_paths(timelines)
@@ -7,18 +7,67 @@ PR效率报告生成脚本
 
 import os
 import sys
+import html
 import json
 import argparse
 from string import Template
 from datetime import datetime, timedelta
 
+import chart_downsample
+import duration_regression
+import flakiness
+import gate_critical_path
+import metrics_exporter
+import pr_latency
+import report_bundle
+import report_cache
+import review_latency
+import runner_cost
+import snapshot_diff
+
 # 配置常量
 DATA_DIR = "pr_data"  # 数据目录
 HTML_OUTPUT_FILE = "pr_efficiency_report.html"  # HTML输出文件
+WRITE_BUFFER_SIZE = 1024 * 1024  # 写报告文件时的缓冲区大小（字节）
+CHART_JS_CDN_URL = "https://cdn.jsdelivr.net/npm/chart.js"  # 在线报告使用的Chart.js地址
+REVIEWER_LOAD_MAX_ROWS = 20  # 评审人负载表中最多展示的评审人数量
+SNAPSHOT_DIFF_MAX_ROWS = 100  # 快照对比中最多展示的PR数量（门禁状态变化、重试增加、执行变慢的PR优先）
+# 快照对比中展示的指标和变化类型名称
+SNAPSHOT_METRIC_NAMES = {
+    "total_prs": "PR总数",
+    "open_pr_count": "待合入PR数量",
+    "merged_count": "已合入PR数量",
+    "门禁_success_rate": "PR门禁成功率 (%)",
+    "avg_gate_retry_count": "平均门禁重试次数",
+    "avg_lint_duration": "门禁静态检查任务时长",
+    "avg_pr_test_duration": "PR Test自动化执行时长",
+    "avg_pr_test_npu_duration": "PR Test(NPU)自动化执行时长"
+}
+SNAPSHOT_CHANGE_KINDS = {"gate": "门禁状态变化", "retries": "重试增加", "slower": "执行变慢"}
+# PR表格的列：(列名, 是否字典编码)，表格数据以列式JSON输出，由页面按可见区域渲染
+PR_TABLE_COLUMNS = [
+    ("number", False),
+    ("url", False),
+    ("title", False),
+    ("status", True),
+    ("creator", True),
+    ("created_at", False),
+    ("merged", True),
+    ("additions", False),
+    ("deletions", False),
+    ("changed_files", False),
+    ("comments", False),
+    ("review_comments", False),
+    ("gate", True),
+    ("lint", False),
+    ("pr_test", False),
+    ("pr_test_npu", False),
+    ("retries", False)
+]
 
 
-def load_latest_pr_data():
-    """加载最新的PR数据"""
+def find_latest_pr_data_file():
+    """查找最新的PR数据文件路径"""
     # 检查数据目录是否存在
     if not os.path.exists(DATA_DIR):
         print(f"错误: 数据目录 {DATA_DIR} 不存在", file=sys.stderr)
@@ -43,17 +92,22 @@ def load_latest_pr_data():
         json_files.sort(reverse=True)
         latest_file = json_files[0]
     
-    file_path = os.path.join(DATA_DIR, latest_file)
+    return os.path.join(DATA_DIR, latest_file)
+
+
+def load_latest_pr_data(file_path=None):
+    """加载最新的PR数据"""
+    file_path = file_path or find_latest_pr_data_file()
     
     # 加载数据
     with open(file_path, "r", encoding="utf-8") as f:
         pr_data = json.load(f)
     
-    print(f"已加载最新PR数据文件: {latest_file}，共 {len(pr_data)} 个PR")
+    print(f"已加载最新PR数据文件: {os.path.basename(file_path)}，共 {len(pr_data)} 个PR")
     return pr_data
 
 
-def calculate_pr_metrics(pr_data):
+def calculate_pr_metrics(pr_data, fragments=None):
     """计算PR效率关键指标"""
     if not pr_data:
         return {}
@@ -185,13 +239,19 @@ def calculate_pr_metrics(pr_data):
     # 计算执行时长数据（按执行时间点记录，不按天平均）
     duration_data = []
     for pr in pr_data:
-        # 提取完整的执行时间（包括时分秒）
-        execution_time = pr["created_at"]
+        # 执行时间取head提交上最近一次workflow run的创建时间（执行时长来自这些run），
+        # 没有run记录时退回PR创建时间；已有PR上的新推送因此按实际执行时间排序
+        head_run_times = [
+            run["created_at"] for run in pr.get("workflow_runs", [])
+            if run.get("head_sha") == pr.get("head_sha") and run.get("created_at")
+        ]
+        execution_time = max(head_run_times) if head_run_times else pr["created_at"]
         
         # 创建执行时长数据条目
         duration_entry = {
             "time": execution_time,
             "pr_number": pr["pr_number"],
+            "head_sha": pr.get("head_sha"),
             "lint": pr.get("lint_duration"),
             "pr_test_npu": pr.get("pr_test_npu_duration"),
             "pr_test": pr.get("pr_test_duration")
@@ -211,6 +271,22 @@ def calculate_pr_metrics(pr_data):
             date_time_label = entry["time"].replace("T", " ")[:-1]  # 格式：YYYY-MM-DD HH:MM:SS
             sorted_duration_dates.append((date_time_label, entry))
     
+    # 门禁关键路径与并行度分析、推送到全绿与合入等时延分布、评审时延（单个PR的分析结果可从片段缓存复用）
+    timelines = []
+    latencies = []
+    pr_reviews = []
+    for pr, fragment in zip(pr_data, fragments or [None] * len(pr_data)):
+        timeline = report_cache.cached_value(fragment, "timeline", gate_critical_path.analyze_gate_timeline, pr)
+        if timeline:
+            timelines.append(timeline)
+        latency = report_cache.cached_value(fragment, "latency", pr_latency.compute_pr_latency, pr)
+        if latency:
+            latencies.append(latency)
+        pr_reviews.append(report_cache.cached_value(fragment, "review", review_latency.compute_pr_review, pr))
+    critical_path_stats = gate_critical_path.aggregate_critical_paths(timelines)
+    latency_stats = pr_latency.aggregate_latency_metrics(latencies)
+    review_stats = review_latency.aggregate_review_metrics(pr_reviews)
+    
     return {
         "total_prs": total_prs,
         "merged_count": merged_count,
@@ -232,10 +308,59 @@ def calculate_pr_metrics(pr_data):
         "creator_retry_stats": sorted_creator_retry_stats,
         "creator_stats": dict(sorted(creator_stats.items(), key=lambda x: x[1], reverse=True)),
         "date_stats": sorted_dates,
-        "duration_stats": sorted_duration_dates
+        "duration_stats": sorted_duration_dates,
+        "critical_path_stats": critical_path_stats,
+        "latency_stats": latency_stats,
+        "review_stats": review_stats
     }
 
 
+def compute_report_metrics(pr_data, fragments=None, regression_output=duration_regression.ALERTS_FILE,
+                           npu_runner_count=runner_cost.NPU_RUNNER_COUNT, data_file=None, persist=True):
+    """计算报告所需的全部指标，返回 (指标, 新增的CI执行时长回归告警)
+
+    指定data_file时同时与数据目录中的上一份快照对比；persist为False时回归检测、flaky统计和runner耗时账本
+    在内存中基于当前数据从头计算，不读写持久化状态文件（供只读的看板服务和报告变体使用）
+    """
+    metrics = calculate_pr_metrics(pr_data, fragments)
+    
+    if persist:
+        # 增量检测CI执行时长回归
+        new_alerts, all_alerts = duration_regression.run_detection(
+            metrics.get("duration_stats", []), alerts_file=regression_output
+        )
+        metrics["duration_alerts"] = all_alerts
+        
+        # 增量更新flaky check统计
+        metrics["flaky_checks"] = flakiness.run_flake_analysis(pr_data)
+        
+        # 增量更新runner耗时账本并汇总
+        metrics["runner_usage"] = runner_cost.run_cost_attribution(pr_data, npu_runner_count=npu_runner_count)
+    else:
+        regression_state = duration_regression.new_state()
+        new_alerts = duration_regression.detect_duration_regressions(metrics["duration_stats"], regression_state)
+        metrics["duration_alerts"] = regression_state["alerts"]
+        
+        flake_state = flakiness.new_state()
+        flakiness.update_flake_state(flake_state, pr_data)
+        metrics["flaky_checks"] = flakiness.rank_flaky_checks(flake_state)
+        
+        ledger = runner_cost.new_ledger()
+        runner_cost.ingest_jobs(ledger, pr_data)
+        since_day = min(pr["created_at"][:10] for pr in pr_data)
+        metrics["runner_usage"] = runner_cost.aggregate_runner_usage(ledger, since_day, npu_runner_count)
+    
+    # 与上一份快照对比（旧快照流式读取，当前数据直接复用已加载的记录）
+    previous_file = data_file and snapshot_diff.find_previous_snapshot(data_file, os.path.dirname(data_file))
+    if previous_file:
+        diff = snapshot_diff.diff_snapshot_records(snapshot_diff.iter_snapshot(previous_file), pr_data)
+        diff["old_snapshot"] = os.path.basename(previous_file)
+        diff["new_snapshot"] = os.path.basename(data_file)
+        metrics["snapshot_diff"] = diff
+    
+    return metrics, new_alerts
+
+
 # 定义时长格式化函数
 def format_duration(seconds):
     """将秒转换为时分秒格式"""
@@ -255,159 +380,44 @@ def format_duration(seconds):
         return f"{secs}s"
 
 
-def generate_html_report(pr_data, metrics):
-    """生成HTML报告"""
-    # 格式化时长指标
-    avg_lint_duration_formatted = format_duration(metrics["avg_lint_duration"])
-    avg_pr_test_duration_formatted = format_duration(metrics["avg_pr_test_duration"])
-    avg_pr_test_npu_duration_formatted = format_duration(metrics["avg_pr_test_npu_duration"])
-    
-    # 生成PR表格行
-    pr_table_rows = ""
-    for pr in pr_data:
-        # 格式化合并状态
-        merged_status = "已合并" if pr["merged"] else "未合并"
-        if pr["status"] == "open":
-            merged_status = "Open"
-        
-        # 格式化代码变更
-        code_changes = f"+{pr['additions']} / -{pr['deletions']} ({pr['changed_files']} files)"
-        
-        # 格式化评论数
-        comments = f"{pr['comments_count']} + {pr['review_comments_count']}"
-        
-        # 格式化门禁状态
-        门禁_status_display = pr.get("门禁_status", "unknown")
-        if 门禁_status_display == "passed":
-            门禁_status_display = "✅ 通过"
-        elif 门禁_status_display == "failed":
-            门禁_status_display = "❌ 失败"
-        elif 门禁_status_display == "pending":
-            门禁_status_display = "⏳ 进行中"
-        else:
-            门禁_status_display = "❓ 未知"
-        
-        # 格式化执行时长
-        lint_duration_display = format_duration(pr.get("lint_duration"))
-        pr_test_duration_display = format_duration(pr.get("pr_test_duration"))
-        pr_test_npu_duration_display = format_duration(pr.get("pr_test_npu_duration"))
-        
-        # 获取门禁重试次数
-        gate_retry_count = pr.get("gate_retry_count", 0)
-        
-        pr_table_rows += f"""
+def format_distribution_row(label, distribution, formatter=format_duration):
+    """生成分布统计表格的一行"""
+    cells = "".join(
+        f"<td>{formatter(distribution.get(key)) if distribution.get(key) is not None else '-'}</td>"
+        for key in ("mean", "p50", "p75", "p90", "p95", "max")
+    )
+    return f"""
         <tr>
-            <td><a href="{pr['html_url']}" target="_blank">#{pr['pr_number']}</a></td>
-            <td>{pr['title']}</td>
-            <td>{pr['status']}</td>
-            <td>{pr['creator']}</td>
-            <td>{pr['created_at']}</td>
-            <td>{merged_status}</td>
-            <td>{code_changes}</td>
-            <td>{comments}</td>
-            <td>{门禁_status_display}</td>
-            <td>{lint_duration_display}</td>
-            <td>{pr_test_duration_display}</td>
-            <td>{pr_test_npu_duration_display}</td>
-            <td>{gate_retry_count}</td>
+            <td>{label}</td>
+            <td>{distribution.get('count', 0)}</td>
+            {cells}
         </tr>
         """
-    
-    # 生成门禁重试次数分布
-    gate_retry_distribution_items = ""
-    for retry_range, count in metrics["gate_retry_distribution"].items():
-        gate_retry_distribution_items += f"""
-        <div class="creator-item">
-            <span class="creator-name">{retry_range}</span>
-            <span class="creator-count">{count}</span>
-        </div>
-        """
-    
-    # 生成门禁重试次数最多的开发者
-    creator_retry_items = ""
-    for creator, retry_count in metrics["creator_retry_stats"].items():
-        if retry_count > 0:
-            creator_retry_items += f"""
-        <div class="creator-item">
-            <span class="creator-name">{creator}</span>
-            <span class="creator-count">{retry_count}</span>
-        </div>
-        """
-    
-    # 生成创建者分布
-    creator_items = ""
-    for creator, count in metrics["creator_stats"].items():
-        creator_items += f"""
-        <div class="creator-item">
-            <span class="creator-name">{creator}</span>
-            <span class="creator-count">{count}</span>
-        </div>
-        """
 
-    # 准备提交与失败趋势图数据
-    # 1. 计算按日期分组的提交PR数和失败PR数
-    date_data = {}
-    for pr in pr_data:
-        created_date = pr["created_at"][:10]  # 提取日期部分（YYYY-MM-DD）
-        
-        if created_date not in date_data:
-            date_data[created_date] = {
-                "total": 0,
-                "failed": 0
-            }
-        
-        # 统计提交PR数
-        date_data[created_date]["total"] += 1
-        
-        # 统计失败PR数（已关闭但未合并）
-        if pr["status"] == "closed" and not pr["merged"]:
-            date_data[created_date]["failed"] += 1
-    
-    # 2. 转换为有序列表
-    sorted_dates = sorted(date_data.items())
-    
-    # 3. 提取日期、提交数和失败数
-    chart_dates = [date for date, _ in sorted_dates]
-    chart_total = [data["total"] for _, data in sorted_dates]
-    chart_failed = [data["failed"] for _, data in sorted_dates]
-    
-    # 4. 转换为JSON格式
-    chart_dates_json = json.dumps(chart_dates)
-    chart_total_json = json.dumps(chart_total)
-    chart_failed_json = json.dumps(chart_failed)
-    
-    # 准备执行时长趋势图数据
-    # 1. 提取执行时间、lint时长和PR Test (NPU)时长
-    lint_chart_dates = []
-    lint_chart_duration = []
-    pr_test_chart_dates = []
-    pr_test_chart_duration = []
-    pr_test_chart_pr_numbers = []
-    
-    for date_label, duration_data in metrics["duration_stats"]:
-        # Lint执行时长数据
-        if duration_data["lint"] is not None:
-            lint_chart_dates.append(date_label)
-            lint_chart_duration.append(duration_data["lint"])
-        
-        # PR Test (NPU)执行时长数据
-        if duration_data["pr_test_npu"] is not None:
-            pr_test_chart_dates.append(date_label)
-            pr_test_chart_duration.append(duration_data["pr_test_npu"])
-            pr_test_chart_pr_numbers.append(duration_data.get("pr_number", ""))
-    
-    # 2. 转换为JSON格式
-    lint_chart_dates_json = json.dumps(lint_chart_dates)
-    lint_chart_duration_json = json.dumps(lint_chart_duration)
-    pr_test_chart_dates_json = json.dumps(pr_test_chart_dates)
-    pr_test_chart_duration_json = json.dumps(pr_test_chart_duration)
-    pr_test_chart_pr_numbers_json = json.dumps(pr_test_chart_pr_numbers)
-    
-    # 生成HTML内容
-    generated_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # 使用string.Template来避免转义大括号
-    html_template = Template('''
+
+def split_template(template):
+    """将string.Template预先切分为 [(字面文本, 占位符名称)] 片段列表，最后一个片段的占位符为None"""
+    fragments = []
+    literal = []
+    position = 0
+    for match in template.pattern.finditer(template.template):
+        literal.append(template.template[position:match.start()])
+        position = match.end()
+        if match.group("escaped") is not None:
+            literal.append(template.delimiter)
+            continue
+        name = match.group("named") or match.group("braced")
+        if name is None:
+            raise ValueError(f"模板中存在无效占位符，位置: {match.start()}")
+        fragments.append(("".join(literal), name))
+        literal = []
+    literal.append(template.template[position:])
+    fragments.append(("".join(literal), None))
+    return fragments
+
+
+# HTML报告模板（使用string.Template来避免转义大括号）
+HTML_TEMPLATE = Template('''
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -415,7 +425,8 @@ def generate_html_report(pr_data, metrics):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>GitHub PR效率报告</title>
     <!-- 添加Chart.js库 -->
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <script src="$chart_js_src"></script>
+    $report_data_script
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f5f5f5; color: #333; line-height: 1.6; }
@@ -430,6 +441,7 @@ def generate_html_report(pr_data, metrics):
         .section { background-color: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1); margin-bottom: 30px; overflow-x: auto; }
         h2 { font-size: 1.8em; margin-bottom: 20px; color: #24292e; border-bottom: 2px solid #e1e4e8; padding-bottom: 10px; }
         table { width: 100%; border-collapse: collapse; margin-bottom: 20px; min-width: 1500px; }
+        table.alert-table { min-width: 0; }
         th, td { padding: 12px; text-align: left; border-bottom: 1px solid #e1e4e8; white-space: nowrap; }
         th { background-color: #f6f8fa; font-weight: 600; }
         tr:hover { background-color: #f6f8fa; }
@@ -439,7 +451,19 @@ def generate_html_report(pr_data, metrics):
         .creator-item { background-color: #f6f8fa; padding: 10px 15px; border-radius: 20px; display: flex; align-items: center; gap: 10px; }
         .creator-name { font-weight: 600; }
         .creator-count { background-color: #28a745; color: white; padding: 2px 8px; border-radius: 10px; font-size: 0.9em; }
-        .line-chart-container { height: 400px; margin-bottom: 20px; }
+        .section-note { color: #666; margin-bottom: 15px; }
+        .table-toolbar { display: flex; gap: 15px; align-items: center; margin-bottom: 15px; }
+        .table-toolbar input { flex: 0 1 360px; padding: 6px 10px; border: 1px solid #e1e4e8; border-radius: 6px; }
+        .table-toolbar select { padding: 6px 10px; border: 1px solid #e1e4e8; border-radius: 6px; }
+        .virtual-table { height: 600px; overflow: auto; margin-bottom: 20px; }
+        .virtual-table table { table-layout: fixed; margin-bottom: 0; }
+        .virtual-table th { position: sticky; top: 0; z-index: 1; cursor: pointer; user-select: none; }
+        .virtual-table th[data-sort="asc"]::after { content: " ▲"; }
+        .virtual-table th[data-sort="desc"]::after { content: " ▼"; }
+        .virtual-table td { height: 48px; padding: 0 12px; overflow: hidden; text-overflow: ellipsis; }
+        .virtual-table tr.spacer td { padding: 0; border: 0; }
+        .line-chart-container { height: 400px; margin-bottom: 20px; position: relative; }
+        .zoom-selection { position: absolute; top: 0; bottom: 0; display: none; background-color: rgba(3, 102, 214, 0.15); pointer-events: none; }
         .line-chart { height: 100%; width: 100%; }
         .footer { text-align: center; color: #666; font-size: 0.9em; margin-top: 30px; }
     </style>
@@ -448,7 +472,7 @@ def generate_html_report(pr_data, metrics):
     <div class="container">
         <header>
             <h1>GitHub PR效率报告</h1>
-            <p class="subtitle">仓库: sgl-project/sglang | 生成时间: $generated_time</p>
+            <p class="subtitle">仓库: sgl-project/sglang$report_scope | 生成时间: $generated_time</p>
         </header>
         
         <!-- 核心指标 -->
@@ -487,6 +511,38 @@ def generate_html_report(pr_data, metrics):
             </div>
         </div>
         
+        <!-- 与上一份快照相比的变化 -->
+        <div class="section">
+            <h2>与上一份快照相比的变化</h2>
+            <p class="section-note">$snapshot_diff_title</p>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>指标</th>
+                        <th>上一份快照</th>
+                        <th>当前快照</th>
+                        <th>变化</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $snapshot_metric_items
+                </tbody>
+            </table>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>PR</th>
+                        <th>标题</th>
+                        <th>变化类型</th>
+                        <th>字段变化</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $snapshot_pr_items
+                </tbody>
+            </table>
+        </div>
+        
         <!-- 门禁重试次数分布 -->
         <div class="section">
             <h2>门禁重试次数分布</h2>
@@ -503,6 +559,214 @@ def generate_html_report(pr_data, metrics):
             </div>
         </div>
         
+        <!-- CI执行时长回归告警 -->
+        <div class="section">
+            <h2>CI执行时长回归告警</h2>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>Workflow</th>
+                        <th>回归起始时间</th>
+                        <th>起始PR</th>
+                        <th>起始提交</th>
+                        <th>检测时间</th>
+                        <th>基线时长</th>
+                        <th>回归后时长</th>
+                        <th>增幅</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $duration_alert_items
+                </tbody>
+            </table>
+        </div>
+        
+        <!-- Flaky Check排行 -->
+        <div class="section">
+            <h2>Flaky Check排行（按重跑耗时）</h2>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>Check名称</th>
+                        <th>Flake分数</th>
+                        <th>Flaky次数 / 执行组数</th>
+                        <th>真实失败次数</th>
+                        <th>重跑次数</th>
+                        <th>重跑耗时</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $flaky_check_items
+                </tbody>
+            </table>
+        </div>
+        
+        <!-- 门禁关键路径分析 -->
+        <div class="section">
+            <h2>门禁关键路径分析（推送 → 全部check通过）</h2>
+            <div class="metrics-grid">
+                <div class="metric-card">
+                    <div class="metric-value">$critical_path_pr_count</div>
+                    <div class="metric-label">已通过门禁的PR数</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$gate_latency_p50</div>
+                    <div class="metric-label">门禁耗时P50</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$gate_latency_p90</div>
+                    <div class="metric-label">门禁耗时P90</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$gate_idle_share_pct %</div>
+                    <div class="metric-label">无阶段运行的空闲占比</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$gate_parallel_share_pct %</div>
+                    <div class="metric-label">多阶段并行占比</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$gate_avg_concurrency</div>
+                    <div class="metric-label">平均并发阶段数</div>
+                </div>
+            </div>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>阶段</th>
+                        <th>位于关键路径的PR占比</th>
+                        <th>占关键路径耗时</th>
+                        <th>运行时长 P50 / P90</th>
+                        <th>前置空闲 P50 / P90</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $critical_stage_items
+                </tbody>
+            </table>
+        </div>
+        
+        <!-- 时延分布 -->
+        <div class="section">
+            <h2>推送到全绿与合入时延分布</h2>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>指标</th>
+                        <th>样本数</th>
+                        <th>均值</th>
+                        <th>P50</th>
+                        <th>P75</th>
+                        <th>P90</th>
+                        <th>P95</th>
+                        <th>最大值</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $latency_items
+                </tbody>
+            </table>
+        </div>
+        
+        <!-- 评审时延与评审人负载 -->
+        <div class="section">
+            <h2>评审时延与评审人负载</h2>
+            <div class="metrics-grid">
+                <div class="metric-card">
+                    <div class="metric-value">$reviewed_pr_count</div>
+                    <div class="metric-label">有评审的PR数</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$first_review_p50</div>
+                    <div class="metric-label">创建到首次评审P50</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$review_rounds_mean</div>
+                    <div class="metric-label">平均评审轮数</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$pending_review_count</div>
+                    <div class="metric-label">待处理的评审请求</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$top_reviewer_share</div>
+                    <div class="metric-label">评审最多的人占全部评审的比例</div>
+                </div>
+            </div>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>指标</th>
+                        <th>样本数</th>
+                        <th>均值</th>
+                        <th>P50</th>
+                        <th>P75</th>
+                        <th>P90</th>
+                        <th>P95</th>
+                        <th>最大值</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $review_items
+                </tbody>
+            </table>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>评审人</th>
+                        <th>评审过的PR数</th>
+                        <th>提交的评审数</th>
+                        <th>被请求评审的PR数</th>
+                        <th>待处理的评审请求</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $reviewer_load_items
+                </tbody>
+            </table>
+        </div>
+        
+        <!-- Runner耗时归属与NPU容量 -->
+        <div class="section">
+            <h2>Runner耗时归属与NPU容量</h2>
+            <div class="metrics-grid">
+                <div class="metric-card">
+                    <div class="metric-value">$npu_runner_hours h</div>
+                    <div class="metric-label">NPU runner总耗时</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$total_runner_hours h</div>
+                    <div class="metric-label">全部runner总耗时</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$runner_rerun_share_pct %</div>
+                    <div class="metric-label">重跑耗时占比</div>
+                </div>
+                <div class="metric-card">
+                    <div class="metric-value">$runner_superseded_share_pct %</div>
+                    <div class="metric-label">被新推送取代的耗时占比</div>
+                </div>
+            </div>
+            <div class="line-chart-container">
+                <canvas id="npuCapacityChart" class="line-chart"></canvas>
+            </div>
+            <table class="alert-table">
+                <thead>
+                    <tr>
+                        <th>维度</th>
+                        <th>名称</th>
+                        <th>NPU耗时</th>
+                        <th>全部耗时</th>
+                        <th>重跑耗时</th>
+                        <th>被取代推送耗时</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    $runner_cost_items
+                </tbody>
+            </table>
+        </div>
+        
         <!-- PR提交与失败趋势图 -->
         <div class="section">
             <h2>PR提交与失败趋势</h2>
@@ -525,33 +789,61 @@ def generate_html_report(pr_data, metrics):
             <div class="line-chart-container">
                 <canvas id="prTestDurationChart" class="line-chart"></canvas>
             </div>
+            <script type="application/json" id="durationChartData" data-src="$duration_chart_data_src">$duration_chart_data</script>
         </div>
         
         <!-- PR列表 -->
         <div class="section">
             <h2>PR详情列表</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>PR编号</th>
-                        <th>标题</th>
-                        <th>状态</th>
-                        <th>创建者</th>
-                        <th>创建时间</th>
-                        <th>合并状态</th>
-                        <th>代码变更</th>
-                        <th>评论数</th>
-                        <th>门禁状态</th>
-                        <th>门禁静态检查</th>
-                        <th>PR Test执行时长</th>
-                        <th>PR Test(NPU)执行时长</th>
-                        <th>门禁重试次数</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    $pr_table_rows
-                </tbody>
-            </table>
+            <div class="table-toolbar">
+                <input type="search" id="prTableSearch" placeholder="搜索PR编号、标题或创建者">
+                <select id="prTableGateFilter">
+                    <option value="">全部门禁状态</option>
+                    <option value="passed">✅ 通过</option>
+                    <option value="failed">❌ 失败</option>
+                    <option value="pending">⏳ 进行中</option>
+                    <option value="unknown">❓ 未知</option>
+                </select>
+                <span id="prTableCount"></span>
+            </div>
+            <div class="virtual-table" id="prTableViewport">
+                <table class="pr-table">
+                    <colgroup>
+                        <col style="width: 90px">
+                        <col style="width: 420px">
+                        <col style="width: 80px">
+                        <col style="width: 140px">
+                        <col style="width: 190px">
+                        <col style="width: 90px">
+                        <col style="width: 200px">
+                        <col style="width: 90px">
+                        <col style="width: 110px">
+                        <col style="width: 120px">
+                        <col style="width: 140px">
+                        <col style="width: 170px">
+                        <col style="width: 110px">
+                    </colgroup>
+                    <thead>
+                        <tr>
+                            <th data-key="number">PR编号</th>
+                            <th data-key="title">标题</th>
+                            <th data-key="status">状态</th>
+                            <th data-key="creator">创建者</th>
+                            <th data-key="created_at">创建时间</th>
+                            <th data-key="merged">合并状态</th>
+                            <th data-key="additions">代码变更</th>
+                            <th data-key="comments">评论数</th>
+                            <th data-key="gate">门禁状态</th>
+                            <th data-key="lint">门禁静态检查</th>
+                            <th data-key="pr_test">PR Test执行时长</th>
+                            <th data-key="pr_test_npu">PR Test(NPU)执行时长</th>
+                            <th data-key="retries">门禁重试次数</th>
+                        </tr>
+                    </thead>
+                    <tbody id="prTableBody"></tbody>
+                </table>
+            </div>
+            <script type="application/json" id="prTableData" data-src="$pr_table_data_src">$pr_table_data</script>
         </div>
         
         <!-- PR创建者分布 -->
@@ -662,6 +954,10 @@ def generate_html_report(pr_data, metrics):
                             display: true,
                             text: 'Lint执行时长趋势图'
                         },
+                        subtitle: {
+                            display: true,
+                            text: '拖动选择区间可放大查看该区间的完整数据，双击还原'
+                        },
                         tooltip: {
                             mode: 'index',
                             intersect: false,
@@ -726,6 +1022,10 @@ def generate_html_report(pr_data, metrics):
                             display: true,
                             text: 'PR Test (NPU)执行时长趋势图'
                         },
+                        subtitle: {
+                            display: true,
+                            text: '拖动选择区间可放大查看该区间的完整数据，双击还原'
+                        },
                         tooltip: {
                             mode: 'index',
                             intersect: false,
@@ -760,6 +1060,372 @@ def generate_html_report(pr_data, metrics):
             });
         </script>
         
+        <script>
+            // 执行时长趋势图放大：拖动选择区间后从完整序列中取出该区间重新降采样，双击还原
+            (function () {
+                const MAX_POINTS = $chart_max_points;
+                let fullData = null;
+
+                function loadFullData() {
+                    if (!fullData) {
+                        const element = document.getElementById('durationChartData');
+                        if (element.dataset.src) {
+                            fullData = fetch(element.dataset.src).then(response => response.json());
+                        } else if (window.REPORT_DATA) {
+                            // 离线包：数据由单独的data.<hash>.js脚本加载
+                            fullData = Promise.resolve(window.REPORT_DATA.duration_chart);
+                        } else {
+                            fullData = Promise.resolve(JSON.parse(element.textContent));
+                        }
+                    }
+                    return fullData;
+                }
+
+                // 与chart_downsample.min_max_downsample一致：每桶保留最小值和最大值
+                function minMaxDownsample(values, maxPoints) {
+                    const count = values.length;
+                    const indices = [];
+                    if (maxPoints <= 0 || count <= maxPoints) {
+                        for (let i = 0; i < count; i++) indices.push(i);
+                        return indices;
+                    }
+                    if (maxPoints < 4) {
+                        return [0, count - 1].slice(0, maxPoints);
+                    }
+                    const bucketCount = Math.max(Math.floor((maxPoints - 2) / 2), 1);
+                    const span = (count - 2) / bucketCount;
+                    indices.push(0);
+                    for (let bucket = 0; bucket < bucketCount; bucket++) {
+                        const start = 1 + Math.floor(bucket * span);
+                        const end = 1 + Math.floor((bucket + 1) * span);
+                        if (start >= end) continue;
+                        let low = start;
+                        let high = start;
+                        for (let i = start + 1; i < end; i++) {
+                            if (values[i] < values[low]) low = i;
+                            if (values[i] > values[high]) high = i;
+                        }
+                        if (low === high) {
+                            indices.push(low);
+                        } else {
+                            indices.push(Math.min(low, high), Math.max(low, high));
+                        }
+                    }
+                    indices.push(count - 1);
+                    return indices;
+                }
+
+                function enableZoom(chart, key, initialIndex) {
+                    const initial = { labels: chart.data.labels, values: chart.data.datasets[0].data, index: initialIndex };
+                    const canvas = chart.canvas;
+                    const selection = document.createElement('div');
+                    selection.className = 'zoom-selection';
+                    canvas.parentNode.appendChild(selection);
+                    let current = initial;
+                    let startX = null;
+
+                    function show(view) {
+                        current = view;
+                        chart.data.labels = view.labels;
+                        chart.data.datasets[0].data = view.values;
+                        chart.update('none');
+                    }
+
+                    function hideSelection() {
+                        startX = null;
+                        selection.style.display = 'none';
+                    }
+
+                    canvas.addEventListener('mousedown', event => {
+                        startX = event.offsetX;
+                        selection.style.left = startX + 'px';
+                        selection.style.width = '0px';
+                        selection.style.display = 'block';
+                    });
+                    canvas.addEventListener('mousemove', event => {
+                        if (startX === null) return;
+                        selection.style.left = Math.min(startX, event.offsetX) + 'px';
+                        selection.style.width = Math.abs(event.offsetX - startX) + 'px';
+                    });
+                    canvas.addEventListener('mouseup', event => {
+                        if (startX === null) return;
+                        const left = Math.min(startX, event.offsetX);
+                        const right = Math.max(startX, event.offsetX);
+                        hideSelection();
+                        if (right - left < 5 || current.index.length < 2) return;
+
+                        // 将选区像素换算为当前曲线上的点，再映射回完整序列中的位置
+                        const clamp = value => Math.min(Math.max(Math.round(value), 0), current.index.length - 1);
+                        const from = current.index[clamp(chart.scales.x.getValueForPixel(left))];
+                        const to = current.index[clamp(chart.scales.x.getValueForPixel(right))];
+                        if (to <= from) return;
+                        loadFullData().then(data => {
+                            const series = data[key];
+                            const indices = minMaxDownsample(series.values.slice(from, to + 1), MAX_POINTS).map(i => i + from);
+                            show({
+                                labels: indices.map(i => series.labels[i]),
+                                values: indices.map(i => series.values[i]),
+                                index: indices
+                            });
+                        });
+                    });
+                    canvas.addEventListener('mouseleave', hideSelection);
+                    canvas.addEventListener('dblclick', () => show(initial));
+                }
+
+                enableZoom(lintDurationChart, 'lint', $lint_chart_index_json);
+                enableZoom(prTestDurationChart, 'pr_test_npu', $pr_test_chart_index_json);
+            })();
+        </script>
+        
+        <script>
+            // 初始化NPU runner每日耗时与容量图
+            const npuCapacityCtx = document.getElementById('npuCapacityChart').getContext('2d');
+            const npuCapacityChart = new Chart(npuCapacityCtx, {
+                type: 'bar',
+                data: {
+                    labels: $npu_capacity_dates_json,
+                    datasets: [
+                        {
+                            label: 'NPU runner耗时（小时）',
+                            data: $npu_capacity_hours_json,
+                            backgroundColor: 'rgba(111, 66, 193, 0.6)',
+                            borderColor: '#6f42c1',
+                            borderWidth: 1
+                        },
+                        {
+                            type: 'line',
+                            label: '容量（$npu_runner_count 个runner × 24小时）',
+                            data: $npu_capacity_limit_json,
+                            borderColor: '#dc3545',
+                            borderWidth: 2,
+                            borderDash: [6, 4],
+                            pointRadius: 0,
+                            fill: false
+                        }
+                    ]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            position: 'top',
+                        },
+                        title: {
+                            display: true,
+                            text: 'NPU runner每日耗时与容量'
+                        }
+                    },
+                    scales: {
+                        y: {
+                            beginAtZero: true,
+                            title: {
+                                display: true,
+                                text: '小时'
+                            }
+                        },
+                        x: {
+                            title: {
+                                display: true,
+                                text: '日期'
+                            }
+                        }
+                    }
+                }
+            });
+        </script>
+        
+        <script>
+            // PR详情列表：数据以列式JSON提供，只渲染可见区域的行
+            (function () {
+                const OVERSCAN = 10;
+                const GATE_LABELS = { passed: '✅ 通过', failed: '❌ 失败', pending: '⏳ 进行中' };
+                const viewport = document.getElementById('prTableViewport');
+                const tbody = document.getElementById('prTableBody');
+                const searchInput = document.getElementById('prTableSearch');
+                const gateFilter = document.getElementById('prTableGateFilter');
+                const countLabel = document.getElementById('prTableCount');
+                const headers = viewport.querySelectorAll('th[data-key]');
+                let rowHeight = 48;
+                let table = null;
+                let searchText = null;
+                let view = [];
+                let sortKey = null;
+                let sortDesc = false;
+                let framePending = false;
+
+                function formatDuration(seconds) {
+                    if (seconds === null || seconds === undefined) return '-';
+                    const total = Math.floor(seconds);
+                    const hours = Math.floor(total / 3600);
+                    const mins = Math.floor((total % 3600) / 60);
+                    const secs = total % 60;
+                    if (hours > 0) return hours + 'h' + mins + 'm' + secs + 's';
+                    if (mins > 0) return mins + 'm' + secs + 's';
+                    return secs + 's';
+                }
+
+                function loadData() {
+                    const element = document.getElementById('prTableData');
+                    if (element.dataset.src) {
+                        return fetch(element.dataset.src).then(response => response.json());
+                    }
+                    if (window.REPORT_DATA) {
+                        // 离线包：数据由单独的data.<hash>.js脚本加载
+                        return Promise.resolve(window.REPORT_DATA.pr_table);
+                    }
+                    return Promise.resolve(JSON.parse(element.textContent));
+                }
+
+                function decode(payload) {
+                    const columns = {};
+                    for (const [name, column] of Object.entries(payload.columns)) {
+                        columns[name] = column.dict ? column.codes.map(code => column.dict[code]) : column.values;
+                    }
+                    if (!columns.url) {
+                        columns.url = columns.number.map(number => payload.url_prefix + number);
+                    }
+                    return { count: payload.count, columns: columns };
+                }
+
+                function cellValues(i) {
+                    const c = table.columns;
+                    return [
+                        null,
+                        c.title[i],
+                        c.status[i],
+                        c.creator[i],
+                        c.created_at[i],
+                        c.merged[i],
+                        '+' + c.additions[i] + ' / -' + c.deletions[i] + ' (' + c.changed_files[i] + ' files)',
+                        c.comments[i] + ' + ' + c.review_comments[i],
+                        GATE_LABELS[c.gate[i]] || '❓ 未知',
+                        formatDuration(c.lint[i]),
+                        formatDuration(c.pr_test[i]),
+                        formatDuration(c.pr_test_npu[i]),
+                        c.retries[i]
+                    ];
+                }
+
+                function buildRow(i) {
+                    const tr = document.createElement('tr');
+                    const link = document.createElement('a');
+                    link.href = table.columns.url[i];
+                    link.target = '_blank';
+                    link.textContent = '#' + table.columns.number[i];
+                    cellValues(i).forEach((value, index) => {
+                        const td = document.createElement('td');
+                        if (index === 0) {
+                            td.appendChild(link);
+                        } else {
+                            td.textContent = value;
+                            if (index === 1) td.title = value;
+                        }
+                        tr.appendChild(td);
+                    });
+                    return tr;
+                }
+
+                function spacer(height) {
+                    const tr = document.createElement('tr');
+                    tr.className = 'spacer';
+                    const td = document.createElement('td');
+                    td.colSpan = headers.length;
+                    td.style.height = height + 'px';
+                    tr.appendChild(td);
+                    return tr;
+                }
+
+                function render() {
+                    framePending = false;
+                    const start = Math.max(0, Math.floor(viewport.scrollTop / rowHeight) - OVERSCAN);
+                    const end = Math.min(view.length, Math.ceil((viewport.scrollTop + viewport.clientHeight) / rowHeight) + OVERSCAN);
+                    const fragment = document.createDocumentFragment();
+                    fragment.appendChild(spacer(start * rowHeight));
+                    for (let k = start; k < end; k++) {
+                        fragment.appendChild(buildRow(view[k]));
+                    }
+                    fragment.appendChild(spacer(Math.max(view.length - end, 0) * rowHeight));
+                    tbody.replaceChildren(fragment);
+
+                    // 以实际渲染出的行高为准，避免样式差异导致滚动位置偏移
+                    if (end > start) {
+                        const measured = tbody.rows[1].getBoundingClientRect().height;
+                        if (measured > 0 && Math.abs(measured - rowHeight) > 0.5) {
+                            rowHeight = measured;
+                            scheduleRender();
+                        }
+                    }
+                }
+
+                function scheduleRender() {
+                    if (!framePending) {
+                        framePending = true;
+                        requestAnimationFrame(render);
+                    }
+                }
+
+                function compare(values, a, b) {
+                    const x = values[a];
+                    const y = values[b];
+                    // 空值始终排在最后
+                    if (x === null || x === undefined) return (y === null || y === undefined) ? a - b : 1;
+                    if (y === null || y === undefined) return -1;
+                    const result = x < y ? -1 : (x > y ? 1 : a - b);
+                    return sortDesc ? -result : result;
+                }
+
+                function applyView() {
+                    const query = searchInput.value.trim().toLowerCase();
+                    const gate = gateFilter.value;
+                    const c = table.columns;
+                    if (query && !searchText) {
+                        searchText = c.number.map((number, i) => ('#' + number + ' ' + c.title[i] + ' ' + c.creator[i]).toLowerCase());
+                    }
+                    view = [];
+                    for (let i = 0; i < table.count; i++) {
+                        if (gate && c.gate[i] !== gate) continue;
+                        if (query && !searchText[i].includes(query)) continue;
+                        view.push(i);
+                    }
+                    if (sortKey) {
+                        const values = c[sortKey];
+                        view.sort((a, b) => compare(values, a, b));
+                    }
+                    countLabel.textContent = '共 ' + view.length + ' / ' + table.count + ' 个PR';
+                    viewport.scrollTop = 0;
+                    scheduleRender();
+                }
+
+                headers.forEach(th => {
+                    th.addEventListener('click', () => {
+                        if (!table) return;
+                        if (sortKey === th.dataset.key) {
+                            sortDesc = !sortDesc;
+                        } else {
+                            sortKey = th.dataset.key;
+                            sortDesc = false;
+                        }
+                        headers.forEach(other => other.removeAttribute('data-sort'));
+                        th.dataset.sort = sortDesc ? 'desc' : 'asc';
+                        applyView();
+                    });
+                });
+                searchInput.addEventListener('input', () => table && applyView());
+                gateFilter.addEventListener('change', () => table && applyView());
+                viewport.addEventListener('scroll', scheduleRender);
+                window.addEventListener('resize', scheduleRender);
+
+                loadData().then(payload => {
+                    table = decode(payload);
+                    applyView();
+                }).catch(error => {
+                    countLabel.textContent = 'PR数据加载失败: ' + error;
+                });
+            })();
+        </script>
+        
         <footer class="footer">
             <p>报告生成时间: $generated_time</p>
             <p>数据来源: GitHub API</p>
@@ -768,12 +1434,420 @@ def generate_html_report(pr_data, metrics):
 </body>
 </html>
 ''')
+
+# 预先切分的模板片段，渲染时按顺序输出，无需再对整个模板做替换
+HTML_TEMPLATE_FRAGMENTS = split_template(HTML_TEMPLATE)
+
+
+def build_pr_table_row(pr):
+    """生成PR表格的一行（列名 -> 值）"""
+    # 格式化合并状态
+    merged_status = "已合并" if pr["merged"] else "未合并"
+    if pr["status"] == "open":
+        merged_status = "Open"
+    
+    return {
+        "number": pr["pr_number"],
+        "url": pr["html_url"],
+        "title": pr["title"],
+        "status": pr["status"],
+        "creator": pr["creator"],
+        "created_at": pr["created_at"],
+        "merged": merged_status,
+        "additions": pr["additions"],
+        "deletions": pr["deletions"],
+        "changed_files": pr["changed_files"],
+        "comments": pr["comments_count"],
+        "review_comments": pr["review_comments_count"],
+        "gate": pr.get("门禁_status", "unknown"),
+        "lint": pr.get("lint_duration"),
+        "pr_test": pr.get("pr_test_duration"),
+        "pr_test_npu": pr.get("pr_test_npu_duration"),
+        "retries": pr.get("gate_retry_count", 0)
+    }
+
+
+def iter_pr_table_rows(pr_data, fragments=None):
+    """逐个生成PR表格行，fragments与pr_data一一对应时未变化的PR直接复用缓存的表格行"""
+    for pr, fragment in zip(pr_data, fragments or [None] * len(pr_data)):
+        yield report_cache.cached_value(fragment, "row", build_pr_table_row, pr)
+
+
+def find_pr_url_prefix(pr_data, fragments=None):
+    """PR链接都是 "前缀 + PR编号" 时返回该前缀（只需保存一次），否则返回None"""
+    prefix = None
+    for row in iter_pr_table_rows(pr_data, fragments):
+        if prefix is None:
+            prefix = row["url"][:len(row["url"]) - len(str(row["number"]))]
+        if row["url"] != f"{prefix}{row['number']}":
+            return None
+    return prefix
+
+
+def iter_pr_table_columns(pr_data, fragments=None, url_prefix=None):
+    """逐列生成 (列名, 列数据)，低基数的文本列做字典编码；每次只构造一列，不同时持有整张表的列数据
+
+    url_prefix不为None时省略url列，页面用前缀和PR编号拼出链接
+    """
+    for name, dictionary_encoded in PR_TABLE_COLUMNS:
+        if name == "url" and url_prefix is not None:
+            continue
+        values = [row[name] for row in iter_pr_table_rows(pr_data, fragments)]
+        if dictionary_encoded:
+            dictionary = {}
+            codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+            yield name, {"dict": list(dictionary), "codes": codes}
+        else:
+            yield name, {"values": values}
+
+
+def iter_pr_table_payload(pr_data, fragments=None):
+    """按列逐块生成PR表格的JSON数据（可直接内嵌到<script>标签中）"""
+    url_prefix = find_pr_url_prefix(pr_data, fragments)
+    yield f'{{"count":{len(pr_data)},"url_prefix":{to_script_json(url_prefix)},"columns":'
+    yield from iter_json_payload(iter_pr_table_columns(pr_data, fragments, url_prefix))
+    yield "}"
+
+
+def build_duration_series(duration_stats):
+    """从执行时长统计中提取Lint和PR Test (NPU)的完整时间序列"""
+    series = {
+        "lint": {"labels": [], "values": []},
+        "pr_test_npu": {"labels": [], "values": []}
+    }
+    for date_label, duration_data in duration_stats:
+        for key in series:
+            if duration_data[key] is not None:
+                series[key]["labels"].append(date_label)
+                series[key]["values"].append(duration_data[key])
+    return series
+
+
+def to_script_json(value):
+    """序列化为紧凑JSON，并转义"</"以便内嵌到<script>标签中"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def iter_json_payload(payload):
+    """按顶层字段逐块生成JSON对象，避免一次性序列化整个数据；payload为字典或逐个生成 (字段, 值) 的迭代器"""
+    yield "{"
+    for index, (key, value) in enumerate(payload.items() if isinstance(payload, dict) else payload):
+        yield f'{"," if index else ""}{to_script_json(key)}:{to_script_json(value)}'
+    yield "}"
+
+
+def write_json_payload(chunks, data_file, description):
+    """将逐块生成的JSON数据写入单独的文件，供报告页面按需加载"""
+    with open(data_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        for chunk in chunks:
+            f.write(chunk)
+    
+    print(f"{description}已写入: {data_file}")
+    return data_file
+
+
+def iter_count_items(counts, skip_zero=False):
+    """逐项生成分布列表（门禁重试次数分布、开发者重试次数、创建者分布）"""
+    for name, count in counts.items():
+        if skip_zero and count <= 0:
+            continue
+        yield f"""
+        <div class="creator-item">
+            <span class="creator-name">{html.escape(str(name))}</span>
+            <span class="creator-count">{count}</span>
+        </div>
+        """
+
+
+def iter_table_rows(rows, colspan, empty_message):
+    """逐行写出表格内容，一行都没有时写出一行提示"""
+    empty = True
+    for row in rows:
+        empty = False
+        yield row
+    if empty:
+        yield f"""
+        <tr>
+            <td colspan="{colspan}">{empty_message}</td>
+        </tr>
+        """
+
+
+def iter_duration_alert_items(alerts):
+    """逐行生成CI执行时长回归告警（最新的告警排在前面）"""
+    for alert in reversed(alerts):
+        yield f"""
+        <tr>
+            <td>{alert['workflow']}</td>
+            <td>{alert['start_time']}</td>
+            <td><a href="https://github.com/sgl-project/sglang/pull/{alert['start_pr_number']}" target="_blank">#{alert['start_pr_number']}</a></td>
+            <td>{(alert.get('start_head_sha') or '-')[:7]}</td>
+            <td>{alert['detected_time']}</td>
+            <td>{format_duration(alert['baseline_duration'])}</td>
+            <td>{format_duration(alert['regressed_duration'])}</td>
+            <td>+{alert['increase_pct']}%</td>
+        </tr>
+        """
+
+
+def iter_snapshot_metric_items(diff):
+    """逐行生成与上一份快照相比的指标变化"""
+    for name, label in SNAPSHOT_METRIC_NAMES.items():
+        change = diff["metrics"][name]
+        formatter = format_duration if name.endswith("_duration") else str
+        delta = change["delta"]
+        if delta is None:
+            delta_text = "-"
+        elif name.endswith("_duration"):
+            delta_text = ("+" if delta >= 0 else "-") + format_duration(abs(delta))
+        else:
+            delta_text = f"{delta:+}"
+        yield f"""
+        <tr>
+            <td>{label}</td>
+            <td>{formatter(change['old'])}</td>
+            <td>{formatter(change['new'])}</td>
+            <td>{delta_text}</td>
+        </tr>
+        """
+
+
+def iter_snapshot_pr_items(diff):
+    """逐行生成与上一份快照相比发生变化的PR
+
+    门禁状态变化、重试增加、执行变慢的PR排在前面，其次是新增和移除的PR
+    """
+    rows = [row for row in diff["changed"] if row["kinds"]]
+    rows += [dict(pr, kinds=["新增PR"], changes={}) for pr in diff["added"]]
+    rows += [dict(pr, kinds=["移除PR"], changes={}) for pr in diff["removed"]]
+    rows += [row for row in diff["changed"] if not row["kinds"]]
+    for row in rows[:SNAPSHOT_DIFF_MAX_ROWS]:
+        change_text = "；".join(
+            f"{field}: {change['old']} → {change['new']}" for field, change in row["changes"].items()
+        ) or "-"
+        yield f"""
+        <tr>
+            <td><a href="{row['html_url']}" target="_blank">#{row['pr_number']}</a></td>
+            <td>{html.escape(row['title'] or '')}</td>
+            <td>{"、".join(SNAPSHOT_CHANGE_KINDS.get(kind, kind) for kind in row['kinds']) or "其他字段变化"}</td>
+            <td>{change_text}</td>
+        </tr>
+        """
+
+
+def iter_flaky_check_items(flaky_checks):
+    """逐行生成Flaky Check排行（按重跑消耗的runner时长排序）"""
+    for check in flaky_checks:
+        yield f"""
+        <tr>
+            <td>{html.escape(check['name'])}</td>
+            <td>{check['flake_score']}</td>
+            <td>{check['flaky_groups']} / {check['groups']}</td>
+            <td>{check['failed_groups']}</td>
+            <td>{check['rerun_count']}</td>
+            <td>{format_duration(check['rerun_seconds'])}</td>
+        </tr>
+        """
+
+
+def iter_critical_stage_items(stages):
+    """逐行生成门禁关键路径上各阶段的统计"""
+    for stage in stages:
+        yield f"""
+        <tr>
+            <td>{stage['name']}</td>
+            <td>{stage['on_path_pct']}%</td>
+            <td>{stage['critical_share_pct']}%</td>
+            <td>{format_duration(stage['run']['p50'])} / {format_duration(stage['run']['p90'])}</td>
+            <td>{format_duration(stage['gap']['p50'])} / {format_duration(stage['gap']['p90'])}</td>
+        </tr>
+        """
+
+
+def iter_latency_items(latency_stats):
+    """逐行生成推送到全绿、全绿到合入等时延分布"""
+    if not latency_stats:
+        return
+    yield format_distribution_row("每次推送 → 首次全绿", latency_stats["push_to_green"])
+    yield format_distribution_row("首次推送 → 首次全绿", latency_stats["first_push_to_green"])
+    yield format_distribution_row("达到全绿所需推送次数", latency_stats["pushes_to_green"], str)
+    yield format_distribution_row("最终全绿 → 合入", latency_stats["green_to_merge"])
+    yield format_distribution_row(
+        "生命周期中等待CI占比", latency_stats["ci_wait_share"], lambda value: f"{value}%"
+    )
+
+
+def iter_review_items(review_stats):
+    """逐行生成评审时延分布"""
+    if not review_stats.get("reviewed_count"):
+        return
+    yield format_distribution_row("创建 → 首次评审", review_stats["time_to_first_review"])
+    yield format_distribution_row("首次请求评审 → 首次评审", review_stats["request_to_first_review"])
+    yield format_distribution_row("评审轮数", review_stats["review_rounds"], str)
+    yield format_distribution_row("每个PR的评审数", review_stats["reviews_per_pr"], str)
+    yield format_distribution_row("每个PR的评审评论数", review_stats["comments_per_pr"], str)
+    yield format_distribution_row("每个评审人评审过的PR数", review_stats["reviewed_prs_per_reviewer"], str)
+
+
+def iter_reviewer_load_items(reviewer_load):
+    """逐行生成评审人负载"""
+    for item in reviewer_load[:REVIEWER_LOAD_MAX_ROWS]:
+        yield f"""
+        <tr>
+            <td>{html.escape(item['reviewer'])}</td>
+            <td>{item['reviewed_prs']}</td>
+            <td>{item['reviews']}</td>
+            <td>{item['requested_prs']}</td>
+            <td>{item['pending']}</td>
+        </tr>
+        """
+
+
+def iter_runner_cost_items(runner_usage):
+    """逐行生成按PR、开发者、标签和Workflow类别归属的runner耗时"""
+    runner_cost_sections = [
+        ("PR", runner_usage.get("top_prs", [])),
+        ("开发者", runner_usage.get("top_creators", [])),
+        ("标签", runner_usage.get("top_labels", [])),
+        ("Workflow类别", runner_usage.get("categories", []))
+    ]
+    for group_name, rows in runner_cost_sections:
+        for row in rows:
+            key = f"#{row['key']}" if group_name == "PR" else html.escape(str(row["key"]))
+            yield f"""
+        <tr>
+            <td>{group_name}</td>
+            <td>{key}</td>
+            <td>{format_duration(row['npu_minutes'] * 60)}</td>
+            <td>{format_duration(row['minutes'] * 60)}</td>
+            <td>{format_duration(row['rerun_minutes'] * 60)}</td>
+            <td>{format_duration(row['superseded_minutes'] * 60)}</td>
+        </tr>
+        """
+
+
+def build_report_context(pr_data, metrics, pr_table_data_src="", duration_chart_data_src="",
+                         chart_max_points=chart_downsample.CHART_MAX_POINTS, fragments=None,
+                         chart_js_src=CHART_JS_CDN_URL, report_data_script_src="", report_scope=""):
+    """准备报告模板中各占位符的内容，PR表格等随数据量增长的部分以生成器形式提供，渲染时边生成边写出
+
+    pr_table_data_src / duration_chart_data_src不为空时，PR表格数据 / 执行时长完整序列由页面从该地址加载，不内嵌到报告中；
+    report_data_script_src不为空时两者都由该脚本提供（离线包）；report_scope为报告范围（批量生成的报告变体名称）
+    """
+    external_data = bool(report_data_script_src)
+    # 格式化时长指标
+    avg_lint_duration_formatted = format_duration(metrics["avg_lint_duration"])
+    avg_pr_test_duration_formatted = format_duration(metrics["avg_pr_test_duration"])
+    avg_pr_test_npu_duration_formatted = format_duration(metrics["avg_pr_test_npu_duration"])
+
+    # 与上一份快照相比的变化概览
+    diff = metrics.get("snapshot_diff")
+    if diff:
+        snapshot_diff_title = (
+            f"{diff['old_snapshot']} → {diff['new_snapshot']}：新增 {len(diff['added'])} 个PR，"
+            f"移除 {len(diff['removed'])} 个PR，变化 {len(diff['changed'])} 个PR"
+            f"（门禁状态变化 {diff['gate_changed_count']}，重试增加 {diff['retry_increased_count']}，"
+            f"执行变慢 {diff['slower_count']}）"
+        )
+    else:
+        snapshot_diff_title = "数据目录中没有更早的快照，暂无对比"
+
+    # 生成门禁关键路径分析
+    critical_path_stats = metrics.get("critical_path_stats") or {}
+    gate_latency = critical_path_stats.get("gate_latency", {})
+    critical_path_summary = {
+        "pr_count": critical_path_stats.get("pr_count", 0),
+        "gate_latency_p50": format_duration(gate_latency.get("p50")),
+        "gate_latency_p90": format_duration(gate_latency.get("p90")),
+        "idle_share_pct": critical_path_stats.get("idle_share_pct", "-"),
+        "parallel_share_pct": critical_path_stats.get("parallel_share_pct", "-"),
+        "avg_concurrency": critical_path_stats.get("avg_concurrency", "-")
+    }
+
+    # 评审概览
+    review_stats = metrics.get("review_stats") or {}
+    review_summary = {
+        "reviewed_pr_count": review_stats.get("reviewed_count", 0),
+        "first_review_p50": format_duration((review_stats.get("time_to_first_review") or {}).get("p50")),
+        "review_rounds_mean": (review_stats.get("review_rounds") or {}).get("mean") or "-",
+        "pending_review_count": review_stats.get("pending_count", 0),
+        "top_reviewer_share": f"{review_stats['top_reviewer_share']} %"
+        if review_stats.get("top_reviewer_share") is not None else "-"
+    }
+
+    # runner耗时概览与NPU容量视图
+    runner_usage = metrics.get("runner_usage") or {}
+    runner_totals = runner_usage.get("totals", {})
+    runner_summary = {
+        "npu_hours": round(runner_totals.get("npu_minutes", 0) / 60, 1),
+        "total_hours": round(runner_totals.get("minutes", 0) / 60, 1),
+        "rerun_share_pct": round(runner_totals["rerun_minutes"] / runner_totals["minutes"] * 100, 1)
+        if runner_totals.get("minutes") else 0,
+        "superseded_share_pct": round(runner_totals["superseded_minutes"] / runner_totals["minutes"] * 100, 1)
+        if runner_totals.get("minutes") else 0,
+        "npu_runner_count": runner_usage.get("npu_runner_count", "-")
+    }
+    daily_capacity = runner_usage.get("daily_capacity", [])
+    npu_capacity_dates_json = json.dumps([item["day"] for item in daily_capacity])
+    npu_capacity_hours_json = json.dumps([item["npu_hours"] for item in daily_capacity])
+    npu_capacity_limit_json = json.dumps([item["capacity_hours"] for item in daily_capacity])
+
+    # 准备提交与失败趋势图数据
+    # 1. 计算按日期分组的提交PR数和失败PR数
+    date_data = {}
+    for pr in pr_data:
+        created_date = pr["created_at"][:10]  # 提取日期部分（YYYY-MM-DD）
+        
+        if created_date not in date_data:
+            date_data[created_date] = {
+                "total": 0,
+                "failed": 0
+            }
+        
+        # 统计提交PR数
+        date_data[created_date]["total"] += 1
+        
+        # 统计失败PR数（已关闭但未合并）
+        if pr["status"] == "closed" and not pr["merged"]:
+            date_data[created_date]["failed"] += 1
+    
+    # 2. 转换为有序列表
+    sorted_dates = sorted(date_data.items())
+    
+    # 3. 提取日期、提交数和失败数
+    chart_dates = [date for date, _ in sorted_dates]
+    chart_total = [data["total"] for _, data in sorted_dates]
+    chart_failed = [data["failed"] for _, data in sorted_dates]
     
-    # 使用Template.substitute方法格式化HTML内容
-    html_content = html_template.substitute(
+    # 4. 转换为JSON格式
+    chart_dates_json = json.dumps(chart_dates)
+    chart_total_json = json.dumps(chart_total)
+    chart_failed_json = json.dumps(chart_failed)
+    
+    # 准备执行时长趋势图数据：降采样后绘制，完整序列供页面放大时加载
+    duration_series = build_duration_series(metrics["duration_stats"])
+    lint_chart = chart_downsample.downsample_series(
+        duration_series["lint"]["labels"], duration_series["lint"]["values"], chart_max_points
+    )
+    pr_test_chart = chart_downsample.downsample_series(
+        duration_series["pr_test_npu"]["labels"], duration_series["pr_test_npu"]["values"], chart_max_points
+    )
+    lint_chart_dates_json = json.dumps(lint_chart["labels"])
+    lint_chart_duration_json = json.dumps(lint_chart["values"])
+    lint_chart_index_json = json.dumps(lint_chart["index"])
+    pr_test_chart_dates_json = json.dumps(pr_test_chart["labels"])
+    pr_test_chart_duration_json = json.dumps(pr_test_chart["values"])
+    pr_test_chart_index_json = json.dumps(pr_test_chart["index"])
+    
+    # 生成时间
+    generated_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    return dict(
         generated_time=generated_time,
-        pr_table_rows=pr_table_rows,
-        creator_items=creator_items,
+        report_scope=f" | 范围: {html.escape(report_scope)}" if report_scope else "",
+        pr_table_data=iter_pr_table_payload(pr_data, fragments) if not (pr_table_data_src or external_data) else "",
+        pr_table_data_src=pr_table_data_src,
+        creator_items=iter_count_items(metrics["creator_stats"]),
         total_prs=metrics["total_prs"],
         open_pr_count=metrics["open_pr_count"],
         run_ci_pr_count=metrics["run_ci_pr_count"],
@@ -782,18 +1856,162 @@ def generate_html_report(pr_data, metrics):
         avg_pr_test_duration_formatted=avg_pr_test_duration_formatted,
         avg_pr_test_npu_duration_formatted=avg_pr_test_npu_duration_formatted,
         avg_gate_retry_count=metrics["avg_gate_retry_count"],
-        gate_retry_distribution_items=gate_retry_distribution_items,
-        creator_retry_items=creator_retry_items,
+        gate_retry_distribution_items=iter_count_items(metrics["gate_retry_distribution"]),
+        creator_retry_items=iter_count_items(metrics["creator_retry_stats"], skip_zero=True),
+        snapshot_diff_title=snapshot_diff_title,
+        snapshot_metric_items=iter_snapshot_metric_items(diff) if diff else "",
+        snapshot_pr_items=iter_table_rows(iter_snapshot_pr_items(diff) if diff else [], 4, "没有发生变化的PR"),
+        duration_alert_items=iter_table_rows(
+            iter_duration_alert_items(metrics.get("duration_alerts", [])), 8, "未检测到CI执行时长回归"
+        ),
+        flaky_check_items=iter_table_rows(
+            iter_flaky_check_items(metrics.get("flaky_checks", [])), 6, "暂无check重跑记录"
+        ),
+        critical_path_pr_count=critical_path_summary["pr_count"],
+        gate_latency_p50=critical_path_summary["gate_latency_p50"],
+        gate_latency_p90=critical_path_summary["gate_latency_p90"],
+        gate_idle_share_pct=critical_path_summary["idle_share_pct"],
+        gate_parallel_share_pct=critical_path_summary["parallel_share_pct"],
+        gate_avg_concurrency=critical_path_summary["avg_concurrency"],
+        critical_stage_items=iter_table_rows(
+            iter_critical_stage_items(critical_path_stats.get("stages", [])), 5, "暂无已通过门禁的执行时间线"
+        ),
+        latency_items=iter_table_rows(
+            iter_latency_items(metrics.get("latency_stats") or {}), 8, "暂无推送与check执行记录"
+        ),
+        reviewed_pr_count=review_summary["reviewed_pr_count"],
+        first_review_p50=review_summary["first_review_p50"],
+        review_rounds_mean=review_summary["review_rounds_mean"],
+        pending_review_count=review_summary["pending_review_count"],
+        top_reviewer_share=review_summary["top_reviewer_share"],
+        review_items=iter_table_rows(iter_review_items(review_stats), 8, "暂无评审记录"),
+        reviewer_load_items=iter_table_rows(
+            iter_reviewer_load_items(review_stats.get("reviewer_load", [])), 5, "暂无评审人数据"
+        ),
+        npu_runner_hours=runner_summary["npu_hours"],
+        total_runner_hours=runner_summary["total_hours"],
+        runner_rerun_share_pct=runner_summary["rerun_share_pct"],
+        runner_superseded_share_pct=runner_summary["superseded_share_pct"],
+        npu_runner_count=runner_summary["npu_runner_count"],
+        runner_cost_items=iter_table_rows(iter_runner_cost_items(runner_usage), 6, "暂无job执行记录"),
+        npu_capacity_dates_json=npu_capacity_dates_json,
+        npu_capacity_hours_json=npu_capacity_hours_json,
+        npu_capacity_limit_json=npu_capacity_limit_json,
         chart_dates_json=chart_dates_json,
         chart_total_json=chart_total_json,
         chart_failed_json=chart_failed_json,
         lint_chart_dates_json=lint_chart_dates_json,
         lint_chart_duration_json=lint_chart_duration_json,
         pr_test_chart_dates_json=pr_test_chart_dates_json,
-        pr_test_chart_duration_json=pr_test_chart_duration_json
+        pr_test_chart_duration_json=pr_test_chart_duration_json,
+        lint_chart_index_json=lint_chart_index_json,
+        pr_test_chart_index_json=pr_test_chart_index_json,
+        chart_max_points=chart_max_points,
+        duration_chart_data=iter_json_payload(duration_series) if not (duration_chart_data_src or external_data) else "",
+        duration_chart_data_src=duration_chart_data_src,
+        chart_js_src=chart_js_src,
+        report_data_script=f'<script src="{report_data_script_src}"></script>' if external_data else ""
+    )
+
+
+def render_report(write, context, fragments=HTML_TEMPLATE_FRAGMENTS):
+    """按模板片段顺序写出报告：字面文本直接写出，占位符内容为生成器时逐块写出"""
+    for literal, name in fragments:
+        write(literal)
+        if name is None:
+            continue
+        value = context[name]
+        if isinstance(value, str):
+            write(value)
+        elif hasattr(value, "__next__"):
+            for chunk in value:
+                write(chunk)
+        else:
+            write(str(value))
+
+
+def generate_html_report(pr_data, metrics):
+    """生成HTML报告（返回完整字符串）"""
+    parts = []
+    render_report(parts.append, build_report_context(pr_data, metrics))
+    return "".join(parts)
+
+
+def side_data_files(output_file):
+    """report_data为"file"时报告旁的数据文件：(PR表格数据, 执行时长完整序列)"""
+    output_stem = os.path.splitext(output_file)[0]
+    return f"{output_stem}.prs.json", f"{output_stem}.durations.json"
+
+
+def write_html_report(pr_data, metrics, output_file, report_data="inline",
+                      chart_max_points=chart_downsample.CHART_MAX_POINTS, fragments=None, report_scope=""):
+    """流式生成HTML报告并通过缓冲写入文件，内存占用不随PR数量增长
+
+    report_data为"file"时，PR表格数据和执行时长完整序列分别写入报告旁的
+    <报告名>.prs.json 和 <报告名>.durations.json，页面需要时再获取
+    """
+    pr_table_data_src = ""
+    duration_chart_data_src = ""
+    if report_data == "file":
+        pr_table_file, duration_chart_file = side_data_files(output_file)
+        pr_table_data_src = os.path.basename(write_json_payload(
+            iter_pr_table_payload(pr_data, fragments), pr_table_file, "PR表格数据"
+        ))
+        duration_chart_data_src = os.path.basename(write_json_payload(
+            iter_json_payload(build_duration_series(metrics["duration_stats"])),
+            duration_chart_file, "执行时长完整序列"
+        ))
+    
+    context = build_report_context(
+        pr_data, metrics, pr_table_data_src, duration_chart_data_src, chart_max_points, fragments,
+        report_scope=report_scope
+    )
+    with open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        render_report(f.write, context)
+    
+    print(f"PR效率报告已生成: {output_file}")
+    return output_file
+
+
+def iter_report_data_script(pr_data, metrics, fragments=None):
+    """逐块生成离线包的数据脚本：window.REPORT_DATA = {PR表格数据, 执行时长完整序列}"""
+    yield 'window.REPORT_DATA={"pr_table":'
+    yield from iter_pr_table_payload(pr_data, fragments)
+    yield ',"duration_chart":'
+    yield from iter_json_payload(build_duration_series(metrics["duration_stats"]))
+    yield "};\n"
+
+
+def write_report_bundle(pr_data, metrics, bundle_dir, chart_js_file=None,
+                        chart_max_points=chart_downsample.CHART_MAX_POINTS, fragments=None):
+    """生成离线报告包：index.html + 带内容哈希的Chart.js和数据脚本，并为各文件生成预压缩副本
+
+    chart_js_file为空时使用vendor目录中的Chart.js（不存在时下载一次）
+    """
+    assets_dir = report_bundle.prepare_bundle_dir(bundle_dir)
+    chart_js_name = report_bundle.copy_hashed(
+        chart_js_file or report_bundle.vendor_asset(), assets_dir, "chart", ".min.js"
+    )
+    data_name = report_bundle.write_hashed(
+        iter_report_data_script(pr_data, metrics, fragments), assets_dir, "data", ".js"
     )
     
-    return html_content
+    index_file = os.path.join(bundle_dir, "index.html")
+    context = build_report_context(
+        pr_data, metrics, chart_max_points=chart_max_points, fragments=fragments,
+        chart_js_src=f"{report_bundle.ASSETS_DIR_NAME}/{chart_js_name}",
+        report_data_script_src=f"{report_bundle.ASSETS_DIR_NAME}/{data_name}"
+    )
+    with open(index_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        render_report(f.write, context)
+    
+    report_bundle.finalize_bundle(bundle_dir, [
+        index_file,
+        os.path.join(assets_dir, chart_js_name),
+        os.path.join(assets_dir, data_name)
+    ])
+    print(f"离线报告包已生成: {index_file}")
+    return index_file
 
 
 def save_html_report(html_content, output_file):
@@ -814,26 +2032,127 @@ def main():
         default=HTML_OUTPUT_FILE,
         help=f"HTML输出文件名 (默认: {HTML_OUTPUT_FILE})"
     )
+    parser.add_argument(
+        "--regression-output",
+        default=duration_regression.ALERTS_FILE,
+        help=f"CI执行时长回归告警输出文件 (默认: {duration_regression.ALERTS_FILE})"
+    )
+    parser.add_argument(
+        "--npu-runner-count",
+        type=int,
+        default=runner_cost.NPU_RUNNER_COUNT,
+        help=f"可用NPU runner数量，用于计算每日容量 (默认: {runner_cost.NPU_RUNNER_COUNT})"
+    )
+    parser.add_argument(
+        "--report-data",
+        choices=("inline", "file"),
+        default="inline",
+        help="PR详情表格数据和执行时长完整序列内嵌到报告中(inline)，或写入报告旁的JSON文件由页面加载(file，需通过HTTP访问报告) (默认: inline)"
+    )
+    parser.add_argument(
+        "--chart-max-points",
+        type=int,
+        default=chart_downsample.CHART_MAX_POINTS,
+        help=f"执行时长趋势图每条曲线最多绘制的点数，超出时做min/max降采样 (默认: {chart_downsample.CHART_MAX_POINTS})"
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="检测到新的CI执行时长回归时以非0状态退出"
+    )
+    parser.add_argument(
+        "--bundle",
+        metavar="DIR",
+        help="同时在该目录生成离线报告包（index.html + 带内容哈希的Chart.js和数据脚本 + .gz/.br预压缩副本），不依赖CDN"
+    )
+    parser.add_argument(
+        "--chart-js",
+        metavar="FILE",
+        help=f"离线报告包使用的本地Chart.js文件 (默认: {report_bundle.CHART_JS_FILE}，不存在时自动下载)"
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="FILE",
+        help="同时将指标以OpenMetrics格式写入该文件，供node-exporter的textfile collector采集（例如 /var/lib/node_exporter/textfile/pr_efficiency.prom）"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="忽略报告渲染缓存，强制重新生成报告"
+    )
     args = parser.parse_args()
     
     try:
+        # 输入数据、代码和生成参数都未变化时直接复用上次生成的报告
+        data_file = find_latest_pr_data_file()
+        code_dir = os.path.dirname(os.path.abspath(__file__))
+        previous_file = snapshot_diff.find_previous_snapshot(data_file, os.path.dirname(data_file))
+        render_key = report_cache.compute_render_key(data_file, code_dir, {
+            "output": args.output,
+            "regression_output": args.regression_output,
+            "npu_runner_count": args.npu_runner_count,
+            "report_data": args.report_data,
+            "chart_max_points": args.chart_max_points,
+            "bundle": args.bundle,
+            "metrics_textfile": args.metrics_textfile,
+            "chart_js": args.chart_js and report_cache.file_sha256(args.chart_js),
+            "previous_snapshot": previous_file and report_cache.file_sha256(previous_file)
+        })
+        output_files = [args.output]
+        if args.report_data == "file":
+            output_files.extend(side_data_files(args.output))
+        if args.bundle:
+            output_files.append(os.path.join(args.bundle, "index.html"))
+        if args.metrics_textfile:
+            output_files.append(args.metrics_textfile)
+        if not args.no_cache and report_cache.is_render_cached(render_key, output_files):
+            # 输入数据未变化时增量检测不会产生新告警，上次的新增告警已报告过，需清空以免CI重复失败
+            duration_regression.clear_new_alerts(args.regression_output)
+            print(f"输入数据与代码均未变化，跳过生成，沿用已有报告: {args.output}")
+            return
+        
         # 加载最新PR数据
-        pr_data = load_latest_pr_data()
+        pr_data = load_latest_pr_data(data_file)
+        
+        # 按PR记录哈希复用未变化PR的分析结果和表格行
+        fragment_cache = report_cache.load_fragment_cache()
+        fragment_entries = report_cache.get_pr_fragments(fragment_cache, pr_data, report_cache.code_version(code_dir))
+        fragments = [fragment for _, fragment in fragment_entries]
         
-        # 计算PR指标
-        metrics = calculate_pr_metrics(pr_data)
+        # 计算PR指标（含增量更新的回归告警、flaky统计和runner耗时账本）
+        metrics, new_alerts = compute_report_metrics(
+            pr_data, fragments, args.regression_output, args.npu_runner_count, data_file
+        )
         
-        # 生成HTML报告
-        html_content = generate_html_report(pr_data, metrics)
+        # 流式生成并保存HTML报告
+        write_html_report(
+            pr_data, metrics, args.output,
+            report_data=args.report_data, chart_max_points=args.chart_max_points, fragments=fragments
+        )
         
-        # 保存HTML报告
-        save_html_report(html_content, args.output)
+        # 生成离线报告包
+        if args.bundle:
+            write_report_bundle(
+                pr_data, metrics, args.bundle, args.chart_js,
+                chart_max_points=args.chart_max_points, fragments=fragments
+            )
+        
+        # 导出OpenMetrics指标
+        if args.metrics_textfile:
+            metrics_exporter.write_textfile(metrics_exporter.build_openmetrics(metrics), args.metrics_textfile)
+        
+        # 更新渲染缓存
+        report_cache.save_fragment_cache(fragment_cache, fragment_entries)
+        report_cache.record_render(render_key, output_files)
         
     except Exception as e:
         print(f"发生错误: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    if args.fail_on_regression and new_alerts:
+        sys.exit(2)
 
 
 if __name__ == "__main__":
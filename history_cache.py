@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+PR历史数据缓存
+
+功能：缓存PR的提交、评审、评审请求历史以及各提交上的check执行记录、workflow run和job，
+PR未更新或提交上的check已全部完成时直接复用，减少每次运行的API调用
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+CACHE_FILE = os.path.join(DATA_DIR, "history_cache.json")  # 缓存文件
+CACHE_VERSION = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+CACHE_RETENTION_DAYS = 30  # 超过该天数未使用的缓存条目会被清理
+HISTORY_FIELDS = ("commits", "reviews", "review_requests", "review_request_removals")  # PR历史条目应包含的字段
+
+
+def _now():
+    """当前UTC时间字符串"""
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def load_history_cache(cache_file=CACHE_FILE):
+    """加载缓存，不存在或版本不一致时返回空缓存"""
+    if os.path.exists(cache_file):
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            cache.setdefault("workflow_jobs", {})
+            return cache
+        print(f"缓存文件 {cache_file} 版本不一致，将重新获取历史数据")
+
+    return {
+        "version": CACHE_VERSION,
+        "prs": {},  # PR编号 -> 提交和评审历史
+        "check_runs": {},  # 提交SHA -> check执行记录
+        "workflow_jobs": {}  # 提交SHA -> workflow run和job
+    }
+
+
+def save_history_cache(cache, cache_file=CACHE_FILE):
+    """清理过期条目后保存缓存"""
+    expire_before = (datetime.now(timezone.utc) - timedelta(days=CACHE_RETENTION_DAYS)).strftime(TIME_FORMAT)
+    for section in ("prs", "check_runs", "workflow_jobs"):
+        cache[section] = {
+            key: entry for key, entry in cache[section].items() if entry.get("used_at", "") >= expire_before
+        }
+
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+
+def has_cached_history(cache, pr_number, updated_at):
+    """缓存中是否有PR可复用的历史（不更新使用时间，用于估算采集成本）；
+    PR在缓存之后有更新、或缓存条目缺少字段（旧版本写入）时为False"""
+    entry = cache["prs"].get(str(pr_number))
+    if not entry or not updated_at or entry.get("updated_at") != updated_at:
+        return False
+    return all(field in entry["history"] for field in HISTORY_FIELDS)
+
+
+def get_cached_history(cache, pr_number, updated_at):
+    """获取PR的提交、评审和评审请求历史，没有可复用的缓存时返回None"""
+    if not has_cached_history(cache, pr_number, updated_at):
+        return None
+    entry = cache["prs"][str(pr_number)]
+    entry["used_at"] = _now()
+    return entry["history"]
+
+
+def put_history(cache, pr_number, updated_at, history):
+    """写入PR的提交、评审和评审请求历史"""
+    cache["prs"][str(pr_number)] = {
+        "updated_at": updated_at,
+        "used_at": _now(),
+        "history": history
+    }
+
+
+def get_cached_check_runs(cache, sha):
+    """获取提交上已经全部完成、不会再变化的check执行记录，不存在时返回None"""
+    entry = cache["check_runs"].get(sha)
+    if not entry:
+        return None
+    entry["used_at"] = _now()
+    return entry["attempts"]
+
+
+def put_check_runs(cache, sha, attempts):
+    """写入提交上的check执行记录（只应写入已不会再变化的提交）"""
+    cache["check_runs"][sha] = {
+        "used_at": _now(),
+        "attempts": attempts
+    }
+
+
+def get_cached_workflow_jobs(cache, sha):
+    """获取提交上已经全部完成的workflow run和job，不存在时返回None"""
+    entry = cache["workflow_jobs"].get(sha)
+    if not entry:
+        return None
+    entry["used_at"] = _now()
+    return entry
+
+
+def put_workflow_jobs(cache, sha, runs, jobs):
+    """写入提交上的workflow run和job（只应写入已不会再变化的提交）"""
+    cache["workflow_jobs"][sha] = {
+        "used_at": _now(),
+        "runs": runs,
+        "jobs": jobs
+    }
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+JSON流式解析
+
+功能：边读取边解析大型JSON（快照文件、API响应），数组元素逐个生成，
+可只保留需要的字段（不需要的字段只扫描跳过、不解码），内存中只保留当前元素附近的内容，不需要先把完整内容读入内存
+"""
+
+import re
+import codecs
+import json
+
+# 配置常量
+READ_CHUNK_SIZE = 64 * 1024  # 每次读取的字符数（API响应每次读取的字节数）
+WHITESPACE = " \t\r\n"
+STRUCTURE_PATTERN = re.compile(r'[\[\]{}"]')  # 字符串外需要关注的字符
+STRING_END_PATTERN = re.compile(r'["\\]')  # 字符串内需要关注的字符（结束引号和转义符）
+SCALAR_END_PATTERN = re.compile(r'[\s,\]}:]')  # 数字、true/false/null之后的分隔符
+
+
+class JSONStreamReader:
+    """在按块读取的文本上逐个解析JSON值"""
+
+    def __init__(self, read, chunk_size=READ_CHUNK_SIZE):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        """读入下一块内容（默认chunk_size），丢弃已解析的部分，已读到结尾时返回False"""
+        if self.eof:
+            return False
+        chunk = self.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self, separators=""):
+        """跳过空白（以及指定的分隔符）后返回下一个字符，内容结束时返回空字符串"""
+        skip = WHITESPACE + separators
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        """读取指定的结构字符"""
+        if self.peek() != char:
+            raise ValueError(f"JSON格式错误：期望 {char!r}，位置附近内容为 {self.buffer[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def value_end(self, keep=True):
+        """扫描（不解码）从当前位置开始的JSON值，返回其结束位置
+
+        跨块的值不从头重新扫描，只记录括号深度和是否在字符串内；需要保留的值在缓冲区中越来越大时，
+        每次读入的块大小翻倍，整个值的读入和拼接为线性开销。keep为False时边扫描边丢弃已扫描的内容
+        """
+        first = self.peek()
+        if not first:
+            raise ValueError("JSON格式错误：内容意外结束")
+        scalar = first not in '{["'
+        depth = 1 if first in "{[" else 0
+        in_string = first == '"'
+        scan = self.pos + (1 if first in '{["' else 0)
+        read_size = self.chunk_size
+        while True:
+            buffer = self.buffer
+            while scan < len(buffer):
+                if in_string:
+                    match = STRING_END_PATTERN.search(buffer, scan)
+                    if match is None:
+                        scan = len(buffer)
+                    elif match.group() == "\\":
+                        if match.end() >= len(buffer):
+                            # 转义符位于缓冲区末尾，读入更多内容后从转义符重新扫描
+                            scan = match.start()
+                            break
+                        scan = match.end() + 1
+                    else:
+                        scan = match.end()
+                        in_string = False
+                        if depth == 0:
+                            return scan
+                elif depth == 0:
+                    # 数字、true/false/null：到分隔符为止（数字可能被块边界截断，不能在缓冲区末尾结束）
+                    match = SCALAR_END_PATTERN.search(buffer, scan)
+                    if match is not None:
+                        return match.start()
+                    scan = len(buffer)
+                else:
+                    match = STRUCTURE_PATTERN.search(buffer, scan)
+                    if match is None:
+                        scan = len(buffer)
+                        continue
+                    char = match.group()
+                    scan = match.end()
+                    if char == '"':
+                        in_string = True
+                    elif char in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return scan
+
+            # 缓冲区内容不完整，读入更多内容（fill会丢弃self.pos之前的内容，扫描位置随之平移）
+            if keep:
+                offset = scan - self.pos
+                read_size *= 2
+            else:
+                offset = 0
+                self.pos = scan
+            if not self.fill(read_size):
+                if scalar:
+                    return len(self.buffer)
+                raise ValueError("JSON格式错误：内容意外结束")
+            scan = self.pos + offset
+
+    def value(self):
+        """解析下一个完整的JSON值，内容不完整时继续读入（先找到值的结尾，再一次性解码）"""
+        end = self.value_end()
+        value, decoded_end = self.decoder.raw_decode(self.buffer, self.pos)
+        if decoded_end != end:
+            raise ValueError(f"JSON格式错误：位置附近内容为 {self.buffer[decoded_end:decoded_end + 20]!r}")
+        self.pos = end
+        return value
+
+    def skip_value(self):
+        """跳过下一个JSON值，只扫描不解码"""
+        self.pos = self.value_end(keep=False)
+
+    def object(self, fields):
+        """解析当前位置的对象，只解码fields中的字段，其余字段跳过"""
+        self.expect("{")
+        result = {}
+        if self.peek() == "}":
+            self.pos += 1
+            return result
+        while True:
+            name = self.value()
+            self.expect(":")
+            if name in fields:
+                result[name] = self.value()
+            else:
+                self.skip_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return result
+            if char != ",":
+                raise ValueError(f"JSON格式错误：对象字段之间应为 ','，实际为 {char!r}")
+
+    def iter_array(self, fields=None):
+        """逐个生成当前位置数组的元素；指定fields时对象元素只解码这些字段"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            if fields is not None and self.peek() == "{":
+                yield self.object(fields)
+            else:
+                yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON格式错误：数组元素之间应为 ','，实际为 {char!r}")
+
+    def iter_object_array(self, key, fields=None):
+        """逐个生成顶层对象中指定字段（数组）的元素，其他字段只扫描跳过"""
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            name = self.value()
+            self.expect(":")
+            if name == key:
+                yield from self.iter_array(fields)
+            else:
+                self.skip_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"JSON格式错误：对象字段之间应为 ','，实际为 {char!r}")
+
+
+def project(item, fields):
+    """只保留指定的字段（不存在的字段不补空值）"""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """逐条解析顶层为数组的JSON文件"""
+    yield from JSONStreamReader(f.read, chunk_size).iter_array()
+
+
+def response_reader(response, chunk_size=READ_CHUNK_SIZE):
+    """将流式HTTP响应（stream=True，按Content-Encoding自动解压）转换为按块读取文本的函数"""
+    chunks = response.iter_content(chunk_size)
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+
+    def read(_size):
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                return text
+        return decoder.decode(b"", final=True)
+
+    return read
+
+
+def iter_response_items(response, item_key=None, fields=None):
+    """边接收边解析API响应中的列表，只保留需要的字段；item_key为列表所在的字段名（响应直接是列表时为None）"""
+    reader = JSONStreamReader(response_reader(response))
+    try:
+        items = reader.iter_object_array(item_key, fields) if item_key else reader.iter_array(fields)
+        for item in items:
+            yield project(item, fields)
+    finally:
+        response.close()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics指标导出
+
+功能：将calculate_pr_metrics计算好的PR效率指标转换为OpenMetrics文本格式
+（门禁成功率、重试次数分布、各类CI执行时长直方图、open PR数量、run-ci PR数量等），
+可原子写入node-exporter的textfile目录，或由看板服务的 /metrics 接口直接返回预先生成的文本
+"""
+
+import os
+import time
+
+from duration_regression import CATEGORIES
+
+# 配置常量
+METRIC_PREFIX = "pr_efficiency"
+# CI执行时长直方图的桶上界（秒）
+DURATION_BUCKETS = (60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200, 10800)
+# 重试次数分布的区间名称 -> 指标标签值
+RETRY_RANGE_LABELS = {"0次": "0", "1-2次": "1-2", "3-5次": "3-5", ">5次": "gt5"}
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label_value(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value):
+    """格式化样本值，整数不带小数点"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def format_sample(name, value, labels=None):
+    """生成一行样本"""
+    if labels:
+        label_text = ",".join(f'{key}="{escape_label_value(val)}"' for key, val in labels.items())
+        return f"{name}{{{label_text}}} {format_value(value)}"
+    return f"{name} {format_value(value)}"
+
+
+def metric_family(lines, name, metric_type, help_text, unit=None):
+    """写入指标族的元数据行"""
+    lines.append(f"# TYPE {name} {metric_type}")
+    if unit:
+        lines.append(f"# UNIT {name} {unit}")
+    lines.append(f"# HELP {name} {help_text}")
+
+
+def duration_histograms(duration_stats):
+    """按workflow类别统计CI执行时长直方图：{类别: (累计桶计数, 样本数, 总时长)}"""
+    histograms = {}
+    for category in CATEGORIES:
+        values = [entry[category] for _, entry in duration_stats if entry.get(category) is not None]
+        bucket_counts = [sum(1 for value in values if value <= bound) for bound in DURATION_BUCKETS]
+        histograms[category] = (bucket_counts, len(values), sum(values))
+    return histograms
+
+
+def build_openmetrics(metrics, generated_at=None):
+    """将计算好的PR效率指标转换为OpenMetrics文本"""
+    lines = []
+
+    name = f"{METRIC_PREFIX}_prs"
+    metric_family(lines, name, "gauge", "Number of PRs in the current data window")
+    lines.append(format_sample(name, metrics.get("total_prs", 0)))
+
+    name = f"{METRIC_PREFIX}_open_prs"
+    metric_family(lines, name, "gauge", "Number of open PRs")
+    lines.append(format_sample(name, metrics.get("open_pr_count", 0)))
+
+    name = f"{METRIC_PREFIX}_run_ci_prs"
+    metric_family(lines, name, "gauge", "Number of open PRs labeled run-ci")
+    lines.append(format_sample(name, metrics.get("run_ci_pr_count", 0)))
+
+    name = f"{METRIC_PREFIX}_gate_success_ratio"
+    metric_family(lines, name, "gauge", "Share of PRs whose gate checks passed", "ratio")
+    lines.append(format_sample(name, round(metrics.get("门禁_success_rate", 0) / 100, 4)))
+
+    name = f"{METRIC_PREFIX}_gate_retries_average"
+    metric_family(lines, name, "gauge", "Average number of gate retries per PR")
+    lines.append(format_sample(name, metrics.get("avg_gate_retry_count", 0)))
+
+    name = f"{METRIC_PREFIX}_gate_retry_prs"
+    metric_family(lines, name, "gauge", "Number of PRs by gate retry count range")
+    for retry_range, count in metrics.get("gate_retry_distribution", {}).items():
+        lines.append(format_sample(name, count, {"range": RETRY_RANGE_LABELS.get(retry_range, retry_range)}))
+
+    name = f"{METRIC_PREFIX}_ci_duration_seconds"
+    metric_family(lines, name, "histogram", "CI workflow duration per PR run by workflow category", "seconds")
+    for category, (bucket_counts, count, total) in duration_histograms(metrics.get("duration_stats", [])).items():
+        for bound, bucket_count in zip(DURATION_BUCKETS, bucket_counts):
+            lines.append(format_sample(f"{name}_bucket", bucket_count, {"category": category, "le": f"{bound}.0"}))
+        lines.append(format_sample(f"{name}_bucket", count, {"category": category, "le": "+Inf"}))
+        lines.append(format_sample(f"{name}_count", count, {"category": category}))
+        lines.append(format_sample(f"{name}_sum", round(total, 1), {"category": category}))
+
+    name = f"{METRIC_PREFIX}_duration_regression_alerts"
+    metric_family(lines, name, "gauge", "Number of recorded CI duration regression alerts by workflow category")
+    alert_counts = {category: 0 for category in CATEGORIES}
+    for alert in metrics.get("duration_alerts", []):
+        alert_counts[alert["category"]] = alert_counts.get(alert["category"], 0) + 1
+    for category, count in alert_counts.items():
+        lines.append(format_sample(name, count, {"category": category}))
+
+    name = f"{METRIC_PREFIX}_generated_timestamp_seconds"
+    metric_family(lines, name, "gauge", "Unix time when these metrics were computed", "seconds")
+    lines.append(format_sample(name, round(generated_at if generated_at is not None else time.time(), 3)))
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(text, textfile):
+    """原子写入node-exporter textfile（先写同目录临时文件再替换，采集时不会读到半个文件）"""
+    textfile_dir = os.path.dirname(textfile)
+    if textfile_dir and not os.path.exists(textfile_dir):
+        os.makedirs(textfile_dir)
+
+    temp_file = f"{textfile}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_file, textfile)
+    print(f"OpenMetrics指标已写入: {textfile}")
+    return textfile
@@ -9,13 +9,25 @@ import os
 import sys
 import json
 import time
+import signal
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta, timezone
-import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+import collector_stats
+import credential_pool
+import fetch_planner
+import history_cache
+import refresh_scheduler
+import shards
+import snapshot_diff
+import sync_state
+import json_stream
+
 # 配置常量
 BASE_URL = "https://api.github.com"
+GRAPHQL_URL = f"{BASE_URL}/graphql"
 API_VERSION = "2022-11-28"
 OWNER = "sgl-project"
 REPO = "sglang"
@@ -23,22 +35,47 @@ TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 RETRY_COUNT = 3
 RETRY_DELAY = 5  # 秒
 RATE_LIMIT_DELAY = 60  # 秒
+CONNECT_TIMEOUT = 10  # 建立连接的超时时间（秒）
+READ_TIMEOUT = 60  # 等待响应数据的超时时间（秒，流式读取时为两次读取之间的最长间隔）
+HEDGE_PERCENTILE = 95  # 请求耗时超过该接口类别此分位数的延迟时发出对冲请求
+HEDGE_MIN_SAMPLES = 20  # 接口类别的延迟样本少于该数量时使用默认对冲延迟
+HEDGE_DEFAULT_DELAY = 5.0  # 默认对冲延迟（秒）
+HEDGE_MIN_DELAY = 1.0  # 对冲延迟下限（秒）
+HEDGE_MAX_RATIO = 0.05  # 对冲请求最多占全部请求的比例（对冲请求同样消耗速率限制额度）
 DATA_DIR = "pr_data"  # 数据保存目录
+MAX_CHECK_HISTORY_SHAS = 20  # 每个PR最多回溯的提交数量（用于收集check执行历史）
+HISTORY_BATCH_SIZE = 20  # 每次GraphQL请求批量获取历史的PR数量
+# 列表接口中每个对象只保留用到的字段（边接收边解析，完整的repository、head_commit、actor等子对象不会留在内存中）
+WORKFLOW_RUN_FIELDS = (
+    "id", "name", "head_sha", "event", "run_attempt", "status", "conclusion",
+    "created_at", "run_started_at", "updated_at", "run_duration_ms"
+)
+WORKFLOW_JOB_FIELDS = (
+    "id", "name", "head_sha", "run_attempt", "status", "conclusion",
+    "created_at", "started_at", "completed_at", "labels"
+)
+CHECK_RUN_FIELDS = ("id", "name", "status", "conclusion", "started_at", "completed_at")
+REVIEW_FIELDS = ("state", "submitted_at", "user")
+TIMELINE_EVENT_FIELDS = ("event", "created_at", "requested_reviewer", "requested_team")
+
+
+class RunBudgetExceeded(BaseException):
+    """整次运行的时间预算已用完
 
+    继承BaseException而不是Exception：各采集步骤用 except Exception 兜底单个步骤的错误，
+    预算用完时需要越过这些处理直接结束当前PR，与KeyboardInterrupt的处理方式相同
+    """
 
-def get_github_token():
-    """从环境变量获取GitHub Personal Access Token"""
-    token = os.environ.get("GH_TOKEN")
-    if not token:
-        print("错误: 未找到环境变量 GH_TOKEN", file=sys.stderr)
-        print("请设置环境变量: $env:GH_TOKEN='your_github_token'", file=sys.stderr)
-        sys.exit(1)
-    return token
 
+def create_session(stats=None, auth=None, deadline=None):
+    """创建带重试机制的HTTP会话，会话上记录每次请求的统计（session.stats）
 
-def create_session():
-    """创建带重试机制的HTTP会话"""
-    session = requests.Session()
+    auth为凭据池时，每个请求使用剩余额度最多的凭据；deadline为整次运行的截止时间（time.monotonic()）
+    """
+    session = collector_stats.InstrumentedSession(stats or collector_stats.new_run_stats())
+    session.auth = auth
+    session.deadline = deadline
+    session.hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hedge")
     retry = Retry(
         total=RETRY_COUNT,
         read=RETRY_COUNT,
@@ -52,9 +89,9 @@ def create_session():
     return session
 
 
-def calculate_time_range():
-    """计算近两周的时间范围"""
-    now = datetime.now(timezone.utc)
+def calculate_time_range(until=None):
+    """计算近两周的时间范围，until为结束时间（默认为当前时间）"""
+    now = datetime.strptime(until, TIME_FORMAT).replace(tzinfo=timezone.utc) if until else datetime.now(timezone.utc)
     two_weeks_ago = now - timedelta(days=14)
     return {
         "since": two_weeks_ago.strftime(TIME_FORMAT),
@@ -62,6 +99,144 @@ def calculate_time_range():
     }
 
 
+def check_deadline(session, wait_time=0):
+    """运行时间预算已用完（或等待wait_time秒后会用完）时抛出RunBudgetExceeded"""
+    if session.deadline is not None and time.monotonic() + wait_time >= session.deadline:
+        raise RunBudgetExceeded()
+
+
+def request_timeout(session):
+    """单个请求的(连接, 读取)超时时间，读取超时不超过剩余的运行时间预算"""
+    read_timeout = READ_TIMEOUT
+    if session.deadline is not None:
+        read_timeout = max(min(read_timeout, session.deadline - time.monotonic()), 1)
+    return (CONNECT_TIMEOUT, read_timeout)
+
+
+def is_throttled(response):
+    """响应是否因为速率限制被拒绝：主速率限制（403/429且额度为0）、次级速率限制（403/429，带Retry-After或提示rate limit）"""
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return (
+        response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+        or "rate limit" in response.text.lower()
+    )
+
+
+def rate_limit_wait(session, response):
+    """遇到速率限制时等待（优先按Retry-After，否则等到额度重置），等待会超出运行时间预算时直接结束"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        wait_time = max(int(retry_after), 1)
+    else:
+        reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
+        wait_time = max(reset_time - int(time.time()), RATE_LIMIT_DELAY)
+    check_deadline(session, wait_time)
+    print(f"速率限制已达，将等待 {wait_time} 秒后重试...")
+    collector_stats.sleep(session.stats, wait_time, "rate_limit")
+
+
+def hedged_get(session, url, **kwargs):
+    """发送GET请求，超过该接口类别的尾部延迟仍未返回时再发一个相同的请求，使用先返回的结果
+
+    GET请求是幂等的，重复发送没有副作用；对冲请求数量限制在全部请求的HEDGE_MAX_RATIO以内
+    """
+    stats = session.stats
+    delay = collector_stats.tail_latency(stats, url, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    delay = max(delay if delay is not None else HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY)
+    
+    primary = session.hedge_executor.submit(session.get, url, **kwargs)
+    done, _ = wait([primary], timeout=delay)
+    if done or not collector_stats.start_hedge(stats, HEDGE_MAX_RATIO):
+        return primary.result()
+    
+    hedge = session.hedge_executor.submit(session.get, url, **kwargs)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            # 释放较慢的请求返回的连接
+            for other in pending:
+                other.add_done_callback(lambda late: late.exception() is None and late.result().close())
+            if future is hedge:
+                collector_stats.record_hedge_won(stats)
+            return future.result()
+    raise error
+
+
+def github_get(session, headers, url, params=None, stream=False):
+    """发送GET请求，遇到速率限制时等待后重试；stream为True时响应体留给调用方流式读取"""
+    while True:
+        check_deadline(session)
+        response = hedged_get(
+            session, url, headers=headers, params=params, stream=stream, timeout=request_timeout(session)
+        )
+        
+        # 处理速率限制
+        if is_throttled(response):
+            rate_limit_wait(session, response)
+            continue
+        
+        response.raise_for_status()
+        return response
+
+
+def github_get_all_pages(session, headers, url, params=None, item_key=None, max_pages=10, fields=None):
+    """按Link头翻页获取全部数据，item_key为列表所在的字段名（接口直接返回列表时为None）
+
+    指定fields时边接收边解析，每个对象只保留这些字段
+    """
+    items = []
+    params = dict(params or {})
+    params.setdefault("per_page", 100)
+    
+    for _ in range(max_pages):
+        if fields:
+            response = github_get(session, headers, url, params, stream=True)
+            items.extend(json_stream.iter_response_items(response, item_key, fields))
+        else:
+            response = github_get(session, headers, url, params)
+            data = response.json()
+            items.extend(data[item_key] if item_key else data)
+        
+        next_link = response.links.get("next")
+        if not next_link:
+            break
+        # next链接中已包含全部查询参数
+        url = next_link["url"]
+        params = None
+    
+    return items
+
+
+def github_graphql(session, headers, query):
+    """发送GraphQL查询，遇到速率限制时等待后重试"""
+    while True:
+        check_deadline(session)
+        response = session.post(GRAPHQL_URL, headers=headers, json={"query": query}, timeout=request_timeout(session))
+        
+        # 处理速率限制（GraphQL在HTTP 403或errors中返回RATE_LIMITED）
+        rate_limited = is_throttled(response)
+        if not rate_limited and response.ok:
+            errors = response.json().get("errors") or []
+            rate_limited = any(error.get("type") == "RATE_LIMITED" for error in errors)
+        if rate_limited:
+            rate_limit_wait(session, response)
+            continue
+        
+        response.raise_for_status()
+        result = response.json()
+        if result.get("errors") and not result.get("data"):
+            raise Exception(f"GraphQL查询失败: {result['errors'][0].get('message')}")
+        return result["data"]
+
+
 def get_pr_list(session, headers, time_range):
     """获取符合时间范围的PR列表"""
     pr_list = []
@@ -80,7 +255,8 @@ def get_pr_list(session, headers, time_range):
             "page": page
         }
         
-        response = session.get(url, headers=headers, params=params)
+        check_deadline(session)
+        response = session.get(url, headers=headers, params=params, timeout=request_timeout(session))
         
         # 处理认证错误
         if response.status_code == 401:
@@ -94,11 +270,8 @@ def get_pr_list(session, headers, time_range):
             raise Exception("GitHub Token认证失败: 401 Unauthorized")
         
         # 处理速率限制
-        if response.status_code == 403 and "rate limit" in response.text.lower():
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            wait_time = max(reset_time - int(time.time()), RATE_LIMIT_DELAY)
-            print(f"速率限制已达，将等待 {wait_time} 秒后重试...")
-            time.sleep(wait_time)
+        if is_throttled(response):
+            rate_limit_wait(session, response)
             continue
         
         response.raise_for_status()  # 抛出其他HTTP错误
@@ -134,29 +307,58 @@ def get_pr_list(session, headers, time_range):
             break
         
         page += 1
-        time.sleep(0.5)  # 避免请求过快
+        collector_stats.sleep(session.stats, 0.5, "pacing")  # 避免请求过快
     
     print(f"共检查 {total_prs_checked} 个PR，找到 {total_npu_prs_found} 个带有npu标签的PR")
     return pr_list
 
 
+def get_updated_pr_list(session, headers, time_range, stop_at):
+    """按更新时间降序获取stop_at之后有更新、且在时间范围内创建的PR（不按标签筛选，用于发现被移除npu标签的PR）"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/pulls"
+    pr_list = []
+    page = 1
+    total_prs_checked = 0
+    
+    while True:
+        params = {
+            "state": "all",
+            "sort": "updated",
+            "direction": "desc",
+            "per_page": 100,
+            "page": page
+        }
+        prs = github_get(session, headers, url, params).json()
+        if not prs:
+            break
+        
+        total_prs_checked += len(prs)
+        reached_cursor = False
+        for pr in prs:
+            if pr["updated_at"] < stop_at:
+                # 按更新时间降序排序，后续PR在上次同步之后都没有更新
+                reached_cursor = True
+                break
+            if time_range["since"] <= pr["created_at"] <= time_range["until"]:
+                pr_list.append(pr)
+        
+        print(f"已检查 {total_prs_checked} 个PR，其中 {len(pr_list)} 个在时间范围内有更新...")
+        if reached_cursor:
+            break
+        
+        page += 1
+        collector_stats.sleep(session.stats, 0.5, "pacing")  # 避免请求过快
+    
+    print(f"{stop_at} 之后共有 {len(pr_list)} 个时间范围内的PR有更新")
+    return pr_list
+
+
 def get_pr_detail(session, headers, pr):
     """获取单个PR的详细信息（仅当需要时调用）"""
     # 注意：GitHub PR列表接口默认不返回代码变更信息（additions/deletions/changed_files）
     # 这些字段只在详情接口中返回，所以几乎所有PR都需要调用详情接口
     url = f"{BASE_URL}/repos/{OWNER}/{REPO}/pulls/{pr['number']}"
-    response = session.get(url, headers=headers)
-    
-    # 处理速率限制
-    if response.status_code == 403 and "rate limit" in response.text.lower():
-        reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-        wait_time = max(reset_time - int(time.time()), RATE_LIMIT_DELAY)
-        print(f"速率限制已达，将等待 {wait_time} 秒后重试...")
-        time.sleep(wait_time)
-        return get_pr_detail(session, headers, pr)  # 递归重试
-    
-    response.raise_for_status()
-    return response.json()
+    return github_get(session, headers, url).json()
 
 
 def get_pr_checks(session, headers, pr):
@@ -165,22 +367,190 @@ def get_pr_checks(session, headers, pr):
     params = {
         "per_page": 100
     }
-    response = session.get(url, headers=headers, params=params)
+    response = github_get(session, headers, url, params, stream=True)
+    return list(json_stream.iter_response_items(response, "check_runs", CHECK_RUN_FIELDS))
+
+
+def get_pr_commits(session, headers, pr_number):
+    """获取PR的全部提交（按提交顺序，接口最多返回250个）"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/pulls/{pr_number}/commits"
+    return github_get_all_pages(session, headers, url, max_pages=3)
+
+
+# 每个PR在GraphQL批量查询中获取的历史字段
+PR_HISTORY_FIELDS = """
+      commits(last: 100) { nodes { commit { oid committedDate } } }
+      reviews(first: 100) { nodes { state submittedAt author { login } comments { totalCount } } }
+      timelineItems(first: 100, itemTypes: [REVIEW_REQUESTED_EVENT, REVIEW_REQUEST_REMOVED_EVENT]) {
+        nodes {
+          __typename
+          ... on ReviewRequestedEvent { createdAt requestedReviewer { ... on User { login } ... on Team { slug } } }
+          ... on ReviewRequestRemovedEvent { createdAt requestedReviewer { ... on User { login } ... on Team { slug } } }
+        }
+      }
+"""
+
+
+def reviewer_name(reviewer):
+    """评审请求对象的名称：用户为login，团队为 team:slug"""
+    reviewer = reviewer or {}
+    if reviewer.get("login"):
+        return reviewer["login"]
+    if reviewer.get("slug"):
+        return f"team:{reviewer['slug']}"
+    return None
+
+
+def parse_pr_history(node):
+    """将GraphQL返回的PR节点转换为提交、评审和评审请求（含撤回）历史"""
+    events = [event for event in (node.get("timelineItems") or {}).get("nodes", []) if event.get("createdAt")]
+    return {
+        "commits": [
+            {"sha": item["commit"]["oid"], "committed_at": item["commit"]["committedDate"]}
+            for item in node["commits"]["nodes"]
+        ],
+        "reviews": [
+            {
+                "state": review["state"],
+                "submitted_at": review.get("submittedAt"),
+                "author": (review.get("author") or {}).get("login"),
+                "comments": (review.get("comments") or {}).get("totalCount", 0)
+            }
+            for review in node["reviews"]["nodes"]
+        ],
+        "review_requests": [
+            {"requested_at": event["createdAt"], "reviewer": reviewer_name(event.get("requestedReviewer"))}
+            for event in events if event.get("__typename") != "ReviewRequestRemovedEvent"
+        ],
+        "review_request_removals": [
+            {"removed_at": event["createdAt"], "reviewer": reviewer_name(event.get("requestedReviewer"))}
+            for event in events if event.get("__typename") == "ReviewRequestRemovedEvent"
+        ]
+    }
+
+
+def get_pr_histories_batch(session, headers, pr_numbers, batch_size=HISTORY_BATCH_SIZE):
+    """通过GraphQL别名，每次请求批量获取多个PR的提交、评审和评审请求历史"""
+    histories = {}
+    for i in range(0, len(pr_numbers), batch_size):
+        batch = pr_numbers[i:i + batch_size]
+        aliases = "".join(
+            f"    pr{number}: pullRequest(number: {number}) {{{PR_HISTORY_FIELDS}    }}\n" for number in batch
+        )
+        query = f'query {{\n  repository(owner: "{OWNER}", name: "{REPO}") {{\n{aliases}  }}\n}}'
+        data = github_graphql(session, headers, query)
+        
+        for number in batch:
+            node = (data.get("repository") or {}).get(f"pr{number}")
+            if node:
+                histories[number] = parse_pr_history(node)
     
-    # 处理速率限制
-    if response.status_code == 403 and "rate limit" in response.text.lower():
-        reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-        wait_time = max(reset_time - int(time.time()), RATE_LIMIT_DELAY)
-        print(f"速率限制已达，将等待 {wait_time} 秒后重试...")
-        time.sleep(wait_time)
-        return get_pr_checks(session, headers, pr)  # 递归重试
+    return histories
+
+
+def get_pr_reviews(session, headers, pr_number):
+    """按页获取PR的全部评审"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/pulls/{pr_number}/reviews"
+    return github_get_all_pages(session, headers, url, max_pages=3, fields=REVIEW_FIELDS)
+
+
+def get_pr_review_requests(session, headers, pr_number):
+    """按页获取PR时间线中的评审请求和撤回评审请求事件"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/issues/{pr_number}/timeline"
+    events = github_get_all_pages(session, headers, url, max_pages=3, fields=TIMELINE_EVENT_FIELDS)
+    return [event for event in events if event.get("event") in ("review_requested", "review_request_removed")]
+
+
+def get_pr_history(session, headers, pr_number):
+    """单独获取一个PR的提交、评审和评审请求（含撤回）历史（GraphQL批量获取失败时的兜底方案，使用REST接口翻页获取）"""
+    commits = get_pr_commits(session, headers, pr_number)
+    reviews = get_pr_reviews(session, headers, pr_number)
+    review_requests = get_pr_review_requests(session, headers, pr_number)
+    return {
+        "commits": [
+            {"sha": commit["sha"], "committed_at": commit["commit"]["committer"]["date"]}
+            for commit in commits
+        ],
+        "reviews": [
+            {
+                "state": review["state"],
+                "submitted_at": review.get("submitted_at"),
+                "author": (review.get("user") or {}).get("login"),
+                "comments": None  # REST接口不返回评审包含的评论数
+            }
+            for review in reviews
+        ],
+        "review_requests": [
+            {
+                "requested_at": event["created_at"],
+                "reviewer": reviewer_name(event.get("requested_reviewer") or event.get("requested_team"))
+            }
+            for event in review_requests if event["event"] == "review_requested"
+        ],
+        "review_request_removals": [
+            {
+                "removed_at": event["created_at"],
+                "reviewer": reviewer_name(event.get("requested_reviewer") or event.get("requested_team"))
+            }
+            for event in review_requests if event["event"] == "review_request_removed"
+        ]
+    }
+
+
+def get_check_runs_all_attempts(session, headers, sha):
+    """获取指定提交上的全部check runs，包括被重新执行覆盖的历史记录"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/commits/{sha}/check-runs"
+    params = {
+        "filter": "all"  # 默认只返回每个check最新的一次执行
+    }
+    return github_get_all_pages(session, headers, url, params, item_key="check_runs", fields=CHECK_RUN_FIELDS)
+
+
+def summarize_check_run(check, sha):
+    """只保留check run中分析需要的字段"""
+    return {
+        "id": check.get("id"),
+        "name": check.get("name", ""),
+        "head_sha": sha,
+        "status": check.get("status"),
+        "conclusion": check.get("conclusion"),
+        "started_at": check.get("started_at"),
+        "completed_at": check.get("completed_at")
+    }
+
+
+def get_pr_check_attempts(session, headers, pr_detail, history, cache):
+    """收集PR各个提交上每个check的全部执行记录，用于区分flaky check和真实失败
+
+    已被新推送取代（或PR已关闭）且check全部完成的提交不会再变化，直接使用缓存
+    """
+    head_sha = pr_detail["head"]["sha"]
+    pr_closed = pr_detail["state"] != "open"
+    shas = [commit["sha"] for commit in history["commits"]][-MAX_CHECK_HISTORY_SHAS:]
+    
+    attempts = []
+    for sha in shas:
+        sha_attempts = history_cache.get_cached_check_runs(cache, sha)
+        if sha_attempts is None:
+            sha_attempts = [
+                summarize_check_run(check, sha)
+                for check in get_check_runs_all_attempts(session, headers, sha)
+            ]
+            all_completed = all(a["status"] == "completed" for a in sha_attempts)
+            if all_completed and (sha != head_sha or pr_closed):
+                history_cache.put_check_runs(cache, sha, sha_attempts)
+        attempts.extend(sha_attempts)
     
-    response.raise_for_status()
-    return response.json()['check_runs']
+    return attempts
 
 
-def get_pr_details_batch(session, headers, pr_list, batch_size=10):
-    """批量获取PR详情，提高效率"""
+def get_pr_details_batch(session, headers, pr_list, batch_size=10, tiers=None, cache=None):
+    """批量获取PR详情，提高效率；tiers为 {PR编号: 刷新层级}，用于按层级统计请求数；
+    cache为已加载的历史缓存（不传时从文件加载）
+
+    返回 (PR数据, 处理成功的PR数量, 提前结束的原因)，提前结束的原因为None、"interrupted"（用户中断）
+    或 "time_budget"（运行时间预算用完）
+    """
     pr_details = []
     detail_api_calls = 0
     total_prs = len(pr_list)
@@ -188,20 +558,47 @@ def get_pr_details_batch(session, headers, pr_list, batch_size=10):
     # 显示初始PR数量
     print(f"开始处理 {total_prs} 个带有npu标签的PR...")
     
+    # 批量获取提交和评审历史，PR的updated_at没有变化时复用上次运行的缓存
+    if cache is None:
+        cache = history_cache.load_history_cache()
+    stale_numbers = [
+        pr["number"] for pr in pr_list
+        if history_cache.get_cached_history(cache, pr["number"], pr.get("updated_at")) is None
+    ]
+    print(f"需要获取 {len(stale_numbers)} 个PR的提交和评审历史，{total_prs - len(stale_numbers)} 个PR使用缓存")
+    if stale_numbers:
+        try:
+            with collector_stats.stage(session.stats, "pr_histories_batch"):
+                histories = get_pr_histories_batch(session, headers, stale_numbers)
+            pr_updated_at = {pr["number"]: pr.get("updated_at") for pr in pr_list}
+            for number, history in histories.items():
+                history_cache.put_history(cache, number, pr_updated_at[number], history)
+        except RunBudgetExceeded:
+            print("运行时间预算已用完，未开始处理PR")
+            history_cache.save_history_cache(cache)
+            return pr_details, detail_api_calls, "time_budget"
+        except Exception as e:
+            print(f"批量获取PR历史时发生错误: {e}，将逐个获取")
+    
     for i, pr in enumerate(pr_list, 1):
         try:
             # 进度显示，每处理1个PR更新一次
             print(f"处理第 {i}/{total_prs} 个PR：#{pr['number']}...")
+            requests_before = collector_stats.request_count(session.stats)
             
             # 获取PR详情
-            pr_detail = get_pr_detail(session, headers, pr)
+            with collector_stats.stage(session.stats, "pr_detail"):
+                pr_detail = get_pr_detail(session, headers, pr)
             
             formatted_data = format_pr_data(pr_detail)
+            formatted_data["refreshed_at"] = datetime.now(timezone.utc).strftime(TIME_FORMAT)  # 分层刷新调度据此判断是否到期
             
             # 获取workflow执行时长数据
+            workflow_runs = []
             try:
                 head_sha = formatted_data["head_sha"]
-                workflow_runs = get_workflow_runs(session, headers, head_sha)
+                with collector_stats.stage(session.stats, "workflow_runs"):
+                    workflow_runs = get_workflow_runs(session, headers, head_sha)
                 duration_data = parse_workflow_duration(workflow_runs, pr['number'])
                 
                 # 将执行时长数据添加到PR数据中
@@ -215,7 +612,8 @@ def get_pr_details_batch(session, headers, pr_list, batch_size=10):
             
             # 获取PR门禁状态和重试次数
             try:
-                checks = get_pr_checks(session, headers, pr_detail)
+                with collector_stats.stage(session.stats, "pr_checks"):
+                    checks = get_pr_checks(session, headers, pr_detail)
                 # 初始化门禁状态
                 门禁_status = {
                     "has_pass": False,
@@ -269,20 +667,67 @@ def get_pr_details_batch(session, headers, pr_list, batch_size=10):
                 formatted_data["门禁_status"] = "unknown"
                 formatted_data["gate_retry_count"] = 0
             
+            # 获取PR的提交、评审历史以及各个提交上全部check的执行历史（包括重试）
+            try:
+                with collector_stats.stage(session.stats, "check_attempts"):
+                    history = history_cache.get_cached_history(cache, pr["number"], pr.get("updated_at"))
+                    if history is None:
+                        history = get_pr_history(session, headers, pr["number"])
+                        history_cache.put_history(cache, pr["number"], pr.get("updated_at"), history)
+                    formatted_data["commits"] = history["commits"]
+                    formatted_data["reviews"] = history["reviews"]
+                    formatted_data["review_requests"] = history["review_requests"]
+                    formatted_data["review_request_removals"] = history["review_request_removals"]
+                    formatted_data["check_attempts"] = get_pr_check_attempts(
+                        session, headers, pr_detail, history, cache
+                    )
+            except Exception as e:
+                print(f"获取PR #{pr['number']}的提交和check执行历史时发生错误: {e}")
+                formatted_data.setdefault("commits", [])
+                formatted_data.setdefault("reviews", [])
+                formatted_data.setdefault("review_requests", [])
+                formatted_data.setdefault("review_request_removals", [])
+                formatted_data["check_attempts"] = []
+            
+            # 获取每次推送上workflow和job的执行时间线（包括被新推送取代的提交），用于关键路径和runner耗时分析
+            try:
+                with collector_stats.stage(session.stats, "workflow_timeline"):
+                    runs, jobs = get_pr_workflow_timeline(
+                        session, headers, pr_detail, formatted_data["check_attempts"], workflow_runs, cache
+                    )
+                formatted_data["workflow_runs"] = runs
+                formatted_data["workflow_jobs"] = jobs
+            except Exception as e:
+                print(f"获取PR #{pr['number']}的job执行时间线时发生错误: {e}")
+                formatted_data["workflow_runs"] = []
+                formatted_data["workflow_jobs"] = []
+            
             pr_details.append(formatted_data)
             detail_api_calls += 1
+            tier = (tiers or {}).get(pr["number"])
+            if tier:
+                tier_stats = session.stats["tiers"][tier]
+                tier_stats["refreshed"] += 1
+                tier_stats["requests"] += collector_stats.request_count(session.stats) - requests_before
             
             # 减少延迟时间
-            time.sleep(0.1)
+            collector_stats.sleep(session.stats, 0.1, "pacing")
             
+        except RunBudgetExceeded:
+            # 正在处理的PR数据不完整，不保存
+            print(f"\n运行时间预算已用完，已处理 {i - 1} 个PR")
+            history_cache.save_history_cache(cache)
+            return pr_details, detail_api_calls, "time_budget"
         except KeyboardInterrupt:
             print(f"\n用户中断操作，已处理 {i} 个PR")
-            return pr_details, detail_api_calls, True
+            history_cache.save_history_cache(cache)
+            return pr_details, detail_api_calls, "interrupted"
         except Exception as e:
             print(f"\n处理PR #{pr['number']} 时发生错误: {e}")
             continue
     
-    return pr_details, detail_api_calls, False
+    history_cache.save_history_cache(cache)
+    return pr_details, detail_api_calls, None
 
 
 def format_pr_data(pr_detail):
@@ -292,6 +737,7 @@ def format_pr_data(pr_detail):
         "title": pr_detail["title"],
         "status": pr_detail["state"],
         "created_at": pr_detail["created_at"],
+        "updated_at": pr_detail["updated_at"],  # 增量同步时用于判断PR是否有更新
         "creator": pr_detail["user"]["login"],
         "merged": pr_detail["merged"],
         "merged_at": pr_detail["merged_at"],
@@ -314,19 +760,87 @@ def get_workflow_runs(session, headers, head_sha):
         "head_sha": head_sha,
         "per_page": 100  # 每页最大100条
     }
+    response = github_get(session, headers, url, params, stream=True)
+    return list(json_stream.iter_response_items(response, "workflow_runs", WORKFLOW_RUN_FIELDS))
+
+
+def get_workflow_jobs(session, headers, run_id):
+    """获取指定workflow run的全部job（包括历次run_attempt）"""
+    url = f"{BASE_URL}/repos/{OWNER}/{REPO}/actions/runs/{run_id}/jobs"
+    params = {
+        "filter": "all"  # 默认只返回最新一次attempt的job
+    }
+    return github_get_all_pages(session, headers, url, params, item_key="jobs", fields=WORKFLOW_JOB_FIELDS)
+
+
+def summarize_workflow_run(run):
+    """只保留workflow run中时间线分析需要的字段"""
+    return {
+        "id": run.get("id"),
+        "name": run.get("name", ""),
+        "head_sha": run.get("head_sha"),
+        "event": run.get("event"),
+        "run_attempt": run.get("run_attempt", 1),
+        "status": run.get("status"),
+        "conclusion": run.get("conclusion"),
+        "created_at": run.get("created_at"),
+        "run_started_at": run.get("run_started_at"),
+        "updated_at": run.get("updated_at")
+    }
+
+
+def get_runs_jobs(session, headers, workflow_runs):
+    """获取一组workflow run下全部job的执行时间线"""
+    jobs = []
+    for run in workflow_runs:
+        for job in get_workflow_jobs(session, headers, run["id"]):
+            jobs.append({
+                "id": job.get("id"),
+                "run_id": run["id"],
+                "workflow": run.get("name", ""),
+                "name": job.get("name", ""),
+                "head_sha": job.get("head_sha"),
+                "run_attempt": job.get("run_attempt", 1),
+                "status": job.get("status"),
+                "conclusion": job.get("conclusion"),
+                "created_at": job.get("created_at"),  # job进入队列的时间
+                "started_at": job.get("started_at"),
+                "completed_at": job.get("completed_at"),
+                "runner_labels": job.get("labels", [])
+            })
+    return jobs
+
+
+def get_pr_workflow_timeline(session, headers, pr_detail, check_attempts, head_runs, cache):
+    """获取PR每次推送（触发过check的提交）上的workflow run和job
+
+    head SHA复用已获取的workflow run；已被新推送取代（或PR已关闭）且全部完成的提交直接使用缓存
+    """
+    head_sha = pr_detail["head"]["sha"]
+    pr_closed = pr_detail["state"] != "open"
+    shas = list(dict.fromkeys(attempt["head_sha"] for attempt in check_attempts))
+    if head_sha not in shas:
+        shas.append(head_sha)
     
-    response = session.get(url, headers=headers, params=params)
-    
-    # 处理速率限制
-    if response.status_code == 403 and "rate limit" in response.text.lower():
-        reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-        wait_time = max(reset_time - int(time.time()), RATE_LIMIT_DELAY)
-        print(f"速率限制已达，将等待 {wait_time} 秒后重试...")
-        time.sleep(wait_time)
-        return get_workflow_runs(session, headers, head_sha)  # 递归重试
+    runs = []
+    jobs = []
+    for sha in shas:
+        cached = history_cache.get_cached_workflow_jobs(cache, sha)
+        if cached is not None:
+            runs.extend(cached["runs"])
+            jobs.extend(cached["jobs"])
+            continue
+        
+        raw_runs = head_runs if sha == head_sha else get_workflow_runs(session, headers, sha)
+        sha_jobs = get_runs_jobs(session, headers, raw_runs)
+        sha_runs = [summarize_workflow_run(run) for run in raw_runs]
+        all_completed = all(item["status"] == "completed" for item in sha_runs + sha_jobs)
+        if all_completed and (sha != head_sha or pr_closed):
+            history_cache.put_workflow_jobs(cache, sha, sha_runs, sha_jobs)
+        runs.extend(sha_runs)
+        jobs.extend(sha_jobs)
     
-    response.raise_for_status()
-    return response.json()['workflow_runs']
+    return runs, jobs
 
 
 def parse_workflow_duration(workflow_runs, pr_number=None):
@@ -400,76 +914,292 @@ def save_pr_data(pr_data):
     today = datetime.now().strftime("%Y%m%d")
     file_path = os.path.join(DATA_DIR, f"pr_data_{today}_fixed.json")
     
-    # 保存数据
-    with open(file_path, "w", encoding="utf-8") as f:
+    # 保存数据（先写临时文件再替换，运行被终止时不会留下写了一半的快照）
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(pr_data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, file_path)
     
     print(f"PR数据已保存到 {file_path}")
     return file_path
 
 
-def run_daily():
-    """每天运行一次的主函数"""
-    # 获取GitHub Token
-    token = get_github_token()
+def run_daily(profile=False, full=False, shard=None, time_budget=None, refresh_all=False, plan=False, until=None):
+    """运行一次监控任务，结束时输出运行摘要（请求次数、延迟、速率限制额度和等待时间）
+
+    默认从上次的同步游标增量同步：只重新获取之后有更新的PR和门禁未结束的PR，合并到上次的快照中；
+    full为True或没有可用的游标时全量获取时间范围内的全部PR。
+    指定shard时只全量采集该分片的PR，结果保存到分片目录，由 shards.py 合并。
+    until为时间范围的结束时间（默认为当前时间），各分片传入同一个值才能保证划分的时间范围一致。
+    time_budget为整次运行的时间预算（秒），用完时停止获取并保存已获取的数据，
+    未获取到最新数据的PR沿用上一份快照中的记录并标记为stale。
+    需要刷新的PR由分层刷新调度根据已保存的数据决定，refresh_all为True时刷新全部PR。
+    需要刷新的PR按价值排序后获取；预计超出时间预算或速率限制额度时只获取预算内最有价值的PR，
+    其余记录到积压中，下次运行优先获取。plan为True时只获取PR列表并输出各阶段的请求数和耗时估算
+    """
+    deadline = time.monotonic() + time_budget if time_budget else None
+    latencies = fetch_planner.load_latencies(collector_stats.SUMMARY_FILE)  # 上次运行实测的接口延迟
+    # 从环境变量加载凭据（一个或多个token、GitHub App安装令牌）
+    pool = credential_pool.load_credential_pool(BASE_URL)
     
-    # 创建会话和请求头
-    session = create_session()
+    # 创建会话和请求头（Authorization由凭据池按请求设置）
+    stats = collector_stats.new_run_stats(profile)
+    stats["tiers"] = refresh_scheduler.new_tier_stats()
+    session = create_session(stats, pool, deadline)
     headers = {
-        "Authorization": f"Bearer {token}",
         "Accept": "application/vnd.github+json",
+        "Accept-Encoding": "gzip",
         "X-GitHub-Api-Version": API_VERSION
     }
     
     # 计算时间范围
-    time_range = calculate_time_range()
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 将获取 {time_range['since']} 至 {time_range['until']} 期间创建的PR")
+    time_range = calculate_time_range(until)
+    state = None if full or shard else sync_state.load_sync_state()
+    list_range = shards.shard_time_range(shard, time_range) if shard else time_range
     
+    status = "ok"
+    pr_details = []
+    stale_numbers = []
     try:
-        # 获取PR列表
-        print("正在获取PR列表...")
-        pr_list = get_pr_list(session, headers, time_range)
+        # 游标取列表开始获取的时间，获取过程中有更新的PR下次还会再获取
+        list_started = sync_state.now()
+        existing = []
+        if state:
+            stop_at = sync_state.cursor_stop_time(state)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 增量同步：将获取 {stop_at} 之后有更新的PR（上次同步于 {state['synced_at']}）")
+            existing = list(snapshot_diff.iter_snapshot(state["snapshot_file"]))
+            print("正在获取有更新的PR列表...")
+            with collector_stats.stage(stats, "pr_list"):
+                pr_list = get_updated_pr_list(session, headers, time_range, stop_at)
+        else:
+            if shard:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 采集分片 {shards.shard_name(shard)}（按{'PR编号' if shard['by'] == 'number' else '创建时间'}划分）")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 全量同步：将获取 {list_range['since']} 至 {list_range['until']} 期间创建的PR")
+            print("正在获取PR列表...")
+            with collector_stats.stage(stats, "pr_list"):
+                pr_list = get_pr_list(session, headers, list_range)
+            if shard:
+                pr_list = [pr for pr in pr_list if shards.in_shard(shard, pr)]
         
-        # 筛选带有npu标签的PR
+        # 筛选带有npu标签的PR，有更新但已不带npu标签的PR从已有数据中移除
         npu_pr_list = []
+        removed_numbers = []
         for pr in pr_list:
             # 检查PR是否带有npu标签
             has_npu_label = any(label.get('name') == 'npu' for label in pr.get('labels', []))
             if has_npu_label:
                 npu_pr_list.append(pr)
+            else:
+                removed_numbers.append(pr["number"])
         
         print(f"共找到 {len(npu_pr_list)} 个带有npu标签的PR")
         
+        # 候选PR：增量同步时为有更新的PR加上已保存的全部PR（check执行完成不会改变PR的updated_at）
+        # 以及上次被推迟的PR（新PR被推迟时还没有已保存的记录，之后也不一定再出现在更新列表中），
+        # 全量同步时为列表中的PR；全量同步时以数据目录中最新的快照作为已保存的数据
+        backlog = fetch_planner.load_backlog() if not shard else {"updated_at": None, "items": {}}
+        candidates = [(pr, True) for pr in npu_pr_list]
+        if state:
+            listed_numbers = {pr["number"] for pr in pr_list}
+            candidates += [
+                ({"number": record["pr_number"], "updated_at": record.get("updated_at")}, False)
+                for record in existing
+                if record["pr_number"] not in listed_numbers and record.get("created_at", "") >= time_range["since"]
+            ]
+            candidate_numbers = {pr["number"] for pr, _ in candidates}
+            candidates += [
+                ({"number": number, "updated_at": None}, False)
+                for number in sorted(int(number) for number in backlog["items"])
+                if number not in candidate_numbers and number not in listed_numbers
+            ]
+        else:
+            snapshots = snapshot_diff.list_snapshot_files(DATA_DIR)
+            listed_numbers = {pr["number"] for pr in npu_pr_list}
+            existing = [
+                record for record in (snapshot_diff.iter_snapshot(snapshots[-1]) if snapshots else [])
+                if record["pr_number"] in listed_numbers
+            ]
+        
+        # 按已保存的数据分配刷新层级，只刷新到期的PR（以及上次被推迟的PR），其余PR沿用已保存的记录；
+        # 分片采集的结果需要完整，不推迟PR
+        stored = {record["pr_number"]: record for record in existing}
+        due_prs, tiers = refresh_scheduler.schedule(
+            candidates, stored, stats["tiers"], refresh_all, forced={int(number) for number in backlog["items"]}
+        )
+        print(f"需要刷新 {len(due_prs)} 个PR，{len(candidates) - len(due_prs)} 个PR沿用已保存的数据")
+        
+        # 估算各PR的请求数和耗时并按价值排序，超出速率限制额度或时间预算时推迟价值较低的PR
+        cache = history_cache.load_history_cache()
+        fetch_plan = fetch_planner.build_plan(
+            due_prs, stored, cache, latencies, backlog, HISTORY_BATCH_SIZE, MAX_CHECK_HISTORY_SHAS
+        )
+        budget = {
+            "core_remaining": pool.remaining("core"),
+            "graphql_remaining": pool.remaining("graphql"),
+            "time_budget": max(deadline - time.monotonic(), 0) if deadline else None
+        }
+        selected, deferred = fetch_planner.select_within_budget(
+            fetch_plan,
+            None if shard or budget["core_remaining"] is None
+            else max(budget["core_remaining"] - fetch_planner.RATE_LIMIT_RESERVE, 0),
+            None if shard or budget["time_budget"] is None else budget["time_budget"] * fetch_planner.TIME_SAFETY
+        )
+        budget.update(selected=len(selected), deferred=len(deferred))
+        if plan:
+            status = "plan"
+            fetch_planner.print_plan(fetch_plan, budget)
+            fetch_planner.save_plan(fetch_plan, budget)
+            return True
+        if deferred:
+            print(f"预计超出速率限制额度或时间预算，按价值获取 {len(selected)} 个PR，推迟 {len(deferred)} 个")
+        prs_by_number = {pr["number"]: pr for pr in due_prs}
+        fetch_prs = [prs_by_number[number] for number in selected]
+        
         # 批量获取PR详情
-        if npu_pr_list:
+        processed_count = 0
+        stop_reason = None
+        if fetch_prs:
             print("正在批量获取PR详情...")
-            pr_details, detail_api_calls, interrupted = get_pr_details_batch(session, headers, npu_pr_list)
+            with collector_stats.stage(stats, "pr_details"):
+                pr_details, processed_count, stop_reason = get_pr_details_batch(
+                    session, headers, fetch_prs, tiers=tiers, cache=cache
+                )
+        print(f"刷新层级：{refresh_scheduler.format_tier_stats(stats['tiers'])}")
+        
+        # 没有获取到最新数据的PR（被推迟、出错、中断或时间预算用完）沿用已保存的记录，并标记为stale
+        fetched_numbers = {record["pr_number"] for record in pr_details}
+        stale_numbers = [pr["number"] for pr in due_prs if pr["number"] not in fetched_numbers]
+        records = sync_state.merge_records(existing, pr_details, removed_numbers, time_range["since"])
+        records = sync_state.mark_stale(records, stale_numbers)
+        # 被推迟的PR已记录在积压中，下次运行一定会获取，不影响游标前移
+        complete = stop_reason is None and not set(stale_numbers) - set(deferred)
+        if not shard:
+            unfetched = {
+                number: "budget" if number in deferred else (stop_reason or "error")
+                for number in stale_numbers
+            }
+            fetch_planner.save_backlog(fetch_planner.update_backlog(backlog, fetch_plan, unfetched))
+        
+        if shard:
+            # 分片结果（包括空分片）都要保存，合并时据此判断分片是否齐全
+            with collector_stats.stage(stats, "save"):
+                shards.save_shard(
+                    records, shard, time_range, list_range, list_started,
+                    "ok" if complete else (stop_reason or "incomplete")
+                )
+        elif records:
+            # 保存数据
+            with collector_stats.stage(stats, "save"):
+                snapshot_file = save_pr_data(records)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 数据获取完成")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 共处理 {processed_count} 个PR，快照中共 {len(records)} 个PR")
             
-            if pr_details:
-                # 保存数据
-                save_pr_data(pr_details)
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 数据获取完成")
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 共调用详情接口 {detail_api_calls} 次")
+            if stale_numbers:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {len(stale_numbers)} 个PR未获取到最新数据，已标记为stale")
             
-            if interrupted:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 用户中断操作，已处理 {len(pr_details)} 个PR")
+            # 全部PR都获取成功时才推进游标，否则下次运行重新获取失败的PR
+            if complete:
+                sync_state.save_sync_state(list_started, snapshot_file, time_range["since"])
+            elif state:
+                sync_state.save_sync_state(state["cursor"], snapshot_file, time_range["since"])
+            else:
+                sync_state.clear_sync_state()
+        
+        if stop_reason == "interrupted":
+            status = "interrupted"
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 用户中断操作，已处理 {len(pr_details)} 个PR")
+        elif stop_reason == "time_budget":
+            status = "time_budget"
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 运行时间预算已用完，已处理 {len(pr_details)} 个PR")
         
+    except RunBudgetExceeded:
+        status = "time_budget"
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 获取PR列表时运行时间预算已用完，未保存数据", file=sys.stderr)
     except Exception as e:
+        status = "failed"
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 发生错误: {e}", file=sys.stderr)
-        return False
+    finally:
+        session.hedge_executor.shutdown(wait=False)
+        summary = collector_stats.build_run_summary(stats, status, len(pr_details), stale_numbers)
+        collector_stats.print_run_summary(summary)
+        # 只做估算时不覆盖上次运行的摘要（下次估算要用其中的实测延迟）
+        if status != "plan":
+            collector_stats.save_run_summary(summary)
     
-    return True
+    return status != "failed"
 
 
 def main():
     """主函数"""
-    # 命令行参数解析（简化，不再需要--once参数）
     import argparse
     parser = argparse.ArgumentParser(description="PR监控脚本")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="在运行摘要中额外记录各阶段（PR列表、详情、check、workflow等）的耗时和请求数"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="忽略同步游标，全量获取时间范围内的全部PR"
+    )
+    parser.add_argument(
+        "--shard",
+        help="只采集第i个分片（格式 i/N，i从0开始），结果保存到 pr_data/shards/，全部分片完成后用 shards.py 合并"
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=shards.SHARD_BY_CHOICES,
+        default="number",
+        help="分片方式：number按PR编号取模，created按创建时间把时间范围等分 (默认: number)"
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="整次运行的时间预算（分钟），用完时停止获取并保存已获取的数据，未更新的PR标记为stale"
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="只获取PR列表，估算本次需要的API请求数和各阶段耗时，与剩余额度和时间预算对比后退出，不获取数据"
+    )
+    parser.add_argument(
+        "--refresh-all",
+        action="store_true",
+        help="不按刷新层级跳过PR，刷新全部候选PR（包括已关闭且数据不再变化的PR）"
+    )
+    parser.add_argument(
+        "--until",
+        help="采集时间范围的结束时间（UTC，格式 YYYY-MM-DDTHH:MM:SSZ，默认为当前时间）；分片采集时各分片应使用同一个值"
+    )
     args = parser.parse_args()
+    if args.until:
+        try:
+            datetime.strptime(args.until, TIME_FORMAT)
+        except ValueError:
+            parser.error(f"--until 格式应为 YYYY-MM-DDTHH:MM:SSZ，实际为 {args.until!r}")
     
-    # 只运行一次监控任务
-    run_daily()
+    # 被终止（如Actions任务超时或取消）时按用户中断处理，保存已获取的数据
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = shards.parse_shard(args.shard, args.shard_by)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    # 只运行一次监控任务，失败时以非0状态退出（分片采集的job据此标记失败，合并时报告缺失的分片）
+    succeeded = run_daily(
+        profile=args.profile,
+        full=args.full,
+        shard=shard,
+        time_budget=args.time_budget * 60 if args.time_budget else None,
+        refresh_all=args.refresh_all,
+        plan=args.plan,
+        until=args.until
+    )
+    sys.exit(0 if succeeded else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+NPU runner排队仿真
+
+功能：从PR数据快照中提取NPU job的推送到达时间、每个job的运行时长、重跑率、最终失败率和重跑间隔，
+用离散事件仿真（heapq事件队列 + FIFO等待队列）在指定数量的NPU runner上回放历史负载，
+或按倍数放大/缩小推送量、调整runner数量和重跑率生成假设场景，
+输出每个场景预测的排队等待时间和推送到NPU job全部通过的时间分布。
+单次仿真只做线性的事件处理，几十个场景 × 多个随机种子可在数秒内扫完
+"""
+
+import os
+import sys
+import json
+import heapq
+import random
+import argparse
+import itertools
+from collections import deque
+from datetime import datetime, timezone
+
+import runner_cost
+import snapshot_diff
+from flakiness import FAILURE_CONCLUSIONS
+from stats_utils import summarize_distribution
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+OUTPUT_FILE = os.path.join(DATA_DIR, "npu_queue_sim.json")  # 仿真结果
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_VOLUMES = (1.0, 1.5, 2.0)  # 默认扫描的推送量倍数（1为回放历史）
+DEFAULT_RUNNER_DELTAS = (0, 2, 4)  # 默认在当前runner数量基础上增加的数量
+DEFAULT_RETRY_DELAY = 600  # 没有重跑记录时假定的失败到重跑的间隔（秒）
+ARRIVAL_JITTER = 1800  # 放大推送量时，复制出的推送在原推送时间前后随机偏移的范围（秒）
+REPETITIONS = 5  # 每个场景使用的随机种子数量，结果合并统计
+
+# 事件类型：同一时刻先处理job结束（释放runner），再处理重跑的job进入队列
+FINISH = 0
+ARRIVE = 1
+
+
+def parse_time(value):
+    """解析GitHub时间字符串为时间戳（秒），空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+def build_model(pr_data):
+    """从PR数据中提取仿真输入
+
+    每个（提交, workflow, job名称）为一个job，按run_attempt排序后第一次执行作为该推送上的job，
+    同一提交上的NPU job在最早进入队列的时间一起到达（忽略job之间的依赖）；
+    重跑率为每次执行之后还有重跑的比例，最终失败率为最后一次执行失败的比例
+    """
+    pushes = []
+    observed_waits = []
+    retry_delays = []
+    attempts = 0
+    reruns = 0
+    finals = 0
+    final_failures = 0
+    for pr in pr_data:
+        groups = {}
+        for job in pr.get("workflow_jobs", []):
+            if job.get("status") != "completed" or not runner_cost.is_npu_job(job):
+                continue
+            if not (job.get("created_at") and job.get("started_at") and job.get("completed_at")):
+                continue
+            groups.setdefault((job.get("head_sha"), job.get("workflow"), job.get("name")), []).append(job)
+
+        first_jobs = {}
+        for (sha, _, _), jobs in groups.items():
+            jobs.sort(key=lambda job: (job.get("run_attempt") or 1, job["created_at"]))
+            first_jobs.setdefault(sha, []).append(jobs[0])
+            for index, job in enumerate(jobs):
+                attempts += 1
+                observed_waits.append(parse_time(job["started_at"]) - parse_time(job["created_at"]))
+                if index + 1 < len(jobs):
+                    reruns += 1
+                    delay = parse_time(jobs[index + 1]["created_at"]) - parse_time(job["completed_at"])
+                    if delay >= 0:
+                        retry_delays.append(delay)
+            finals += 1
+            if jobs[-1].get("conclusion") in FAILURE_CONCLUSIONS:
+                final_failures += 1
+
+        for sha, jobs in first_jobs.items():
+            durations = [
+                parse_time(job["completed_at"]) - parse_time(job["started_at"]) for job in jobs
+            ]
+            pushes.append({
+                "pr_number": pr.get("pr_number"),
+                "arrival": min(parse_time(job["created_at"]) for job in jobs),
+                "durations": [max(duration, 0) for duration in durations]
+            })
+
+    pushes.sort(key=lambda push: push["arrival"])
+    return {
+        "pushes": pushes,
+        "retry_rate": reruns / attempts if attempts else 0.0,
+        "final_failure_rate": final_failures / finals if finals else 0.0,
+        "retry_delays": sorted(retry_delays) or [DEFAULT_RETRY_DELAY],
+        "observed_waits": observed_waits
+    }
+
+
+def scale_pushes(pushes, volume, rng, jitter=ARRIVAL_JITTER):
+    """按倍数生成推送：每个历史推送保留（倍数不足1时按概率保留），
+    多出的推送在原推送时间附近随机偏移，job运行时长从历史推送中随机抽取，保持一天内的负载形状"""
+    scaled = []
+    for push in pushes:
+        copies = int(volume) + (1 if rng.random() < volume - int(volume) else 0)
+        for copy in range(copies):
+            if copy == 0:
+                scaled.append(push)
+            else:
+                scaled.append({
+                    "pr_number": None,
+                    "arrival": push["arrival"] + rng.uniform(-jitter, jitter),
+                    "durations": rng.choice(pushes)["durations"]
+                })
+    scaled.sort(key=lambda push: push["arrival"])
+    return scaled
+
+
+def simulate(pushes, runners, retry_rate, final_failure_rate, retry_delays, rng):
+    """在runners个NPU runner上仿真一组推送（按到达时间排序），返回每次执行的排队时间、每个推送到全部通过的时间和runner利用率
+
+    推送的job按到达顺序直接读取，事件堆中只有job结束和重跑进入队列的事件；
+    job执行结束后按重跑率重新进入队列（间隔从历史重跑间隔中抽取，运行时长不变），
+    不再重跑时按最终失败率判定失败，推送上有job最终失败则该推送没有全绿
+    """
+    arrivals = [(push["arrival"], index, duration) for index, push in enumerate(pushes) for duration in push["durations"]]
+    sequence = itertools.count()
+    events = []
+    position = 0
+    # 一次随机数同时决定重跑和最终失败：[0, 重跑率) 重跑，其后按最终失败率划出失败区间
+    failure_threshold = retry_rate + (1 - retry_rate) * final_failure_rate
+
+    remaining = [len(push["durations"]) for push in pushes]
+    failed = [False] * len(pushes)
+    waiting = deque()
+    free = runners
+    waits = []
+    time_to_green = []
+    busy = 0.0
+    now = pushes[0]["arrival"] if pushes else 0.0
+
+    while position < len(arrivals) or events:
+        if events and (position == len(arrivals) or events[0][0] <= arrivals[position][0]):
+            now, kind, _, index, duration = heapq.heappop(events)
+            if kind == ARRIVE:
+                waiting.append((now, index, duration))
+            else:
+                free += 1
+                draw = rng.random()
+                if draw < retry_rate:
+                    heapq.heappush(events, (now + rng.choice(retry_delays), ARRIVE, next(sequence), index, duration))
+                else:
+                    if draw < failure_threshold:
+                        failed[index] = True
+                    remaining[index] -= 1
+                    if remaining[index] == 0 and not failed[index]:
+                        time_to_green.append(now - pushes[index]["arrival"])
+        else:
+            now, index, duration = arrivals[position]
+            position += 1
+            waiting.append((now, index, duration))
+
+        while free and waiting:
+            queued_at, job_index, job_duration = waiting.popleft()
+            free -= 1
+            waits.append(now - queued_at)
+            busy += job_duration
+            heapq.heappush(events, (now + job_duration, FINISH, next(sequence), job_index, job_duration))
+
+    span = now - pushes[0]["arrival"] if pushes else 0.0
+    return {
+        "waits": waits,
+        "time_to_green": time_to_green,
+        "never_green": sum(failed),
+        "utilization": busy / (runners * span) if span > 0 else None
+    }
+
+
+def run_scenario(model, runners, volume=1.0, retry_scale=1.0, repetitions=REPETITIONS, seed=0):
+    """用多个随机种子仿真一个场景，合并各次结果的分布（排队和全绿时间以分钟计）"""
+    waits = []
+    time_to_green = []
+    never_green = 0
+    push_count = 0
+    utilizations = []
+    retry_rate = min(model["retry_rate"] * retry_scale, 0.99)
+    for repetition in range(repetitions):
+        rng = random.Random(seed * 1000003 + repetition)
+        pushes = scale_pushes(model["pushes"], volume, rng) if volume != 1 else model["pushes"]
+        result = simulate(pushes, runners, retry_rate, model["final_failure_rate"], model["retry_delays"], rng)
+        waits += result["waits"]
+        time_to_green += result["time_to_green"]
+        never_green += result["never_green"]
+        push_count += len(pushes)
+        if result["utilization"] is not None:
+            utilizations.append(result["utilization"])
+
+    return {
+        "runners": runners,
+        "volume": volume,
+        "retry_scale": retry_scale,
+        "pushes": round(push_count / repetitions),
+        "queue_wait_minutes": summarize_distribution([wait / 60 for wait in waits]),
+        "time_to_green_minutes": summarize_distribution([seconds / 60 for seconds in time_to_green]),
+        "never_green_pct": round(never_green / push_count * 100, 1) if push_count else None,
+        "utilization_pct": round(sum(utilizations) / len(utilizations) * 100, 1) if utilizations else None
+    }
+
+
+def sweep(model, runner_counts, volumes, retry_scales, repetitions=REPETITIONS, seed=0):
+    """扫描runner数量 × 推送量倍数 × 重跑率倍数的全部组合"""
+    return [
+        run_scenario(model, runners, volume, retry_scale, repetitions, seed)
+        for volume in volumes
+        for retry_scale in retry_scales
+        for runners in runner_counts
+    ]
+
+
+def print_results(model, results):
+    """输出历史数据概况和各场景的预测结果"""
+    observed = summarize_distribution([wait / 60 for wait in model["observed_waits"]])
+    print(f"历史数据：{len(model['pushes'])} 次推送，{sum(len(push['durations']) for push in model['pushes'])} 个NPU job，"
+          f"重跑率 {model['retry_rate'] * 100:.1f}%，最终失败率 {model['final_failure_rate'] * 100:.1f}%，"
+          f"实际排队等待 P50 {observed['p50']} / P90 {observed['p90']} 分钟")
+    print(f"{'runner数':>8} {'推送量':>6} {'重跑率':>6} {'推送数':>6} "
+          f"{'排队P50':>8} {'排队P90':>8} {'排队P95':>8} {'全绿P50':>8} {'全绿P90':>8} {'未全绿':>7} {'利用率':>7}")
+    for result in results:
+        wait = result["queue_wait_minutes"]
+        green = result["time_to_green_minutes"]
+        print(f"{result['runners']:>8} {result['volume']:>5}x {result['retry_scale']:>5}x {result['pushes']:>6} "
+              f"{_minutes(wait['p50']):>8} {_minutes(wait['p90']):>8} {_minutes(wait['p95']):>8} "
+              f"{_minutes(green['p50']):>8} {_minutes(green['p90']):>8} "
+              f"{_percent(result['never_green_pct']):>7} {_percent(result['utilization_pct']):>7}")
+
+
+def _minutes(value):
+    """分钟数的显示格式"""
+    return "-" if value is None else f"{value}m"
+
+
+def _percent(value):
+    """百分比的显示格式"""
+    return "-" if value is None else f"{value}%"
+
+
+def save_results(model, results, output_file=OUTPUT_FILE):
+    """保存仿真结果"""
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    content = {
+        "generated_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+        "model": {
+            "pushes": len(model["pushes"]),
+            "jobs": sum(len(push["durations"]) for push in model["pushes"]),
+            "retry_rate": round(model["retry_rate"], 4),
+            "final_failure_rate": round(model["final_failure_rate"], 4),
+            "observed_queue_wait_minutes": summarize_distribution([wait / 60 for wait in model["observed_waits"]])
+        },
+        "scenarios": results
+    }
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2, ensure_ascii=False)
+    print(f"仿真结果已保存到 {output_file}")
+    return output_file
+
+
+def _parse_list(value, cast):
+    """解析逗号分隔的参数列表"""
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="NPU runner排队仿真：回放历史负载并扫描推送量、runner数量和重跑率的假设场景")
+    parser.add_argument(
+        "--data-file",
+        help="PR数据快照文件 (默认: 数据目录中最新的快照)"
+    )
+    parser.add_argument(
+        "--runners",
+        help=f"要扫描的NPU runner数量，逗号分隔 (默认: 当前数量 {runner_cost.NPU_RUNNER_COUNT} 加 "
+             f"{', '.join(str(delta) for delta in DEFAULT_RUNNER_DELTAS)})"
+    )
+    parser.add_argument(
+        "--volumes",
+        default=",".join(str(volume) for volume in DEFAULT_VOLUMES),
+        help="要扫描的推送量倍数，逗号分隔，1为回放历史 (默认: %(default)s)"
+    )
+    parser.add_argument(
+        "--retry-scales",
+        default="1",
+        help="要扫描的重跑率倍数，逗号分隔，0表示没有重跑 (默认: %(default)s)"
+    )
+    parser.add_argument(
+        "--repetitions",
+        type=int,
+        default=REPETITIONS,
+        help="每个场景使用的随机种子数量 (默认: %(default)s)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="随机种子，相同的种子和数据得到相同的结果 (默认: %(default)s)"
+    )
+    parser.add_argument(
+        "--output",
+        default=OUTPUT_FILE,
+        help="仿真结果输出文件 (默认: %(default)s)"
+    )
+    args = parser.parse_args()
+
+    try:
+        runner_counts = _parse_list(args.runners, int) if args.runners else [
+            runner_cost.NPU_RUNNER_COUNT + delta for delta in DEFAULT_RUNNER_DELTAS
+        ]
+        volumes = _parse_list(args.volumes, float)
+        retry_scales = _parse_list(args.retry_scales, float)
+    except ValueError as e:
+        parser.error(f"参数格式错误: {e}")
+    if any(count < 1 for count in runner_counts) or any(volume <= 0 for volume in volumes) or args.repetitions < 1:
+        parser.error("runner数量、推送量倍数和随机种子数量必须为正数")
+
+    data_file = args.data_file
+    if not data_file:
+        snapshots = snapshot_diff.list_snapshot_files(DATA_DIR)
+        if not snapshots:
+            print(f"错误: 数据目录 {DATA_DIR} 中没有找到PR数据文件，请先运行 monitor_prs.py", file=sys.stderr)
+            sys.exit(1)
+        data_file = snapshots[-1]
+
+    model = build_model(snapshot_diff.iter_snapshot(data_file))
+    if not model["pushes"]:
+        print(f"错误: {data_file} 中没有已完成的NPU job记录", file=sys.stderr)
+        sys.exit(1)
+    print(f"已加载PR数据文件: {os.path.basename(data_file)}")
+
+    results = sweep(model, runner_counts, volumes, retry_scales, args.repetitions, args.seed)
+    print_results(model, results)
+    save_results(model, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
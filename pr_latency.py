@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+PR时延指标计算脚本
+
+功能：基于PR各提交上的check执行记录构建推送时间线，
+计算每次推送到首次门禁全绿的时间、达到全绿所需的推送次数、全绿到合入的时间，
+以及生命周期中等待CI的时间占比，全部以分布形式输出
+"""
+
+from datetime import datetime
+
+from gate_critical_path import green_time_from_attempts
+from stats_utils import summarize_distribution
+
+# 配置常量
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_time(value):
+    """解析GitHub时间字符串，空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+def build_push_timeline(pr):
+    """按推送顺序整理PR的每次推送：推送时间、门禁全绿时间、CI结束时间
+
+    推送时间取该提交上最早开始的check（一次推送多个提交时只有最后一个提交会触发CI），
+    没有check记录的提交不视为推送
+    """
+    attempts_by_sha = {}
+    for attempt in pr.get("check_attempts", []):
+        attempts_by_sha.setdefault(attempt["head_sha"], []).append(attempt)
+
+    pushes = []
+    for sha, attempts in attempts_by_sha.items():
+        started = [parse_time(a.get("started_at")) for a in attempts if a.get("started_at")]
+        if not started:
+            continue
+        completed = [parse_time(a.get("completed_at")) for a in attempts if a.get("completed_at")]
+        all_completed = all(a.get("status") == "completed" for a in attempts)
+        green_time, _ = green_time_from_attempts(attempts)
+        pushes.append({
+            "sha": sha,
+            "push_time": min(started),
+            "green_time": green_time,
+            # CI结束：门禁全绿，或全部check执行完成（失败）
+            "ci_done_time": green_time or (max(completed) if all_completed and completed else None)
+        })
+
+    pushes.sort(key=lambda p: p["push_time"])
+    return pushes
+
+
+def compute_pr_latency(pr):
+    """计算单个PR的时延指标，没有推送记录时返回None"""
+    pushes = build_push_timeline(pr)
+    if not pushes:
+        return None
+
+    # 每次推送到该推送首次全绿的时间
+    push_to_green = [
+        (push["green_time"] - push["push_time"]).total_seconds()
+        for push in pushes if push["green_time"]
+    ]
+
+    # 达到首次全绿所需的推送次数
+    pushes_to_green = None
+    first_green_time = None
+    for index, push in enumerate(pushes, 1):
+        if push["green_time"]:
+            pushes_to_green = index
+            first_green_time = push["green_time"]
+            break
+
+    # 最终提交全绿到合入的时间
+    merged_at = parse_time(pr.get("merged_at"))
+    final_green = pushes[-1]["green_time"] if pushes[-1]["sha"] == pr.get("head_sha") else None
+    green_to_merge = None
+    if merged_at and final_green and merged_at >= final_green:
+        green_to_merge = (merged_at - final_green).total_seconds()
+
+    # 等待CI的时间：每次推送到CI结束（或被下一次推送取代）为止
+    ci_wait_seconds = 0.0
+    for index, push in enumerate(pushes):
+        next_push = pushes[index + 1]["push_time"] if index + 1 < len(pushes) else None
+        wait_ends = [t for t in (push["ci_done_time"], next_push) if t is not None]
+        if wait_ends and min(wait_ends) > push["push_time"]:
+            ci_wait_seconds += (min(wait_ends) - push["push_time"]).total_seconds()
+
+    # 生命周期中等待CI的占比（只统计已合入/关闭的PR）
+    created_at = parse_time(pr["created_at"])
+    ended_at = merged_at or parse_time(pr.get("closed_at"))
+    ci_wait_share = None
+    if ended_at and ended_at > created_at:
+        ci_wait_share = min(ci_wait_seconds / (ended_at - created_at).total_seconds(), 1.0) * 100
+
+    return {
+        "pr_number": pr["pr_number"],
+        "push_count": len(pushes),
+        "push_to_green": push_to_green,
+        "first_push_to_green": (first_green_time - pushes[0]["push_time"]).total_seconds() if first_green_time else None,
+        "pushes_to_green": pushes_to_green,
+        "green_to_merge": green_to_merge,
+        "ci_wait_seconds": ci_wait_seconds,
+        "ci_wait_share": ci_wait_share
+    }
+
+
+def aggregate_latency_metrics(latencies):
+    """汇总各PR的时延指标（compute_pr_latency的非空结果）为分布"""
+    if not latencies:
+        return {}
+
+    return {
+        "pr_count": len(latencies),
+        "never_green_count": sum(1 for latency in latencies if latency["pushes_to_green"] is None),
+        "push_to_green": summarize_distribution(
+            [seconds for latency in latencies for seconds in latency["push_to_green"]]
+        ),
+        "first_push_to_green": summarize_distribution([latency["first_push_to_green"] for latency in latencies]),
+        "pushes_to_green": summarize_distribution([latency["pushes_to_green"] for latency in latencies]),
+        "green_to_merge": summarize_distribution([latency["green_to_merge"] for latency in latencies]),
+        "ci_wait_share": summarize_distribution([latency["ci_wait_share"] for latency in latencies])
+    }
+
+
+def calculate_latency_metrics(pr_data):
+    """汇总全部PR的时延指标分布"""
+    return aggregate_latency_metrics([latency for latency in (compute_pr_latency(pr) for pr in pr_data) if latency])
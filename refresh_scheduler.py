@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+分层刷新调度
+
+功能：根据已保存的PR数据为每个PR分配刷新层级，把API额度用在数据还会变化的PR上：
+- hot：新出现的PR、状态发生变化或上次同步后有更新的PR（包括已关闭的PR）、上次没有获取到最新数据（stale）的PR、
+  门禁未结束或有未完成workflow run的PR、最近有推送的open PR，每次运行都刷新
+- warm：没有动静的open PR，距上次刷新超过一定时间才刷新
+- frozen：已关闭/合入、门禁已有最终结果且workflow run全部完成的PR，不再刷新（重新打开时会变为hot）
+"""
+
+from datetime import datetime, timedelta, timezone
+
+# 配置常量
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+TIERS = ("hot", "warm", "frozen")
+HOT_PUSH_HOURS = 24  # 最近一次推送在该小时数内的open PR为hot
+WARM_REFRESH_HOURS = 6  # warm PR的刷新间隔（小时）
+FINAL_GATE_STATUSES = ("passed", "failed")
+
+
+def _parse_time(value):
+    """解析时间字符串，空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def last_push_time(record):
+    """PR最近一次推送的时间：最新提交时间和最新workflow run创建时间中较晚的一个"""
+    times = [commit.get("committed_at") for commit in record.get("commits", [])]
+    times += [run.get("created_at") for run in record.get("workflow_runs", [])]
+    times = [value for value in times if value]
+    return _parse_time(max(times)) if times else None
+
+
+def assign_tier(record, listed_pr=None, now=None):
+    """根据已保存的记录（以及本次PR列表中的对象）分配刷新层级，返回 (层级, 原因)"""
+    now = now or datetime.now(timezone.utc)
+    if record is None:
+        return "hot", "new"
+    if listed_pr is not None:
+        if listed_pr.get("state") and listed_pr["state"] != record.get("status"):
+            return "hot", "state_changed"
+        # 关闭后的评审、撤回评审请求等也会更新updated_at，有更新的PR不论状态都要刷新
+        if listed_pr.get("updated_at") != record.get("updated_at"):
+            return "hot", "updated"
+
+    # 上次没有获取到最新数据的记录不可信，先刷新再分层
+    if record.get("stale"):
+        return "hot", "stale"
+    runs_unfinished = any(run.get("status") != "completed" for run in record.get("workflow_runs", []))
+    gate_final = record.get("门禁_status") in FINAL_GATE_STATUSES
+    if record.get("status") != "open":
+        if runs_unfinished:
+            return "hot", "runs_unfinished"
+        return ("frozen", "closed") if gate_final else ("hot", "gate_pending")
+    if runs_unfinished or not gate_final:
+        return "hot", "gate_pending"
+    pushed_at = last_push_time(record)
+    if pushed_at and now - pushed_at <= timedelta(hours=HOT_PUSH_HOURS):
+        return "hot", "recent_push"
+    return "warm", "quiet"
+
+
+def is_due(tier, record, now=None):
+    """该层级的PR本次是否需要刷新"""
+    if tier == "hot":
+        return True
+    if tier == "frozen":
+        return False
+    refreshed_at = _parse_time(record.get("refreshed_at"))
+    now = now or datetime.now(timezone.utc)
+    return refreshed_at is None or now - refreshed_at >= timedelta(hours=WARM_REFRESH_HOURS)
+
+
+def new_tier_stats():
+    """各层级的统计：分配到该层级的PR数、本次刷新的PR数、跳过的PR数、刷新消耗的API请求数"""
+    return {tier: {"prs": 0, "refreshed": 0, "skipped": 0, "requests": 0} for tier in TIERS}
+
+
+def schedule(candidates, stored, tier_stats, refresh_all=False, forced=()):
+    """从候选PR中选出本次需要刷新的PR
+
+    candidates为PR列表接口返回的对象（或只有number/updated_at的占位对象，listed为False），
+    stored为 {PR编号: 已保存的记录}，forced为不论层级都要刷新的PR编号（上次被推迟的PR）；
+    返回 (需要刷新的PR列表, {PR编号: 层级})
+    """
+    now = datetime.now(timezone.utc)
+    due_prs = []
+    tiers = {}
+    for pr, listed in candidates:
+        record = stored.get(pr["number"])
+        tier, _ = assign_tier(record, pr if listed else None, now)
+        tier_stats[tier]["prs"] += 1
+        if refresh_all or pr["number"] in forced or is_due(tier, record, now):
+            due_prs.append(pr)
+            tiers[pr["number"]] = tier
+        else:
+            tier_stats[tier]["skipped"] += 1
+    return due_prs, tiers
+
+
+def format_tier_stats(tier_stats):
+    """各层级统计的单行摘要"""
+    return "，".join(
+        f"{tier}: {stats['prs']} 个PR（刷新 {stats['refreshed']}，跳过 {stats['skipped']}，请求 {stats['requests']} 次）"
+        for tier, stats in tier_stats.items()
+    )
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+离线报告打包工具
+
+功能：将Chart.js等前端依赖下载到本地vendor目录，按内容哈希命名复制到离线包中，
+报告数据与页面分离为单独的脚本文件，并为每个文件生成预压缩的.gz和.br副本，
+离线包不依赖CDN，可直接在无网络的机器上打开
+"""
+
+import os
+import gzip
+import hashlib
+
+import requests
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 配置常量
+VENDOR_DIR = "vendor"  # 前端依赖的本地缓存目录
+CHART_JS_VERSION = "4.4.1"  # 离线包使用的Chart.js版本（固定版本，保证内容哈希稳定）
+CHART_JS_URL = f"https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}/dist/chart.umd.min.js"
+CHART_JS_FILE = os.path.join(VENDOR_DIR, f"chart-{CHART_JS_VERSION}.umd.min.js")
+ASSETS_DIR_NAME = "assets"  # 离线包中存放带哈希资源的子目录
+HASH_LENGTH = 12  # 文件名中内容哈希的长度
+COMPRESS_EXTENSIONS = (".html", ".js", ".json", ".css")  # 需要预压缩的文件类型
+DOWNLOAD_TIMEOUT = 30  # 下载依赖的超时时间（秒）
+
+
+def vendor_asset(url=CHART_JS_URL, vendor_file=CHART_JS_FILE):
+    """获取前端依赖的本地副本，不存在时下载一次，返回本地路径"""
+    if os.path.exists(vendor_file):
+        return vendor_file
+
+    print(f"下载前端依赖: {url}")
+    response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+
+    vendor_dir = os.path.dirname(vendor_file)
+    if vendor_dir and not os.path.exists(vendor_dir):
+        os.makedirs(vendor_dir)
+    temp_file = f"{vendor_file}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(response.content)
+    os.replace(temp_file, vendor_file)
+    return vendor_file
+
+
+def hashed_name(prefix, digest, suffix):
+    """生成带内容哈希的文件名，例如 chart.3f2a9c1b0d4e.min.js"""
+    return f"{prefix}.{digest[:HASH_LENGTH]}{suffix}"
+
+
+def copy_hashed(source_file, assets_dir, prefix, suffix):
+    """按内容哈希复制文件到资源目录，返回新文件名"""
+    with open(source_file, "rb") as f:
+        content = f.read()
+    name = hashed_name(prefix, hashlib.sha256(content).hexdigest(), suffix)
+    target = os.path.join(assets_dir, name)
+    if not os.path.exists(target):
+        with open(target, "wb") as f:
+            f.write(content)
+    return name
+
+
+def write_hashed(chunks, assets_dir, prefix, suffix):
+    """将逐块生成的文本写入资源目录，边写边计算哈希，写完后按内容哈希重命名，返回文件名"""
+    digest = hashlib.sha256()
+    temp_file = os.path.join(assets_dir, f"{prefix}{suffix}.tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            digest.update(chunk.encode("utf-8"))
+    name = hashed_name(prefix, digest.hexdigest(), suffix)
+    os.replace(temp_file, os.path.join(assets_dir, name))
+    return name
+
+
+def precompress(file_path):
+    """生成预压缩的.gz（以及安装了brotli时的.br）副本，返回生成的文件列表"""
+    with open(file_path, "rb") as f:
+        content = f.read()
+
+    outputs = []
+    # mtime固定为0，内容不变时压缩结果也不变
+    with open(f"{file_path}.gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    outputs.append(f"{file_path}.gz")
+
+    if brotli is not None:
+        with open(f"{file_path}.br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+        outputs.append(f"{file_path}.br")
+    return outputs
+
+
+def prepare_bundle_dir(bundle_dir):
+    """创建离线包目录结构，返回资源目录路径"""
+    assets_dir = os.path.join(bundle_dir, ASSETS_DIR_NAME)
+    if not os.path.exists(assets_dir):
+        os.makedirs(assets_dir)
+    return assets_dir
+
+
+def finalize_bundle(bundle_dir, keep_files):
+    """清理上次打包遗留的旧资源，并为保留的文件生成预压缩副本"""
+    keep = {os.path.abspath(path) for path in keep_files}
+    assets_dir = os.path.join(bundle_dir, ASSETS_DIR_NAME)
+    for name in os.listdir(assets_dir):
+        path = os.path.abspath(os.path.join(assets_dir, name))
+        base = path[:-3] if path.endswith((".gz", ".br")) else path
+        if base not in keep:
+            os.remove(path)
+
+    compressed = []
+    for path in keep_files:
+        if path.endswith(COMPRESS_EXTENSIONS):
+            compressed.extend(precompress(path))
+
+    if brotli is None:
+        print("未安装brotli，离线包只生成.gz预压缩文件（pip install brotli 后可同时生成.br）")
+    return compressed
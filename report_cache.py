@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+报告渲染缓存
+
+功能：以输入数据文件、代码（含报告模板）和生成参数的哈希作为报告的内容地址，
+未变化时直接跳过渲染；输入变化时按PR记录的哈希复用单个PR的分析结果和表格行，只重新计算有变化的PR
+"""
+
+import os
+import json
+import hashlib
+
+# 配置常量
+CACHE_DIR = ".report_cache"  # 缓存目录
+MANIFEST_FILE = os.path.join(CACHE_DIR, "render_manifest.json")  # 上次渲染的内容地址与输出文件哈希
+FRAGMENT_FILE = os.path.join(CACHE_DIR, "pr_fragments.json")  # 单个PR的分析结果与表格行
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024  # 计算文件哈希时每次读取的字节数
+
+
+def file_sha256(file_path):
+    """分块计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(code_dir):
+    """计算代码目录下全部Python脚本的哈希（报告模板内嵌在脚本中，一并覆盖）"""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(code_dir)):
+        if name.endswith(".py"):
+            digest.update(name.encode("utf-8"))
+            digest.update(file_sha256(os.path.join(code_dir, name)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def compute_render_key(data_file, code_dir, options):
+    """计算报告的内容地址：输入数据文件 + 代码版本 + 影响输出的生成参数"""
+    digest = hashlib.sha256()
+    digest.update(file_sha256(data_file).encode("ascii"))
+    digest.update(code_version(code_dir).encode("ascii"))
+    digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_json(file_path):
+    """读取缓存文件，不存在、损坏或版本不一致时返回None"""
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    except ValueError:
+        print(f"缓存文件 {file_path} 已损坏，将重新生成")
+        return None
+    if content.get("version") != CACHE_VERSION:
+        return None
+    return content
+
+
+def _save_json(content, file_path):
+    """先写临时文件再替换，避免中断时留下不完整的缓存"""
+    cache_dir = os.path.dirname(file_path)
+    if cache_dir and not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    temp_file = f"{file_path}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_file, file_path)
+
+
+def is_render_cached(render_key, output_files, manifest_file=MANIFEST_FILE):
+    """上次渲染的内容地址相同且输出文件未被改动时返回True"""
+    manifest = _load_json(manifest_file)
+    if not manifest or manifest.get("render_key") != render_key:
+        return False
+
+    outputs = manifest.get("outputs", {})
+    for output_file in output_files:
+        if output_file not in outputs or not os.path.exists(output_file):
+            return False
+        if file_sha256(output_file) != outputs[output_file]:
+            return False
+    return True
+
+
+def record_render(render_key, output_files, manifest_file=MANIFEST_FILE):
+    """记录本次渲染的内容地址和输出文件哈希"""
+    _save_json({
+        "version": CACHE_VERSION,
+        "render_key": render_key,
+        "outputs": {output_file: file_sha256(output_file) for output_file in output_files}
+    }, manifest_file)
+
+
+def pr_fragment_key(pr):
+    """按PR记录的完整内容计算哈希，记录任何字段变化都会得到新的key"""
+    return hashlib.sha256(json.dumps(pr, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def load_fragment_cache(fragment_file=FRAGMENT_FILE):
+    """加载PR片段缓存，不存在或版本不一致时返回空缓存"""
+    return _load_json(fragment_file) or {"version": CACHE_VERSION, "code_version": None, "fragments": {}}
+
+
+def get_pr_fragments(cache, pr_data, current_code_version):
+    """按PR记录哈希取出各PR的片段（与pr_data一一对应），未命中的PR返回空片段，计算结果会直接写入其中
+
+    代码版本变化时旧片段全部失效
+    """
+    if cache.get("code_version") != current_code_version:
+        cache["fragments"] = {}
+        cache["code_version"] = current_code_version
+
+    fragments = []
+    hits = 0
+    for pr in pr_data:
+        key = pr_fragment_key(pr)
+        fragment = cache["fragments"].get(key)
+        if fragment is None:
+            fragment = {}
+        else:
+            hits += 1
+        fragments.append((key, fragment))
+
+    print(f"PR片段缓存命中 {hits} / {len(pr_data)} 个PR")
+    return fragments
+
+
+def cached_value(fragment, name, compute, *args):
+    """从PR片段中取出指定的计算结果，不存在时计算并写入片段；fragment为None时直接计算"""
+    if fragment is None:
+        return compute(*args)
+    if name not in fragment:
+        fragment[name] = compute(*args)
+    return fragment[name]
+
+
+def save_fragment_cache(cache, fragments, fragment_file=FRAGMENT_FILE):
+    """只保留本次数据中仍存在的PR片段并保存"""
+    cache["fragments"] = {key: fragment for key, fragment in fragments}
+    _save_json(cache, fragment_file)
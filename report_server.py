@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+PR效率看板服务
+
+功能：将最新PR数据和计算好的指标常驻内存，通过HTTP提供看板页面和JSON接口，
+响应带ETag和Cache-Control；数据目录中的最新数据文件变化时才重新计算，
+多人同时访问只会触发一次计算
+"""
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import chart_downsample
+import generate_pr_report
+import metrics_exporter
+import report_cache
+import runner_cost
+
+# 配置常量
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+RELOAD_CHECK_SECONDS = 30  # 检查数据文件是否变化的最小间隔（秒）
+CACHE_MAX_AGE = 60  # 响应的Cache-Control max-age（秒），过期后浏览器用ETag重新验证
+FILTER_CACHE_SIZE = 128  # 每个数据快照缓存的PR筛选结果数量
+DEFAULT_PAGE_SIZE = 100  # /api/prs 默认返回的PR数量
+MAX_PAGE_SIZE = 1000  # /api/prs 单次最多返回的PR数量
+MIN_GZIP_BYTES = 1024  # 超过该大小的响应才做gzip压缩
+
+# 接口路径（看板页面通过相对路径加载PR表格数据和执行时长完整序列）
+PR_TABLE_PATH = "api/prs/table"
+DURATIONS_PATH = "api/durations"
+
+
+def make_response(body, content_type):
+    """构造可缓存的响应：内容、ETag，以及按需生成的gzip压缩内容"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return {
+        "body": body,
+        "content_type": content_type,
+        "etag": f'"{hashlib.sha256(body + content_type.encode("utf-8")).hexdigest()[:32]}"',
+        "gzip": gzip.compress(body, mtime=0) if len(body) >= MIN_GZIP_BYTES else None
+    }
+
+
+def json_response(value):
+    """构造JSON响应"""
+    return make_response(
+        json.dumps(value, ensure_ascii=False, separators=(",", ":")),
+        "application/json; charset=utf-8"
+    )
+
+
+def data_signature():
+    """返回 (最新数据文件路径, 签名)，数据目录不存在或没有数据文件时返回 (None, None)"""
+    try:
+        data_file = generate_pr_report.find_latest_pr_data_file()
+    except SystemExit:
+        return None, None
+    stat = os.stat(data_file)
+    return data_file, (data_file, stat.st_mtime_ns, stat.st_size)
+
+
+def build_snapshot(store, data_file, signature):
+    """加载数据、计算指标并预先生成全部静态响应"""
+    options = store["options"]
+    started = time.time()
+
+    pr_data = generate_pr_report.load_latest_pr_data(data_file)
+    fragment_entries = report_cache.get_pr_fragments(store["fragment_cache"], pr_data, store["code_version"])
+    fragments = [fragment for _, fragment in fragment_entries]
+    # 看板服务只读：回归检测、flaky统计和runner耗时账本在内存中计算，不改写持久化状态，
+    # 否则每日任务会把看板已处理过的回归视为旧告警
+    metrics, _ = generate_pr_report.compute_report_metrics(
+        pr_data, fragments, npu_runner_count=options["npu_runner_count"], data_file=data_file, persist=False
+    )
+    report_cache.save_fragment_cache(store["fragment_cache"], fragment_entries)
+
+    # 指标接口的内容在快照中预先生成，抓取时不做任何计算
+    metrics_text = metrics_exporter.build_openmetrics(metrics)
+
+    # 看板页面：表格数据和执行时长完整序列通过接口加载
+    page_parts = []
+    generate_pr_report.render_report(page_parts.append, generate_pr_report.build_report_context(
+        pr_data, metrics,
+        pr_table_data_src=PR_TABLE_PATH,
+        duration_chart_data_src=DURATIONS_PATH,
+        chart_max_points=options["chart_max_points"],
+        fragments=fragments
+    ))
+
+    # 筛选接口使用的PR行：表格行 + 标签
+    rows = []
+    for pr, fragment in zip(pr_data, fragments):
+        row = dict(report_cache.cached_value(fragment, "row", generate_pr_report.build_pr_table_row, pr))
+        row["labels"] = [label.get("name") for label in pr.get("labels", [])]
+        rows.append(row)
+
+    snapshot = {
+        "signature": signature,
+        "data_file": os.path.basename(data_file),
+        "loaded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "rows": rows,
+        "metrics_text": make_response(metrics_text, metrics_exporter.PROMETHEUS_CONTENT_TYPE),
+        "responses": {
+            "/": make_response("".join(page_parts), "text/html; charset=utf-8"),
+            "/metrics": make_response(metrics_text, metrics_exporter.OPENMETRICS_CONTENT_TYPE),
+            "/api/metrics": json_response({
+                key: value for key, value in metrics.items() if key != "duration_stats"
+            }),
+            f"/{PR_TABLE_PATH}": make_response(
+                "".join(generate_pr_report.iter_pr_table_payload(pr_data, fragments)),
+                "application/json; charset=utf-8"
+            ),
+            f"/{DURATIONS_PATH}": make_response(
+                "".join(generate_pr_report.iter_json_payload(
+                    generate_pr_report.build_duration_series(metrics["duration_stats"])
+                )),
+                "application/json; charset=utf-8"
+            )
+        },
+        "filter_cache": OrderedDict(),
+        "filter_lock": threading.Lock()
+    }
+    print(f"数据快照已更新: {snapshot['data_file']}，共 {len(pr_data)} 个PR，耗时 {time.time() - started:.1f}s")
+    return snapshot
+
+
+def get_snapshot(store):
+    """获取当前数据快照，到达检查间隔时检查数据文件是否变化
+
+    同一时间只有一个请求会检查和重新计算；已有快照时其他请求不等待，继续使用旧快照
+    """
+    snapshot = store["snapshot"]
+    if snapshot is not None and time.monotonic() - store["checked_at"] < store["options"]["reload_interval"]:
+        return snapshot
+
+    if not store["lock"].acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        snapshot = store["snapshot"]
+        if snapshot is not None and time.monotonic() - store["checked_at"] < store["options"]["reload_interval"]:
+            return snapshot
+
+        data_file, signature = data_signature()
+        if data_file and (snapshot is None or signature != snapshot["signature"]):
+            snapshot = build_snapshot(store, data_file, signature)
+            store["snapshot"] = snapshot
+        store["checked_at"] = time.monotonic()
+        return snapshot
+    finally:
+        store["lock"].release()
+
+
+def filter_rows(rows, query):
+    """按查询参数筛选PR行：status、creator、gate、label、since/until（创建日期）、q（标题关键字）"""
+    status = query.get("status")
+    creator = query.get("creator")
+    gate = query.get("gate")
+    label = query.get("label")
+    since = query.get("since")
+    until = query.get("until")
+    keyword = (query.get("q") or "").lower()
+
+    result = []
+    for row in rows:
+        if status and row["status"] != status:
+            continue
+        if creator and row["creator"] != creator:
+            continue
+        if gate and row["gate"] != gate:
+            continue
+        if label and label not in row["labels"]:
+            continue
+        if since and row["created_at"][:10] < since:
+            continue
+        if until and row["created_at"][:10] > until:
+            continue
+        if keyword and keyword not in row["title"].lower():
+            continue
+        result.append(row)
+    return result
+
+
+def filtered_prs_response(snapshot, raw_query):
+    """返回PR筛选结果（分页），相同查询在同一快照内只计算一次"""
+    query = {key: values[-1] for key, values in parse_qs(raw_query).items() if values}
+    try:
+        offset = max(int(query.pop("offset", 0)), 0)
+        limit = min(max(int(query.pop("limit", DEFAULT_PAGE_SIZE)), 0), MAX_PAGE_SIZE)
+    except ValueError:
+        return None
+    cache_key = (tuple(sorted(query.items())), offset, limit)
+
+    with snapshot["filter_lock"]:
+        response = snapshot["filter_cache"].get(cache_key)
+        if response is not None:
+            snapshot["filter_cache"].move_to_end(cache_key)
+            return response
+
+    matched = filter_rows(snapshot["rows"], query)
+    response = json_response({
+        "data_file": snapshot["data_file"],
+        "total": len(matched),
+        "offset": offset,
+        "limit": limit,
+        "items": matched[offset:offset + limit]
+    })
+
+    with snapshot["filter_lock"]:
+        snapshot["filter_cache"][cache_key] = response
+        while len(snapshot["filter_cache"]) > FILTER_CACHE_SIZE:
+            snapshot["filter_cache"].popitem(last=False)
+    return response
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """看板HTTP请求处理"""
+
+    def do_GET(self):
+        """处理GET请求"""
+        parsed = urlparse(self.path)
+        snapshot = get_snapshot(self.server.store)
+        if snapshot is None:
+            self.send_error(503, "Service Unavailable", "PR数据尚未生成")
+            return
+
+        if parsed.path == "/api/prs":
+            response = filtered_prs_response(snapshot, parsed.query)
+            if response is None:
+                self.send_error(400, "Bad Request", "offset/limit 必须是整数")
+                return
+        elif parsed.path == "/metrics":
+            # 按Accept协商：Prometheus请求OpenMetrics时返回OpenMetrics，否则按text格式0.0.4返回
+            if "application/openmetrics-text" in self.headers.get("Accept", ""):
+                response = snapshot["responses"]["/metrics"]
+            else:
+                response = snapshot["metrics_text"]
+            self.send_cached(response, vary="Accept, Accept-Encoding")
+            return
+        else:
+            response = snapshot["responses"].get(parsed.path)
+        if response is None:
+            self.send_error(404)
+            return
+        self.send_cached(response)
+
+    def send_cached(self, response, vary="Accept-Encoding"):
+        """发送带ETag和Cache-Control的响应，内容未变化时返回304"""
+        cache_headers = {
+            "ETag": response["etag"],
+            "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
+            "Vary": vary
+        }
+        if response["etag"] in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        body = response["body"]
+        use_gzip = response["gzip"] is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        if use_gzip:
+            body = response["gzip"]
+
+        self.send_response(200)
+        self.send_header("Content-Type", response["content_type"])
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in cache_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="启动PR效率看板服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"监听地址 (默认: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口 (默认: {DEFAULT_PORT})")
+    parser.add_argument(
+        "--reload-interval",
+        type=int,
+        default=RELOAD_CHECK_SECONDS,
+        help=f"检查数据文件是否变化的间隔秒数 (默认: {RELOAD_CHECK_SECONDS})"
+    )
+    parser.add_argument(
+        "--npu-runner-count",
+        type=int,
+        default=runner_cost.NPU_RUNNER_COUNT,
+        help=f"可用NPU runner数量，用于计算每日容量 (默认: {runner_cost.NPU_RUNNER_COUNT})"
+    )
+    parser.add_argument(
+        "--chart-max-points",
+        type=int,
+        default=chart_downsample.CHART_MAX_POINTS,
+        help=f"执行时长趋势图每条曲线最多绘制的点数 (默认: {chart_downsample.CHART_MAX_POINTS})"
+    )
+    args = parser.parse_args()
+
+    store = {
+        "lock": threading.Lock(),
+        "snapshot": None,
+        "checked_at": 0.0,
+        "fragment_cache": report_cache.load_fragment_cache(),
+        "code_version": report_cache.code_version(os.path.dirname(os.path.abspath(__file__))),
+        "options": {
+            "reload_interval": args.reload_interval,
+            "npu_runner_count": args.npu_runner_count,
+            "chart_max_points": args.chart_max_points
+        }
+    }
+
+    # 启动前先加载一次，数据不存在时直接报错退出
+    generate_pr_report.find_latest_pr_data_file()
+    get_snapshot(store)
+
+    server = ThreadingHTTPServer((args.host, args.port), DashboardHandler)
+    server.daemon_threads = True
+    server.store = store
+    print(f"PR效率看板已启动: http://{args.host}:{args.port}/")
+    print("接口: /metrics (OpenMetrics), /api/metrics, /api/prs?status=&creator=&gate=&label=&since=&until=&q=&offset=&limit=, "
+          f"/{PR_TABLE_PATH}, /{DURATIONS_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n看板服务已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
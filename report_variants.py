@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+PR效率报告批量生成
+
+功能：按配置文件中的变体定义（标签、仓库、时间窗口、团队等筛选条件）批量生成多份报告，
+数据只加载和解析一次，单个PR的分析结果在主进程中预先算好，
+再通过fork与多个工作进程只读共享，各变体在多核上并行计算指标和渲染报告
+"""
+
+import os
+import re
+import gc
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+
+import chart_downsample
+import gate_critical_path
+import generate_pr_report
+import pr_latency
+import report_cache
+import runner_cost
+
+# 配置常量
+VARIANTS_OUTPUT_DIR = "report_variants"  # 报告变体输出目录
+VARIANT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")  # 变体名称同时作为输出文件名
+REPO_URL_PATTERN = re.compile(r"^https://github\.com/([^/]+/[^/]+)/pull/")  # 从PR链接中解析仓库
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# 工作进程通过fork继承的只读数据（PR数据、PR片段、变体定义和生成参数）
+_SHARED = {}
+
+
+def load_variants(config_file):
+    """读取变体配置，返回变体列表，团队名称展开为创建者列表
+
+    配置格式：{"teams": {"团队名": ["创建者", ...]}, "variants": [{"name": ..., 筛选条件...}, ...]}，
+    也可以直接是变体列表
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {"variants": config}
+
+    teams = config.get("teams", {})
+    variants = []
+    names = set()
+    for variant in config.get("variants", []):
+        name = variant.get("name", "")
+        if not VARIANT_NAME_PATTERN.match(name):
+            raise ValueError(f"变体名称 {name!r} 无效，只能包含字母、数字、下划线、点和短横线")
+        if name in names:
+            raise ValueError(f"变体名称 {name!r} 重复")
+        names.add(name)
+
+        variant = dict(variant)
+        if "team" in variant:
+            if variant["team"] not in teams:
+                raise ValueError(f"变体 {name} 引用的团队 {variant['team']!r} 未在teams中定义")
+            variant["creators"] = list(variant.get("creators", [])) + teams[variant["team"]]
+        variants.append(variant)
+    return variants
+
+
+def pr_repo(pr):
+    """PR所属仓库（owner/name），数据中没有repo字段时从PR链接解析"""
+    if pr.get("repo"):
+        return pr["repo"]
+    match = REPO_URL_PATTERN.match(pr.get("html_url", ""))
+    return match.group(1) if match else None
+
+
+def variant_matcher(variant, pr_data):
+    """根据变体定义生成PR筛选函数，各条件之间为"且"的关系
+
+    支持的条件：labels（包含任一标签）、repo、creators / team、status、
+    since / until（创建日期，YYYY-MM-DD）、days（数据中最新PR创建时间之前的天数）
+    """
+    labels = set(variant.get("labels", []))
+    repo = variant.get("repo")
+    creators = set(variant.get("creators", []))
+    status = variant.get("status")
+    since = variant.get("since")
+    until = variant.get("until")
+    if variant.get("days"):
+        latest = max(datetime.strptime(pr["created_at"], TIME_FORMAT) for pr in pr_data)
+        window_start = (latest - timedelta(days=variant["days"])).strftime(TIME_FORMAT)
+    else:
+        window_start = None
+
+    def matches(pr):
+        if labels and not any(label.get("name") in labels for label in pr.get("labels", [])):
+            return False
+        if repo and pr_repo(pr) != repo:
+            return False
+        if creators and pr["creator"] not in creators:
+            return False
+        if status and pr["status"] != status:
+            return False
+        if since and pr["created_at"][:10] < since:
+            return False
+        if until and pr["created_at"][:10] > until:
+            return False
+        if window_start and pr["created_at"] < window_start:
+            return False
+        return True
+
+    return matches
+
+
+def warm_fragments(pr_data, fragments):
+    """在主进程中预先计算每个PR的分析结果和表格行，工作进程只读取不重复计算"""
+    for pr, fragment in zip(pr_data, fragments):
+        report_cache.cached_value(fragment, "timeline", gate_critical_path.analyze_gate_timeline, pr)
+        report_cache.cached_value(fragment, "latency", pr_latency.compute_pr_latency, pr)
+        report_cache.cached_value(fragment, "row", generate_pr_report.build_pr_table_row, pr)
+
+
+def compute_variant_metrics(pr_data, fragments, npu_runner_count=runner_cost.NPU_RUNNER_COUNT):
+    """计算单个变体的全部指标
+
+    回归检测、flaky统计和runner耗时账本在内存中基于变体数据从头计算，不读写持久化状态文件
+    （持久化状态只由完整报告的增量更新维护）
+    """
+    metrics, _ = generate_pr_report.compute_report_metrics(
+        pr_data, fragments, npu_runner_count=npu_runner_count, persist=False
+    )
+    return metrics
+
+
+def render_variant(index):
+    """渲染一个报告变体（在工作进程中执行），返回 (变体名称, 输出文件, PR数量, 耗时)"""
+    started = time.time()
+    variant = _SHARED["variants"][index]
+    options = _SHARED["options"]
+    pr_data = _SHARED["pr_data"]
+    fragments = _SHARED["fragments"]
+
+    matches = variant_matcher(variant, pr_data)
+    selected = [i for i, pr in enumerate(pr_data) if matches(pr)]
+    if not selected:
+        return variant["name"], None, 0, time.time() - started
+
+    variant_prs = [pr_data[i] for i in selected]
+    variant_fragments = [fragments[i] for i in selected]
+    metrics = compute_variant_metrics(variant_prs, variant_fragments, options["npu_runner_count"])
+    output_file = os.path.join(options["output_dir"], f"{variant['name']}.html")
+    generate_pr_report.write_html_report(
+        variant_prs, metrics, output_file,
+        report_data=options["report_data"],
+        chart_max_points=options["chart_max_points"],
+        fragments=variant_fragments,
+        report_scope=variant.get("title", variant["name"])
+    )
+    return variant["name"], output_file, len(selected), time.time() - started
+
+
+def render_variants(pr_data, fragments, variants, options, workers=None):
+    """并行渲染全部变体，支持fork的平台上工作进程与主进程共享已加载的数据，否则在当前进程中依次渲染"""
+    _SHARED.update(pr_data=pr_data, fragments=fragments, variants=variants, options=options)
+    workers = min(workers or os.cpu_count() or 1, len(variants))
+
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [render_variant(index) for index in range(len(variants))]
+
+    # 冻结已加载的对象，避免工作进程中的垃圾回收扫描触发写时复制，使共享数据的内存页保持共享
+    gc.collect()
+    gc.freeze()
+    sys.stdout.flush()
+    try:
+        with multiprocessing.get_context("fork").Pool(processes=workers) as pool:
+            return list(pool.imap_unordered(render_variant, range(len(variants))))
+    finally:
+        gc.unfreeze()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按变体配置批量生成PR效率报告")
+    parser.add_argument("--variants", required=True, metavar="FILE", help="变体配置文件（JSON）")
+    parser.add_argument(
+        "--output-dir",
+        default=VARIANTS_OUTPUT_DIR,
+        help=f"报告变体输出目录，每个变体生成 <变体名称>.html (默认: {VARIANTS_OUTPUT_DIR})"
+    )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        default=os.cpu_count(),
+        help=f"并行渲染的工作进程数 (默认: CPU核数 {os.cpu_count()})"
+    )
+    parser.add_argument(
+        "--npu-runner-count",
+        type=int,
+        default=runner_cost.NPU_RUNNER_COUNT,
+        help=f"可用NPU runner数量，用于计算每日容量 (默认: {runner_cost.NPU_RUNNER_COUNT})"
+    )
+    parser.add_argument(
+        "--report-data",
+        choices=("inline", "file"),
+        default="inline",
+        help="PR详情表格数据和执行时长完整序列内嵌到报告中(inline)，或写入报告旁的JSON文件(file) (默认: inline)"
+    )
+    parser.add_argument(
+        "--chart-max-points",
+        type=int,
+        default=chart_downsample.CHART_MAX_POINTS,
+        help=f"执行时长趋势图每条曲线最多绘制的点数 (默认: {chart_downsample.CHART_MAX_POINTS})"
+    )
+    args = parser.parse_args()
+
+    try:
+        variants = load_variants(args.variants)
+        if not variants:
+            print(f"变体配置 {args.variants} 中没有定义变体")
+            return
+        if not os.path.exists(args.output_dir):
+            os.makedirs(args.output_dir)
+
+        # 数据只加载一次，单个PR的分析结果在主进程中算好（并复用片段缓存），供所有变体共享
+        started = time.time()
+        pr_data = generate_pr_report.load_latest_pr_data()
+        code_dir = os.path.dirname(os.path.abspath(__file__))
+        fragment_cache = report_cache.load_fragment_cache()
+        fragment_entries = report_cache.get_pr_fragments(fragment_cache, pr_data, report_cache.code_version(code_dir))
+        fragments = [fragment for _, fragment in fragment_entries]
+        warm_fragments(pr_data, fragments)
+        report_cache.save_fragment_cache(fragment_cache, fragment_entries)
+        print(f"数据加载和单个PR分析耗时 {time.time() - started:.1f}s，开始渲染 {len(variants)} 个变体")
+
+        results = render_variants(pr_data, fragments, variants, {
+            "output_dir": args.output_dir,
+            "npu_runner_count": args.npu_runner_count,
+            "report_data": args.report_data,
+            "chart_max_points": args.chart_max_points
+        }, args.workers)
+    except Exception as e:
+        print(f"发生错误: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    for name, output_file, pr_count, elapsed in sorted(results):
+        if output_file:
+            print(f"  {name}: {pr_count} 个PR -> {output_file} ({elapsed:.1f}s)")
+        else:
+            print(f"  {name}: 没有符合条件的PR，跳过")
+    print(f"共生成 {sum(1 for _, output_file, _, _ in results if output_file)} / {len(results)} 个报告变体，"
+          f"总耗时 {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+评审时延与评审人负载计算脚本
+
+功能：基于PR的评审记录和评审请求事件，计算创建到首次评审的时间、首次请求评审到首次评审的时间、
+评审轮数（以推送划分的评审-修改循环数），以及各评审人的评审/被请求数量和待处理的评审请求，
+全部以分布形式输出。PR作者自己提交的评审（回复评论）不计入
+"""
+
+from datetime import datetime
+
+from pr_latency import build_push_timeline
+from stats_utils import summarize_distribution
+
+# 配置常量
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SUBMITTED_REVIEW_STATES = ("APPROVED", "CHANGES_REQUESTED", "COMMENTED", "DISMISSED")  # PENDING为未提交的草稿
+
+
+def parse_time(value):
+    """解析GitHub时间字符串，空值返回None"""
+    if not value:
+        return None
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+def submitted_reviews(pr):
+    """PR上其他人已提交的评审，按提交时间排序"""
+    reviews = [
+        review for review in pr.get("reviews", [])
+        if review.get("state") in SUBMITTED_REVIEW_STATES and review.get("submitted_at")
+        and review.get("author") and review["author"] != pr.get("creator")
+    ]
+    return sorted(reviews, key=lambda review: review["submitted_at"])
+
+
+def push_times(pr):
+    """PR每次推送的时间：优先取check执行记录构建的推送时间线，没有check记录时取提交时间"""
+    times = [push["push_time"] for push in build_push_timeline(pr)]
+    if not times:
+        times = [parse_time(commit.get("committed_at")) for commit in pr.get("commits", [])]
+    return sorted(time for time in times if time)
+
+
+def count_review_rounds(reviews, pushes):
+    """评审轮数：相邻两次推送之间有评审即为一轮（评审人提出意见 → 作者推送修改 → 再次评审）"""
+    rounds = set()
+    for review in reviews:
+        submitted_at = parse_time(review["submitted_at"])
+        rounds.add(sum(1 for push in pushes if push <= submitted_at))
+    return len(rounds)
+
+
+def compute_pr_review(pr):
+    """计算单个PR的评审指标"""
+    reviews = submitted_reviews(pr)
+    requests = sorted(
+        (request for request in pr.get("review_requests", []) if request.get("requested_at")),
+        key=lambda request: request["requested_at"]
+    )
+    created_at = parse_time(pr["created_at"])
+    first_review_at = parse_time(reviews[0]["submitted_at"]) if reviews else None
+
+    # 首次请求评审到其后的首次评审
+    request_to_first_review = None
+    if requests:
+        first_requested_at = parse_time(requests[0]["requested_at"])
+        answered = [
+            parse_time(review["submitted_at"]) for review in reviews
+            if parse_time(review["submitted_at"]) >= first_requested_at
+        ]
+        if answered:
+            request_to_first_review = (answered[0] - first_requested_at).total_seconds()
+
+    # 评审请求之后被请求人还没有提交评审、请求也没有被撤回的，open PR上视为待处理；
+    # 团队请求由团队中任一成员响应，请求之后有任何人提交评审即视为已响应
+    pending = set()
+    if pr.get("status") == "open":
+        removals = pr.get("review_request_removals", [])
+        for request in requests:
+            reviewer = request.get("reviewer")
+            if not reviewer:
+                continue
+            answered = any(
+                (reviewer.startswith("team:") or review["author"] == reviewer)
+                and review["submitted_at"] >= request["requested_at"]
+                for review in reviews
+            )
+            removed = any(
+                removal.get("reviewer") == reviewer and (removal.get("removed_at") or "") >= request["requested_at"]
+                for removal in removals
+            )
+            if not answered and not removed:
+                pending.add(reviewer)
+
+    return {
+        "pr_number": pr["pr_number"],
+        "review_count": len(reviews),
+        "comment_count": sum(review.get("comments") or 0 for review in reviews),
+        "time_to_first_review": (first_review_at - created_at).total_seconds() if first_review_at else None,
+        "request_to_first_review": request_to_first_review,
+        "review_rounds": count_review_rounds(reviews, push_times(pr)) if reviews else 0,
+        "reviewers": {
+            reviewer: sum(1 for review in reviews if review["author"] == reviewer)
+            for reviewer in sorted({review["author"] for review in reviews})
+        },
+        "requested": sorted({request["reviewer"] for request in requests if request.get("reviewer")}),
+        "pending": sorted(pending)
+    }
+
+
+def aggregate_reviewer_load(pr_reviews):
+    """按评审人汇总负载：评审过的PR数、提交的评审数、被请求评审的PR数、待处理的评审请求数"""
+    load = {}
+    for pr_review in pr_reviews:
+        for reviewer, count in pr_review["reviewers"].items():
+            entry = load.setdefault(reviewer, {"reviewed_prs": 0, "reviews": 0, "requested_prs": 0, "pending": 0})
+            entry["reviewed_prs"] += 1
+            entry["reviews"] += count
+        for reviewer in pr_review["requested"]:
+            load.setdefault(reviewer, {"reviewed_prs": 0, "reviews": 0, "requested_prs": 0, "pending": 0})
+            load[reviewer]["requested_prs"] += 1
+        for reviewer in pr_review["pending"]:
+            load[reviewer]["pending"] += 1
+    return sorted(
+        ({"reviewer": reviewer, **entry} for reviewer, entry in load.items()),
+        key=lambda item: (item["reviewed_prs"], item["pending"]),
+        reverse=True
+    )
+
+
+def aggregate_review_metrics(pr_reviews):
+    """汇总各PR的评审指标（compute_pr_review的结果）为分布"""
+    if not pr_reviews:
+        return {}
+
+    reviewed = [pr_review for pr_review in pr_reviews if pr_review["review_count"]]
+    reviewer_load = aggregate_reviewer_load(pr_reviews)
+    total_reviewed_prs = sum(item["reviewed_prs"] for item in reviewer_load)
+    top_reviewer_share = (
+        round(reviewer_load[0]["reviewed_prs"] / total_reviewed_prs * 100, 1) if total_reviewed_prs else None
+    )
+    return {
+        "pr_count": len(pr_reviews),
+        "reviewed_count": len(reviewed),
+        "reviewer_count": sum(1 for item in reviewer_load if item["reviewed_prs"]),
+        "pending_count": sum(len(pr_review["pending"]) for pr_review in pr_reviews),
+        "top_reviewer_share": top_reviewer_share,  # 评审最多的人在全部「评审人-PR」中的占比
+        "time_to_first_review": summarize_distribution([item["time_to_first_review"] for item in reviewed]),
+        "request_to_first_review": summarize_distribution([item["request_to_first_review"] for item in reviewed]),
+        "review_rounds": summarize_distribution([item["review_rounds"] for item in reviewed]),
+        "reviews_per_pr": summarize_distribution([item["review_count"] for item in reviewed]),
+        "comments_per_pr": summarize_distribution([item["comment_count"] for item in reviewed]),
+        "reviewed_prs_per_reviewer": summarize_distribution(
+            [item["reviewed_prs"] for item in reviewer_load if item["reviewed_prs"]]
+        ),
+        "reviewer_load": reviewer_load
+    }
+
+
+def calculate_review_metrics(pr_data):
+    """汇总全部PR的评审指标"""
+    return aggregate_review_metrics([compute_pr_review(pr) for pr in pr_data])
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Runner耗时归属脚本
+
+功能：基于PR数据中的workflow job记录（包括重跑和被新推送取代的提交），
+计算每个PR、开发者、标签和workflow类别消耗的runner分钟数，
+并按天统计NPU runner小时数与容量的对比。job记录增量写入本地账本，聚合只需对账本做一次线性扫描
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+LEDGER_FILE = os.path.join(DATA_DIR, "runner_usage.json")  # runner耗时账本
+LEDGER_VERSION = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+LEDGER_RETENTION_DAYS = 90  # 账本保留天数
+NPU_RUNNER_COUNT = 8  # 可用NPU runner数量，用于计算每日容量
+NPU_RUNNER_KEYWORDS = ("npu", "ascend")  # runner标签中包含这些关键字的job视为运行在NPU上
+TOP_N = 10  # 排行榜显示数量
+
+
+def categorize_workflow(workflow_name):
+    """按workflow名称归类（与monitor_prs.parse_workflow_duration的匹配规则一致）"""
+    name = workflow_name.lower()
+    if "lint" in name:
+        return "lint"
+    if "pr test" in name and "npu" in name:
+        return "pr_test_npu"
+    if "pr test" in name:
+        return "pr_test"
+    return "other"
+
+
+def is_npu_job(job):
+    """判断job是否占用NPU runner"""
+    labels = " ".join(job.get("runner_labels") or []).lower()
+    return any(keyword in labels for keyword in NPU_RUNNER_KEYWORDS) or "npu" in job.get("workflow", "").lower()
+
+
+def split_minutes_by_day(started_at, completed_at):
+    """将job的运行时间按自然日（UTC）切分，返回 {日期: 分钟数}"""
+    start = datetime.strptime(started_at, TIME_FORMAT)
+    end = datetime.strptime(completed_at, TIME_FORMAT)
+    minutes_by_day = {}
+    while start < end:
+        next_day = datetime(start.year, start.month, start.day) + timedelta(days=1)
+        segment_end = min(end, next_day)
+        day = start.strftime("%Y-%m-%d")
+        minutes_by_day[day] = minutes_by_day.get(day, 0.0) + (segment_end - start).total_seconds() / 60
+        start = segment_end
+    return minutes_by_day
+
+
+def new_ledger():
+    """创建空的runner耗时账本"""
+    return {
+        "version": LEDGER_VERSION,
+        "prs": {},  # PR编号 -> 归属信息（创建者、标签、最终head SHA）
+        "jobs": {}  # job ID -> 耗时记录
+    }
+
+
+def load_ledger(ledger_file=LEDGER_FILE):
+    """加载runner耗时账本，不存在或版本不一致时重新开始"""
+    if os.path.exists(ledger_file):
+        with open(ledger_file, "r", encoding="utf-8") as f:
+            ledger = json.load(f)
+        if ledger.get("version") == LEDGER_VERSION:
+            return ledger
+        print(f"runner耗时账本 {ledger_file} 版本不一致，将重新统计")
+
+    return new_ledger()
+
+
+def save_ledger(ledger, ledger_file=LEDGER_FILE):
+    """清理过期job后保存账本"""
+    expire_before = (datetime.now(timezone.utc) - timedelta(days=LEDGER_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    ledger["jobs"] = {
+        job_id: record for job_id, record in ledger["jobs"].items() if max(record["days"]) >= expire_before
+    }
+    referenced_prs = {str(record["pr"]) for record in ledger["jobs"].values()}
+    ledger["prs"] = {number: info for number, info in ledger["prs"].items() if number in referenced_prs}
+
+    ledger_dir = os.path.dirname(ledger_file)
+    if ledger_dir and not os.path.exists(ledger_dir):
+        os.makedirs(ledger_dir)
+
+    with open(ledger_file, "w", encoding="utf-8") as f:
+        json.dump(ledger, f, ensure_ascii=False)
+
+
+def ingest_jobs(ledger, pr_data):
+    """将PR数据中新完成的job写入账本，已入账的job直接跳过，返回新增数量"""
+    added = 0
+    for pr in pr_data:
+        # PR的归属信息以最新数据为准（标签、最终head SHA可能变化）
+        ledger["prs"][str(pr["pr_number"])] = {
+            "creator": pr["creator"],
+            "labels": [label.get("name") for label in pr.get("labels", [])],
+            "head_sha": pr.get("head_sha")
+        }
+
+        for job in pr.get("workflow_jobs", []):
+            job_id = str(job.get("id"))
+            if job_id in ledger["jobs"] or job.get("status") != "completed":
+                continue
+            if not job.get("started_at") or not job.get("completed_at"):
+                continue
+            days = split_minutes_by_day(job["started_at"], job["completed_at"])
+            if not days:
+                continue
+            ledger["jobs"][job_id] = {
+                "pr": pr["pr_number"],
+                "sha": job.get("head_sha"),
+                "category": categorize_workflow(job.get("workflow", "")),
+                "npu": is_npu_job(job),
+                "attempt": job.get("run_attempt") or 1,
+                "days": {day: round(minutes, 2) for day, minutes in days.items()}
+            }
+            added += 1
+
+    return added
+
+
+def _new_bucket():
+    """创建一个耗时汇总桶"""
+    return {"minutes": 0.0, "npu_minutes": 0.0, "rerun_minutes": 0.0, "superseded_minutes": 0.0}
+
+
+def _accumulate(bucket, minutes, npu, kind):
+    """累加一条job耗时到汇总桶"""
+    bucket["minutes"] += minutes
+    if npu:
+        bucket["npu_minutes"] += minutes
+    if kind == "rerun":
+        bucket["rerun_minutes"] += minutes
+    elif kind == "superseded":
+        bucket["superseded_minutes"] += minutes
+
+
+def _add_to_bucket(buckets, key, minutes, npu, kind):
+    """累加一条job耗时到指定分组的汇总桶"""
+    _accumulate(buckets.setdefault(key, _new_bucket()), minutes, npu, kind)
+
+
+def _top(buckets, top_n=TOP_N):
+    """按NPU分钟数（其次总分钟数）排序取前N个"""
+    ranked = sorted(buckets.items(), key=lambda item: (item[1]["npu_minutes"], item[1]["minutes"]), reverse=True)
+    return [
+        {"key": key, **{field: round(value, 1) for field, value in bucket.items()}}
+        for key, bucket in ranked[:top_n]
+    ]
+
+
+def aggregate_runner_usage(ledger, since_day=None, npu_runner_count=NPU_RUNNER_COUNT):
+    """对账本做一次线性扫描，汇总PR、开发者、标签、workflow类别的runner耗时以及每日NPU容量"""
+    per_pr = {}
+    per_creator = {}
+    per_label = {}
+    per_category = {}
+    daily_npu_minutes = {}
+    totals = _new_bucket()
+
+    for record in ledger["jobs"].values():
+        days = {day: minutes for day, minutes in record["days"].items() if not since_day or day >= since_day}
+        if not days:
+            continue
+        minutes = sum(days.values())
+        pr_info = ledger["prs"].get(str(record["pr"]), {})
+
+        # 被新推送取代的提交上的执行优先归为superseded，其次是同一提交上的重跑
+        if record["sha"] and pr_info.get("head_sha") and record["sha"] != pr_info["head_sha"]:
+            kind = "superseded"
+        elif record["attempt"] > 1:
+            kind = "rerun"
+        else:
+            kind = "first"
+
+        _accumulate(totals, minutes, record["npu"], kind)
+        _add_to_bucket(per_pr, record["pr"], minutes, record["npu"], kind)
+        _add_to_bucket(per_creator, pr_info.get("creator", "unknown"), minutes, record["npu"], kind)
+        _add_to_bucket(per_category, record["category"], minutes, record["npu"], kind)
+        for label in pr_info.get("labels", []):
+            _add_to_bucket(per_label, label, minutes, record["npu"], kind)
+
+        if record["npu"]:
+            for day, day_minutes in days.items():
+                daily_npu_minutes[day] = daily_npu_minutes.get(day, 0.0) + day_minutes
+
+    capacity_hours = npu_runner_count * 24
+    daily_capacity = [
+        {
+            "day": day,
+            "npu_hours": round(minutes / 60, 1),
+            "capacity_hours": capacity_hours,
+            "utilization_pct": round(minutes / 60 / capacity_hours * 100, 1) if capacity_hours else None
+        }
+        for day, minutes in sorted(daily_npu_minutes.items())
+    ]
+
+    return {
+        "totals": {field: round(value, 1) for field, value in totals.items()},
+        "npu_runner_count": npu_runner_count,
+        "daily_capacity": daily_capacity,
+        "top_prs": _top(per_pr),
+        "top_creators": _top(per_creator),
+        "top_labels": _top(per_label),
+        "categories": _top(per_category, top_n=len(per_category))
+    }
+
+
+def run_cost_attribution(pr_data, ledger_file=LEDGER_FILE, npu_runner_count=NPU_RUNNER_COUNT):
+    """增量写入账本并汇总当前数据时间窗口内的runner耗时"""
+    ledger = load_ledger(ledger_file)
+    added = ingest_jobs(ledger, pr_data)
+    save_ledger(ledger, ledger_file)
+
+    if added:
+        print(f"runner耗时账本新增 {added} 个job")
+    since_day = min((pr["created_at"][:10] for pr in pr_data), default=None)
+    return aggregate_runner_usage(ledger, since_day, npu_runner_count)
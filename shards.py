@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+分片采集与合并
+
+功能：监控脚本通过 --shard i/N 只采集第i个分片（按PR编号取模或按创建时间区间划分）的PR，
+每个分片的结果和清单保存在 pr_data/shards/ 目录；合并命令将全部分片去重合并为当天的快照，
+同时合并各分片的历史缓存，并生成合并清单。GitHub Workflow可以用job矩阵并行采集各分片，每个job使用各自的token
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime, timezone
+
+import history_cache
+import report_cache
+import snapshot_diff
+import sync_state
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+SHARD_DIR = os.path.join(DATA_DIR, "shards")  # 分片输出目录
+MERGE_MANIFEST_FILE = os.path.join(DATA_DIR, "shard_manifest.json")  # 合并清单
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SHARD_BY_CHOICES = ("number", "created")  # 按PR编号取模 / 按创建时间区间
+MERGEABLE_STATUSES = ("ok", "time_budget")  # 可以直接合并的分片状态（时间预算用完的分片数据不完整，但不阻止合并）
+
+
+def parse_shard(value, shard_by="number"):
+    """解析 i/N 形式的分片参数（i从0开始）"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"分片参数格式应为 i/N，实际为 {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片序号应满足 0 <= i < N，实际为 {value!r}")
+    if shard_by not in SHARD_BY_CHOICES:
+        raise ValueError(f"未知的分片方式: {shard_by}")
+    return {"index": index, "count": count, "by": shard_by}
+
+
+def shard_name(shard):
+    """分片名称，用于文件名"""
+    return f"shard-{shard['index']}-of-{shard['count']}"
+
+
+def shard_time_range(shard, time_range):
+    """按创建时间分片时，返回该分片负责的创建时间区间（把整个时间范围等分为N段）；按编号分片时返回原时间范围"""
+    if shard["by"] != "created":
+        return time_range
+    since = datetime.strptime(time_range["since"], TIME_FORMAT)
+    until = datetime.strptime(time_range["until"], TIME_FORMAT)
+    step = (until - since) / shard["count"]
+    return {
+        "since": (since + step * shard["index"]).strftime(TIME_FORMAT),
+        "until": (since + step * (shard["index"] + 1)).strftime(TIME_FORMAT)
+    }
+
+
+def in_shard(shard, pr):
+    """PR是否属于该分片（按创建时间分片时由PR列表的时间范围决定）"""
+    if shard["by"] != "number":
+        return True
+    return pr["number"] % shard["count"] == shard["index"]
+
+
+def save_shard(records, shard, time_range, shard_range, started_at, status, shard_dir=SHARD_DIR):
+    """保存分片采集结果和分片清单"""
+    if not os.path.exists(shard_dir):
+        os.makedirs(shard_dir)
+
+    today = datetime.now().strftime("%Y%m%d")
+    name = shard_name(shard)
+    data_file = os.path.join(shard_dir, f"pr_data_{today}_{name}.json")
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+
+    manifest = {
+        "shard": shard,
+        "date": today,
+        "data_file": os.path.basename(data_file),
+        "sha256": report_cache.file_sha256(data_file),
+        "pr_count": len(records),
+        "status": status,
+        "started_at": started_at,  # 开始获取PR列表的时间，合并后作为增量同步游标
+        "finished_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+        "window": time_range,  # 整个采集时间范围
+        "range": shard_range  # 该分片负责的创建时间范围
+    }
+    manifest_file = os.path.join(shard_dir, f"{name}.manifest.json")
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    # 历史缓存随分片输出一起上传，合并时汇总到数据目录的缓存中
+    if os.path.exists(history_cache.CACHE_FILE):
+        shutil.copyfile(history_cache.CACHE_FILE, os.path.join(shard_dir, os.path.basename(history_cache.CACHE_FILE)))
+
+    print(f"分片 {name} 的数据已保存到 {data_file}（{len(records)} 个PR）")
+    return data_file
+
+
+def find_shard_outputs(shard_dir=SHARD_DIR):
+    """递归查找分片清单（Workflow下载的artifact位于各自的子目录中），返回 [(清单所在目录, 清单)]"""
+    outputs = []
+    for root, _, files in os.walk(shard_dir):
+        for name in sorted(files):
+            if name.endswith(".manifest.json"):
+                with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                    outputs.append((root, json.load(f)))
+    return outputs
+
+
+def check_shards(manifests):
+    """检查分片是否来自同一次划分、时间范围一致且齐全，返回缺失或未完成的分片说明"""
+    problems = []
+    layouts = {(manifest["shard"]["count"], manifest["shard"]["by"], manifest["date"]) for manifest in manifests}
+    if len(layouts) > 1:
+        problems.append(f"分片来自不同的划分或日期: {sorted(layouts)}")
+        return problems
+
+    # 各分片各自按当前时间计算时间范围时，按创建时间划分的区间之间会出现空隙
+    windows = {(manifest["window"]["since"], manifest["window"]["until"]) for manifest in manifests}
+    if len(windows) > 1:
+        problems.append(f"分片的采集时间范围不一致（采集时应为各分片指定相同的 --until）: {sorted(windows)}")
+        return problems
+
+    count = manifests[0]["shard"]["count"]
+    found = {manifest["shard"]["index"] for manifest in manifests}
+    missing = sorted(set(range(count)) - found)
+    if missing:
+        problems.append(f"缺少分片: {', '.join(str(index) for index in missing)}（共 {count} 个）")
+    for manifest in manifests:
+        if manifest["status"] not in MERGEABLE_STATUSES:
+            problems.append(f"分片 {shard_name(manifest['shard'])} 未完整采集（{manifest['status']}）")
+    return problems
+
+
+def merge_records(shard_records):
+    """按pr_number去重合并各分片的记录（同一PR出现在多个分片时保留updated_at较新的一条），按创建时间降序排列"""
+    merged = {}
+    duplicates = 0
+    for records in shard_records:
+        for record in records:
+            current = merged.get(record["pr_number"])
+            if current is not None:
+                duplicates += 1
+                if record.get("updated_at", "") <= current.get("updated_at", ""):
+                    continue
+            merged[record["pr_number"]] = record
+    records = sorted(merged.values(), key=lambda record: record.get("created_at", ""), reverse=True)
+    return records, duplicates
+
+
+def merge_history_caches(cache_files, cache_file=history_cache.CACHE_FILE):
+    """把各分片的历史缓存合并到数据目录的缓存中，同一条目保留最近使用的一份"""
+    cache = history_cache.load_history_cache(cache_file)
+    for shard_cache_file in cache_files:
+        shard_cache = history_cache.load_history_cache(shard_cache_file)
+        for section in ("prs", "check_runs", "workflow_jobs"):
+            for key, entry in shard_cache[section].items():
+                current = cache[section].get(key)
+                if current is None or entry.get("used_at", "") > current.get("used_at", ""):
+                    cache[section][key] = entry
+    history_cache.save_history_cache(cache, cache_file)
+
+
+def merge_shards(shard_dir=SHARD_DIR, allow_partial=False):
+    """合并分片输出为当天的快照，返回合并清单"""
+    outputs = find_shard_outputs(shard_dir)
+    if not outputs:
+        raise ValueError(f"目录 {shard_dir} 中没有分片输出")
+
+    manifests = [manifest for _, manifest in outputs]
+    problems = check_shards(manifests)
+    for problem in problems:
+        print(f"警告: {problem}", file=sys.stderr)
+    if problems and not allow_partial:
+        raise ValueError("分片不完整或不一致，未合并（使用 --allow-partial 强制合并已有分片）")
+    partial_shards = sorted(shard_name(manifest["shard"]) for manifest in manifests if manifest["status"] != "ok")
+    for name in partial_shards:
+        print(f"警告: 分片 {name} 只采集了部分PR，合并结果不完整，不推进增量同步游标", file=sys.stderr)
+
+    shard_records = []
+    for root, manifest in outputs:
+        data_file = os.path.join(root, manifest["data_file"])
+        if report_cache.file_sha256(data_file) != manifest["sha256"]:
+            raise ValueError(f"分片数据文件 {data_file} 与清单中的哈希不一致")
+        shard_records.append(list(snapshot_diff.iter_snapshot(data_file)))
+    records, duplicates = merge_records(shard_records)
+
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    snapshot_file = os.path.join(DATA_DIR, f"pr_data_{manifests[0]['date']}_fixed.json")
+    with open(snapshot_file, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    print(f"已合并 {len(outputs)} 个分片共 {len(records)} 个PR（去除重复 {duplicates} 条），保存到 {snapshot_file}")
+
+    cache_files = [
+        os.path.join(root, os.path.basename(history_cache.CACHE_FILE)) for root, _ in outputs
+        if os.path.exists(os.path.join(root, os.path.basename(history_cache.CACHE_FILE)))
+    ]
+    if cache_files:
+        merge_history_caches(sorted(set(cache_files)))
+
+    # 全部分片完整时，以最早开始的分片时间作为增量同步游标
+    complete = not problems and not partial_shards
+    if complete:
+        sync_state.save_sync_state(
+            min(manifest["started_at"] for manifest in manifests),
+            snapshot_file,
+            manifests[0]["window"]["since"]
+        )
+    else:
+        sync_state.clear_sync_state()
+
+    merge_manifest = {
+        "merged_at": datetime.now(timezone.utc).strftime(TIME_FORMAT),
+        "snapshot_file": snapshot_file,
+        "sha256": report_cache.file_sha256(snapshot_file),
+        "pr_count": len(records),
+        "duplicates": duplicates,
+        "complete": complete,
+        "problems": problems,
+        "partial_shards": partial_shards,
+        "shards": sorted(
+            (
+                {
+                    "name": shard_name(manifest["shard"]),
+                    "by": manifest["shard"]["by"],
+                    "data_file": manifest["data_file"],
+                    "sha256": manifest["sha256"],
+                    "pr_count": manifest["pr_count"],
+                    "status": manifest["status"],
+                    "range": manifest["range"],
+                    "started_at": manifest["started_at"],
+                    "finished_at": manifest["finished_at"]
+                }
+                for manifest in manifests
+            ),
+            key=lambda item: item["name"]
+        )
+    }
+    with open(MERGE_MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(merge_manifest, f, indent=2, ensure_ascii=False)
+    print(f"合并清单已保存到 {MERGE_MANIFEST_FILE}")
+    return merge_manifest
+
+
+def main():
+    """合并分片采集结果"""
+    parser = argparse.ArgumentParser(description="合并分片采集的PR数据")
+    parser.add_argument(
+        "--shard-dir",
+        default=SHARD_DIR,
+        help=f"分片输出目录，会递归查找其中的分片清单 (默认: {SHARD_DIR})"
+    )
+    parser.add_argument(
+        "--allow-partial",
+        action="store_true",
+        help="分片缺失或未完整采集时仍合并已有分片（不会推进增量同步游标）"
+    )
+    args = parser.parse_args()
+
+    try:
+        merge_shards(args.shard_dir, allow_partial=args.allow_partial)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
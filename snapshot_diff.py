@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+PR数据快照对比
+
+功能：按pr_number对比两份每日PR数据快照，找出新增、移除和发生变化的PR（门禁状态变化、重试增加、执行变慢等），
+并给出汇总指标的变化；快照逐条流式读取（支持.json.gz），旧快照只保留对比所需字段的索引，新快照边读边对比
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+
+import json_stream
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+DIFF_OUTPUT_FILE = os.path.join(DATA_DIR, "snapshot_diff.json")  # 对比结果输出文件
+SNAPSHOT_PATTERN = re.compile(r"^pr_data_(\d{8})(_fixed)?\.json(\.gz)?$")  # 每日快照文件名
+READ_CHUNK_SIZE = 1024 * 1024  # 流式读取快照时每次读取的字符数
+SLOWER_MIN_PCT = 10  # 执行时长增幅超过该百分比才算变慢
+# 参与对比的PR字段
+DIFF_FIELDS = [
+    "status",
+    "merged",
+    "门禁_status",
+    "gate_retry_count",
+    "lint_duration",
+    "pr_test_duration",
+    "pr_test_npu_duration",
+    "additions",
+    "deletions",
+    "changed_files",
+    "comments_count",
+    "review_comments_count",
+    "head_sha"
+]
+DURATION_FIELDS = ["lint_duration", "pr_test_duration", "pr_test_npu_duration"]
+NUMERIC_FIELDS = DURATION_FIELDS + [
+    "gate_retry_count", "additions", "deletions", "changed_files", "comments_count", "review_comments_count"
+]
+
+
+def list_snapshot_files(data_dir=DATA_DIR):
+    """按日期升序列出数据目录中的每日快照，同一天同时存在修复后文件（_fixed）时只保留修复后文件"""
+    if not os.path.exists(data_dir):
+        return []
+
+    by_date = {}
+    for name in os.listdir(data_dir):
+        match = SNAPSHOT_PATTERN.match(name)
+        if not match:
+            continue
+        date, fixed = match.group(1), bool(match.group(2))
+        current = by_date.get(date)
+        if current is None or (fixed and not current[0]):
+            by_date[date] = (fixed, os.path.join(data_dir, name))
+    return [by_date[date][1] for date in sorted(by_date)]
+
+
+def find_previous_snapshot(current_file, data_dir=DATA_DIR):
+    """查找current_file之前最近的一份快照，不存在时返回None"""
+    current_match = SNAPSHOT_PATTERN.match(os.path.basename(current_file))
+    current_path = os.path.abspath(current_file)
+    previous = None
+    for snapshot_file in list_snapshot_files(data_dir):
+        if os.path.abspath(snapshot_file) == current_path:
+            break
+        if current_match and SNAPSHOT_PATTERN.match(os.path.basename(snapshot_file)).group(1) >= current_match.group(1):
+            break
+        previous = snapshot_file
+    return previous
+
+
+def open_snapshot(file_path):
+    """以文本方式打开快照文件，.gz结尾时按gzip解压读取"""
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt", encoding="utf-8")
+    return open(file_path, "r", encoding="utf-8")
+
+
+def iter_snapshot(file_path):
+    """流式读取快照文件中的PR记录"""
+    with open_snapshot(file_path) as f:
+        yield from json_stream.iter_json_array(f, READ_CHUNK_SIZE)
+
+
+def project_pr(pr):
+    """只保留对比所需的字段"""
+    projected = {field: pr.get(field) for field in DIFF_FIELDS}
+    projected["pr_number"] = pr["pr_number"]
+    projected["title"] = pr.get("title")
+    projected["html_url"] = pr.get("html_url")
+    return projected
+
+
+def new_aggregate():
+    """创建汇总指标累加器"""
+    return {
+        "total_prs": 0,
+        "open_pr_count": 0,
+        "merged_count": 0,
+        "passed_count": 0,
+        "retry_sum": 0,
+        "duration_sum": {field: 0 for field in DURATION_FIELDS},
+        "duration_count": {field: 0 for field in DURATION_FIELDS}
+    }
+
+
+def add_to_aggregate(aggregate, pr):
+    """累加一条PR记录"""
+    aggregate["total_prs"] += 1
+    if pr.get("status") == "open":
+        aggregate["open_pr_count"] += 1
+    if pr.get("merged"):
+        aggregate["merged_count"] += 1
+    if pr.get("门禁_status") == "passed":
+        aggregate["passed_count"] += 1
+    aggregate["retry_sum"] += pr.get("gate_retry_count") or 0
+    for field in DURATION_FIELDS:
+        if pr.get(field) is not None:
+            aggregate["duration_sum"][field] += pr[field]
+            aggregate["duration_count"][field] += 1
+
+
+def finish_aggregate(aggregate):
+    """计算汇总指标（口径与calculate_pr_metrics一致）"""
+    total = aggregate["total_prs"]
+    metrics = {
+        "total_prs": total,
+        "open_pr_count": aggregate["open_pr_count"],
+        "merged_count": aggregate["merged_count"],
+        "门禁_success_rate": round(aggregate["passed_count"] / total * 100, 1) if total else 0,
+        "avg_gate_retry_count": round(aggregate["retry_sum"] / total, 1) if total else 0
+    }
+    for field in DURATION_FIELDS:
+        count = aggregate["duration_count"][field]
+        metrics[f"avg_{field}"] = round(aggregate["duration_sum"][field] / count, 1) if count else None
+    return metrics
+
+
+def pr_summary(pr):
+    """新增/移除PR的摘要"""
+    return {
+        "pr_number": pr["pr_number"],
+        "title": pr.get("title"),
+        "html_url": pr.get("html_url"),
+        "status": pr.get("status"),
+        "门禁_status": pr.get("门禁_status")
+    }
+
+
+def diff_pr(old, new):
+    """对比同一PR的两条记录，返回 (字段变化, 变化类型)，没有变化时字段变化为空"""
+    changes = {}
+    for field in DIFF_FIELDS:
+        if old.get(field) == new.get(field):
+            continue
+        change = {"old": old.get(field), "new": new.get(field)}
+        if field in NUMERIC_FIELDS and old.get(field) is not None and new.get(field) is not None:
+            change["delta"] = round(new[field] - old[field], 1)
+        changes[field] = change
+
+    kinds = []
+    if "门禁_status" in changes:
+        kinds.append("gate")
+    if changes.get("gate_retry_count", {}).get("delta", 0) > 0:
+        kinds.append("retries")
+    for field in DURATION_FIELDS:
+        change = changes.get(field, {})
+        if change.get("delta", 0) > 0 and change["delta"] * 100 >= change["old"] * SLOWER_MIN_PCT:
+            kinds.append("slower")
+            break
+    return changes, kinds
+
+
+def diff_snapshot_records(old_records, new_records):
+    """对比两份快照的PR记录（可迭代对象，逐条消费）
+
+    旧快照按pr_number建立只含对比字段的索引，新快照逐条与索引匹配，一次遍历得到新增、变化和移除的PR
+    """
+    old_index = {}
+    old_aggregate = new_aggregate()
+    for pr in old_records:
+        add_to_aggregate(old_aggregate, pr)
+        old_index[pr["pr_number"]] = project_pr(pr)
+
+    added = []
+    changed = []
+    new_aggregate_state = new_aggregate()
+    for pr in new_records:
+        add_to_aggregate(new_aggregate_state, pr)
+        old = old_index.pop(pr["pr_number"], None)
+        if old is None:
+            added.append(pr_summary(pr))
+            continue
+        changes, kinds = diff_pr(old, pr)
+        if changes:
+            changed.append({
+                "pr_number": pr["pr_number"],
+                "title": pr.get("title"),
+                "html_url": pr.get("html_url"),
+                "kinds": kinds,
+                "changes": changes
+            })
+    removed = [pr_summary(pr) for pr in old_index.values()]
+
+    old_metrics = finish_aggregate(old_aggregate)
+    new_metrics = finish_aggregate(new_aggregate_state)
+    metric_deltas = {}
+    for name, old_value in old_metrics.items():
+        new_value = new_metrics[name]
+        metric_deltas[name] = {
+            "old": old_value,
+            "new": new_value,
+            "delta": round(new_value - old_value, 1) if old_value is not None and new_value is not None else None
+        }
+
+    changed.sort(key=lambda item: item["pr_number"])
+    return {
+        "added": sorted(added, key=lambda item: item["pr_number"]),
+        "removed": sorted(removed, key=lambda item: item["pr_number"]),
+        "changed": changed,
+        "gate_changed_count": sum(1 for item in changed if "gate" in item["kinds"]),
+        "retry_increased_count": sum(1 for item in changed if "retries" in item["kinds"]),
+        "slower_count": sum(1 for item in changed if "slower" in item["kinds"]),
+        "metrics": metric_deltas
+    }
+
+
+def diff_snapshots(old_file, new_file):
+    """对比两份快照文件"""
+    diff = diff_snapshot_records(iter_snapshot(old_file), iter_snapshot(new_file))
+    diff["old_snapshot"] = os.path.basename(old_file)
+    diff["new_snapshot"] = os.path.basename(new_file)
+    return diff
+
+
+def save_diff(diff, output_file=DIFF_OUTPUT_FILE):
+    """保存对比结果"""
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(diff, f, indent=2, ensure_ascii=False)
+    print(f"快照对比结果已保存到 {output_file}")
+
+
+def main():
+    """对比两份快照（默认为数据目录中最新的两份）并输出结果"""
+    parser = argparse.ArgumentParser(description="对比两份PR数据快照")
+    parser.add_argument("old", nargs="?", help="旧快照文件（默认：数据目录中倒数第二份快照）")
+    parser.add_argument("new", nargs="?", help="新快照文件（默认：数据目录中最新的快照）")
+    parser.add_argument(
+        "--output", "-o",
+        default=DIFF_OUTPUT_FILE,
+        help=f"对比结果输出文件 (默认: {DIFF_OUTPUT_FILE})"
+    )
+    args = parser.parse_args()
+
+    if args.old and args.new:
+        old_file, new_file = args.old, args.new
+    elif args.old or args.new:
+        parser.error("需要同时指定旧快照和新快照")
+    else:
+        snapshots = list_snapshot_files()
+        if len(snapshots) < 2:
+            print(f"错误: 数据目录 {DATA_DIR} 中的快照少于两份，无法对比", file=sys.stderr)
+            sys.exit(1)
+        old_file, new_file = snapshots[-2], snapshots[-1]
+
+    diff = diff_snapshots(old_file, new_file)
+    print(f"{diff['old_snapshot']} -> {diff['new_snapshot']}: 新增 {len(diff['added'])} 个PR，"
+          f"移除 {len(diff['removed'])} 个PR，变化 {len(diff['changed'])} 个PR "
+          f"(门禁状态变化 {diff['gate_changed_count']}，重试增加 {diff['retry_increased_count']}，"
+          f"执行变慢 {diff['slower_count']})")
+    for name, change in diff["metrics"].items():
+        if change["delta"]:
+            print(f"  {name}: {change['old']} -> {change['new']} ({change['delta']:+})")
+    save_diff(diff, args.output)
+
+
+if __name__ == "__main__":
+    main()
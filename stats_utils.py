@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+统计工具函数
+
+功能：分位数与分布汇总，供各项指标输出分布而不只是平均值
+"""
+
+
+def percentile(sorted_values, pct):
+    """计算已排序序列的分位数（线性插值），pct取值0-100"""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = rank - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize_distribution(values, ndigits=1):
+    """汇总数值分布：数量、均值、最小值、P50/P75/P90/P95、最大值"""
+    sorted_values = sorted(v for v in values if v is not None)
+    if not sorted_values:
+        return {"count": 0, "mean": None, "min": None, "p50": None, "p75": None, "p90": None, "p95": None, "max": None}
+
+    return {
+        "count": len(sorted_values),
+        "mean": round(sum(sorted_values) / len(sorted_values), ndigits),
+        "min": round(sorted_values[0], ndigits),
+        "p50": round(percentile(sorted_values, 50), ndigits),
+        "p75": round(percentile(sorted_values, 75), ndigits),
+        "p90": round(percentile(sorted_values, 90), ndigits),
+        "p95": round(percentile(sorted_values, 95), ndigits),
+        "max": round(sorted_values[-1], ndigits)
+    }
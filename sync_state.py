@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+增量同步游标
+
+功能：记录上一次成功同步的时间（游标）和对应的快照文件。增量运行时PR列表按updated_at降序获取，
+遇到早于游标的PR即停止，这之后有更新的PR和已保存的PR一起交给分层刷新调度（refresh_scheduler.py），结果合并到已有快照中
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+# 配置常量
+DATA_DIR = "pr_data"  # 数据目录
+STATE_FILE = os.path.join(DATA_DIR, "sync_state.json")  # 同步游标文件
+STATE_VERSION = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+CURSOR_OVERLAP_MINUTES = 5  # 游标向前回退的分钟数，覆盖本地与GitHub之间的时钟偏差
+
+
+def now():
+    """当前UTC时间字符串"""
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def load_sync_state(state_file=STATE_FILE):
+    """加载同步游标，不存在、版本不一致或对应的快照文件已不存在时返回None（需要全量同步）"""
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != STATE_VERSION or not state.get("cursor"):
+        print(f"同步游标文件 {state_file} 版本不一致，将全量同步")
+        return None
+    if not os.path.exists(state.get("snapshot_file") or ""):
+        print(f"同步游标对应的快照文件 {state.get('snapshot_file')} 不存在，将全量同步")
+        return None
+    return state
+
+
+def save_sync_state(cursor, snapshot_file, window_since, state_file=STATE_FILE):
+    """保存同步游标（先写临时文件再替换，中断时不会留下损坏的游标）"""
+    state_dir = os.path.dirname(state_file)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+
+    state = {
+        "version": STATE_VERSION,
+        "cursor": cursor,
+        "snapshot_file": snapshot_file,
+        "window_since": window_since,
+        "synced_at": now()
+    }
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, state_file)
+
+
+def clear_sync_state(state_file=STATE_FILE):
+    """删除同步游标，下次运行全量同步"""
+    if os.path.exists(state_file):
+        os.remove(state_file)
+
+
+def cursor_stop_time(state):
+    """增量列表的停止时间：updated_at早于该时间的PR上次同步后没有变化"""
+    cursor = datetime.strptime(state["cursor"], TIME_FORMAT)
+    return (cursor - timedelta(minutes=CURSOR_OVERLAP_MINUTES)).strftime(TIME_FORMAT)
+
+
+def merge_records(existing, refreshed, removed_numbers, window_since):
+    """将重新获取的PR合并到已有记录中，去掉已移除和超出时间窗口的PR，按创建时间降序排列"""
+    merged = {record["pr_number"]: record for record in existing}
+    for number in removed_numbers:
+        merged.pop(number, None)
+    for record in refreshed:
+        merged[record["pr_number"]] = record
+    records = [record for record in merged.values() if record.get("created_at", "") >= window_since]
+    records.sort(key=lambda record: record.get("created_at", ""), reverse=True)
+    return records
+
+
+def mark_stale(records, stale_numbers):
+    """标记本次应获取但没有获取到最新数据的PR（记录来自上一份快照）"""
+    stale_numbers = set(stale_numbers)
+    return [dict(record, stale=True) if record["pr_number"] in stale_numbers else record for record in records]